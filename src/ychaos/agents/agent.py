@@ -7,9 +7,9 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from enum import IntEnum
 from queue import LifoQueue, Queue
-from threading import Thread
+from threading import Event, Thread
 from types import SimpleNamespace
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
 
 from pydantic import BaseModel, Field
 
@@ -142,6 +142,8 @@ class Agent(ABC):
         self._status = LifoQueue()
         self._state_history = list()
 
+        self._completion_events: List[Event] = list()
+
         self.preserved_state = SimpleNamespace(has_error=False, is_aborted=False)
         self.advance_state(AgentState.INIT)
 
@@ -280,6 +282,24 @@ class Agent(ABC):
 
         return True
 
+    def notify_on_completion(self, event: Event) -> None:
+        """
+        Register an Event that is set every time the runner thread or the
+        teardown thread of this agent exits, irrespective of the result.
+        Used by the caller to wait on the agent without polling it.
+
+        Args:
+            event: threading.Event object
+
+        Returns:
+            None
+        """
+        self._completion_events.append(event)
+
+    def _notify_completion(self):
+        for event in self._completion_events:
+            event.set()
+
     def advance_state(self, state: AgentState):
         if self._state_history and self._state_history[-1] == state:
             return
@@ -305,6 +325,8 @@ class Agent(ABC):
         except Exception as e:
             self.exception.put(e)
             self.advance_state(AgentState.ERROR)
+        finally:
+            self._notify_completion()
 
     def __teardown_exc_wrapper(self):
         try:
@@ -313,3 +335,5 @@ class Agent(ABC):
         except Exception as e:
             self.exception.put(e)
             self.advance_state(AgentState.ERROR)
+        finally:
+            self._notify_completion()
@@ -1,13 +1,14 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import heapq
 import os
 from datetime import datetime, timedelta, timezone
+from enum import IntEnum
 from logging import Logger
 from queue import Queue
-from threading import Thread
-from time import sleep
-from typing import Dict, List, Optional
+from threading import Event, Thread
+from typing import Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -40,6 +41,18 @@ class ConfiguredAgent:
         self.agent_teardown_thread: Optional[Thread] = None
 
 
+class ScheduledAction(IntEnum):
+    """
+    The actions that are scheduled by the Coordinator for each of the agents.
+    When two actions fall on the same instant, the one with the lower value
+    is performed first, so that an agent is torn down before the next agent
+    (in sequential mode) is started.
+    """
+
+    TEARDOWN = 0
+    START = 1
+
+
 class Coordinator(EventHook):
     """
     The coordinator is responsible for setting up the chaos agents,
@@ -68,7 +81,7 @@ class Coordinator(EventHook):
         ```
 
     === "on_each_agent_running"
-        called when a Agent is running every second
+        called when a Agent is running every `MONITOR_INTERVAL` seconds (Default: 1 second)
         ```python
             def callable_hook(agent_name: str): ...
         ```
@@ -97,6 +110,7 @@ class Coordinator(EventHook):
     }
     DEFAULT_DURATION = 3
     THREAD_TIMEOUT = 300
+    MONITOR_INTERVAL = 1
 
     def __init__(self, test_plan: TestPlan):
         super(Coordinator, self).__init__()
@@ -107,6 +121,9 @@ class Coordinator(EventHook):
         self.exit_code = 0
         self.log: Logger = AppLogger.get_logger(__name__)
 
+        # Set whenever an agent thread exits, to wake up the scheduler
+        self._wakeup = Event()
+
     def configure_agent_in_test_plan(self) -> List[ConfiguredAgent]:
         """
         Configure all the Agents as specified in the test plan
@@ -157,68 +174,6 @@ class Coordinator(EventHook):
     def get_exit_status(self) -> int:
         return self.exit_code
 
-    def get_next_agent_for_runnable(self) -> Optional[ConfiguredAgent]:
-        """
-        Get the next Agent for execution as configured in test plan
-        Returns:
-            An Agent or None
-        """
-        current_time: datetime = datetime.now(timezone.utc)
-        for configured_agent in self.configured_agents:
-            assert configured_agent.start_time is not None
-            assert configured_agent.end_time is not None
-            if (
-                configured_agent.agent.current_state == AgentState.INIT
-                and current_time > configured_agent.start_time
-            ):
-                try:
-                    configured_agent.agent.setup()
-                except Exception as e:
-                    configured_agent.agent.exception.put(e)
-                    configured_agent.agent.advance_state(AgentState.ERROR)
-                    self.exit_code = 1
-                    break
-                else:
-                    return configured_agent
-        return None
-
-    def get_next_agent_for_teardown(self) -> Optional[ConfiguredAgent]:
-        """
-        Get the next Agent for teardown as configured in test plan
-        Returns:
-            An Agent or None
-        """
-        current_time: datetime = datetime.now(timezone.utc)
-        for configured_agent in self.configured_agents:
-            assert configured_agent.start_time is not None
-            assert configured_agent.end_time is not None
-            if (
-                configured_agent.agent.current_state == AgentState.RUNNING
-                and current_time > configured_agent.end_time
-                and not configured_agent.agent_teardown_thread
-            ):
-                return configured_agent
-        return None
-
-    def get_current_running_agent(self) -> Optional[ConfiguredAgent]:
-        """
-        Get the current running agent which has not been teared down yet.
-        Returns:
-            An Agent or None
-        """
-        current_time: datetime = datetime.now(timezone.utc)
-        for configured_agent in self.configured_agents:
-            assert configured_agent.start_time is not None
-            assert configured_agent.end_time is not None
-            if (
-                configured_agent.agent.current_state == AgentState.RUNNING
-                and current_time < configured_agent.end_time
-                and configured_agent.agent_start_thread
-                and not configured_agent.agent_teardown_thread
-            ):
-                return configured_agent
-        return None
-
     def check_for_failed_agents(self, agent: Optional[Agent] = None) -> bool:
         """
         check if any Agent has error
@@ -385,9 +340,86 @@ class Coordinator(EventHook):
             report.agents.append(AgentStatus(**agent))
         return report.dict()
 
+    def _build_schedule(
+        self,
+    ) -> List[Tuple[datetime, ScheduledAction, int, ConfiguredAgent]]:
+        """
+        Builds a min-heap of the start deadlines of all the configured agents.
+        The teardown deadlines are pushed to the heap when an agent is started.
+
+        Returns:
+            heap of (deadline, action, index, configured agent)
+        """
+        schedule = list()
+        for index, configured_agent in enumerate(self.configured_agents):
+            assert configured_agent.start_time is not None
+            configured_agent.agent.notify_on_completion(self._wakeup)
+            schedule.append(
+                (
+                    configured_agent.start_time,
+                    ScheduledAction.START,
+                    index,
+                    configured_agent,
+                )
+            )
+        heapq.heapify(schedule)
+        return schedule
+
+    def _start_agent(self, configured_agent: ConfiguredAgent) -> bool:
+        """
+        Sets up and starts the agent in a background thread.
+
+        Args:
+            configured_agent: The agent scheduled to start
+
+        Returns:
+            True if the agent is started, False otherwise
+        """
+        if configured_agent.agent.current_state != AgentState.INIT:
+            return False
+
+        try:
+            configured_agent.agent.setup()
+        except Exception as e:
+            configured_agent.agent.exception.put(e)
+            configured_agent.agent.advance_state(AgentState.ERROR)
+            self.exit_code = 1
+            return False
+
+        # Run Monitor once during agent start
+        configured_agent.agent.monitor()
+        configured_agent.agent_start_thread = configured_agent.agent.start_async()
+        self.execute_hooks("on_each_agent_start", configured_agent.agent.config.name)
+        return True
+
+    def _teardown_agent(self, configured_agent: ConfiguredAgent) -> None:
+        """
+        Starts the teardown of a running agent in a background thread.
+
+        Args:
+            configured_agent: The agent scheduled to be torn down
+
+        Returns:
+            None
+        """
+        if (
+            configured_agent.agent.current_state != AgentState.RUNNING
+            or configured_agent.agent_teardown_thread
+        ):
+            return
+
+        # Run Monitor once During Teardown
+        configured_agent.agent.monitor()
+        configured_agent.agent_teardown_thread = configured_agent.agent.teardown_async()
+        self.execute_hooks("on_each_agent_teardown", configured_agent.agent.config.name)
+
     def start_attack(self) -> int:
         """
-        Performs the attack as configured in testplan
+        Performs the attack as configured in testplan. The agents are started and
+        torn down from a heap of deadlines. Between two deadlines, the coordinator
+        sleeps until the next deadline, the next monitoring interval of the running agents
+        or until an agent thread exits, whichever is the earliest.
+
         Returns:
             attack status - 0 if successful else 1
         """
@@ -395,52 +427,67 @@ class Coordinator(EventHook):
         self.execute_hooks("on_attack_start")
         assert self.attack_end_time is not None
         assert self.configured_agents is not None
-        while datetime.now(timezone.utc) <= self.attack_end_time:
-            # next_agent_runnable is not None only when there is a new agent ready for running
-            next_agent_runnable: Optional[
-                ConfiguredAgent
-            ] = self.get_next_agent_for_runnable()
-            if next_agent_runnable:
-                # Run Monitor once during agent start
-                next_agent_runnable.agent.monitor()
-                next_agent_runnable.agent_start_thread = (
-                    next_agent_runnable.agent.start_async()
-                )
-                self.execute_hooks(
-                    "on_each_agent_start",
-                    next_agent_runnable.agent.config.name,
-                )
-
-            # This branch can possibly run multiple times for the same agent (1s interval)
-            current_agent_running = self.get_current_running_agent()
-            if current_agent_running:
-                # Monitor the current agent running
-                current_agent_running.agent.monitor()
-                self.execute_hooks(
-                    "on_each_agent_running", current_agent_running.agent.config.name
-                )
-
-            # next_agent_teardown is not None only when there is a agent running ready to teared down
-            next_agent_teardown: Optional[
-                ConfiguredAgent
-            ] = self.get_next_agent_for_teardown()
-            if next_agent_teardown:
-                # Run Monitor once During Teardown
-                next_agent_teardown.agent.monitor()
-                next_agent_teardown.agent_teardown_thread = (
-                    next_agent_teardown.agent.teardown_async()
-                )
-                self.execute_hooks(
-                    "on_each_agent_teardown",
-                    next_agent_teardown.agent.config.name,
-                )
 
-            sleep(1)
+        schedule = self._build_schedule()
+        running_agents: Dict[int, ConfiguredAgent] = dict()
+        next_monitor_time = datetime.now(timezone.utc)
+
+        while schedule:
+            # Cleared before the agents are checked, so that an agent thread exiting
+            # after the check wakes up the wait below
+            self._wakeup.clear()
+            current_time: datetime = datetime.now(timezone.utc)
+            while schedule and schedule[0][0] <= current_time:
+                _, action, index, configured_agent = heapq.heappop(schedule)
+                if action == ScheduledAction.START:
+                    if not self._start_agent(configured_agent):
+                        if self.exit_code:
+                            break  # Setup failed, do not start any other agent
+                        continue
+                    assert configured_agent.end_time is not None
+                    running_agents[index] = configured_agent
+                    heapq.heappush(
+                        schedule,
+                        (
+                            configured_agent.end_time,
+                            ScheduledAction.TEARDOWN,
+                            index,
+                            configured_agent,
+                        ),
+                    )
+                else:
+                    running_agents.pop(index, None)
+                    self._teardown_agent(configured_agent)
 
             if self.check_for_failed_agents():
                 self.exit_code = 1
                 break
 
+            if running_agents and current_time >= next_monitor_time:
+                for configured_agent in running_agents.values():
+                    # Monitor the agents currently running
+                    configured_agent.agent.monitor()
+                    self.execute_hooks(
+                        "on_each_agent_running", configured_agent.agent.config.name
+                    )
+                next_monitor_time = current_time + timedelta(
+                    seconds=self.MONITOR_INTERVAL
+                )
+
+            if not schedule:
+                break
+
+            next_deadline = schedule[0][0]
+            if running_agents:
+                next_deadline = min(next_deadline, next_monitor_time)
+
+            self._wakeup.wait(
+                max(
+                    (next_deadline - datetime.now(timezone.utc)).total_seconds(),
+                    0,
+                )
+            )
+
         self.stop_all_running_agents_in_sync()
 
         if self.exit_code:
@@ -4,60 +4,68 @@
 from types import SimpleNamespace
 
 from ..utils.builtins import AEnum
+from ..utils.dependency import LazyNamespace
 from .contrib import ContribAgentConfig
-from .network.iptables import (
-    DNSBlock,
-    DNSBlockConfig,
-    IPTablesBlock,
-    IPTablesBlockConfig,
-)
-from .network.traffic import TrafficBlock, TrafficBlockConfig
-from .special.NoOpAgent import (
-    NoOpAgent,
-    NoOpAgentConfig,
-    NoOpTimedAgent,
-    NoOpTimedAgentConfig,
-)
-from .system.cpu import CPUBurn, CPUBurnConfig
-from .system.disk import DiskFill, DiskFillConfig
-from .system.icmp import PingDisable, PingDisableConfig
-from .system.shell import Shell, ShellConfig
-from .validation.certificate import (
-    CertificateFileValidation,
-    CertificateFileValidationConfig,
-    ServerCertValidation,
-    ServerCertValidationConfig,
-)
 
 __all__ = ["AgentType"]
 
 
 class AgentType(AEnum):
 
+    # The metadata object will contain the following attributes
+    # 1. schema : The configuration class of the agent
+    # 2. agent_defn : The agent class
+    # The agent modules are imported only when the attributes are accessed
+
     # Special Agents
-    NO_OP = "no_op", SimpleNamespace(schema=NoOpAgentConfig, agent_defn=NoOpAgent)
-    NO_OP_TIMED = "no_op_timed", SimpleNamespace(
-        schema=NoOpTimedAgentConfig, agent_defn=NoOpTimedAgent
+    NO_OP = "no_op", LazyNamespace(
+        "ychaos.agents.special.NoOpAgent",
+        schema="NoOpAgentConfig",
+        agent_defn="NoOpAgent",
+    )
+    NO_OP_TIMED = "no_op_timed", LazyNamespace(
+        "ychaos.agents.special.NoOpAgent",
+        schema="NoOpTimedAgentConfig",
+        agent_defn="NoOpTimedAgent",
     )
 
     # System Agents
-    CPU_BURN = "cpu_burn", SimpleNamespace(schema=CPUBurnConfig, agent_defn=CPUBurn)
+    CPU_BURN = "cpu_burn", LazyNamespace(
+        "ychaos.agents.system.cpu", schema="CPUBurnConfig", agent_defn="CPUBurn"
+    )
 
     # Network Agents
-    IPTABLES_BLOCK = "iptables_block", SimpleNamespace(
-        schema=IPTablesBlockConfig, agent_defn=IPTablesBlock
+    IPTABLES_BLOCK = "iptables_block", LazyNamespace(
+        "ychaos.agents.network.iptables",
+        schema="IPTablesBlockConfig",
+        agent_defn="IPTablesBlock",
     )
-    DNS_BLOCK = "dns_block", SimpleNamespace(schema=DNSBlockConfig, agent_defn=DNSBlock)
-    TRAFFIC_BLOCK = "traffic_block", SimpleNamespace(
-        schema=TrafficBlockConfig, agent_defn=TrafficBlock
+    DNS_BLOCK = "dns_block", LazyNamespace(
+        "ychaos.agents.network.iptables",
+        schema="DNSBlockConfig",
+        agent_defn="DNSBlock",
+    )
+    TRAFFIC_BLOCK = "traffic_block", LazyNamespace(
+        "ychaos.agents.network.traffic",
+        schema="TrafficBlockConfig",
+        agent_defn="TrafficBlock",
+    )
+    NETWORK_SHAPE = "network_shape", LazyNamespace(
+        "ychaos.agents.network.shape",
+        schema="NetworkShapeConfig",
+        agent_defn="NetworkShape",
     )
 
     # Validation Agents
-    SERVER_CERT_VALIDATION = "server_cert_validation", SimpleNamespace(
-        schema=ServerCertValidationConfig, agent_defn=ServerCertValidation
+    SERVER_CERT_VALIDATION = "server_cert_validation", LazyNamespace(
+        "ychaos.agents.validation.certificate",
+        schema="ServerCertValidationConfig",
+        agent_defn="ServerCertValidation",
     )
-    CERT_FILE_VALIDATION = "cert_file_validation", SimpleNamespace(
-        schema=CertificateFileValidationConfig, agent_defn=CertificateFileValidation
+    CERT_FILE_VALIDATION = "cert_file_validation", LazyNamespace(
+        "ychaos.agents.validation.certificate",
+        schema="CertificateFileValidationConfig",
+        agent_defn="CertificateFileValidation",
     )
 
     # Special Contrib agent
@@ -65,10 +73,26 @@ class AgentType(AEnum):
         schema=ContribAgentConfig, agent_defn=lambda config: config.get_agent()
     )
 
-    DISABLE_PING = "disable_ping", SimpleNamespace(
-        schema=PingDisableConfig, agent_defn=PingDisable
+    DISABLE_PING = "disable_ping", LazyNamespace(
+        "ychaos.agents.system.icmp",
+        schema="PingDisableConfig",
+        agent_defn="PingDisable",
     )
 
-    DISK_FILL = "disk_fill", SimpleNamespace(schema=DiskFillConfig, agent_defn=DiskFill)
+    DISK_FILL = "disk_fill", LazyNamespace(
+        "ychaos.agents.system.disk", schema="DiskFillConfig", agent_defn="DiskFill"
+    )
 
-    SHELL = "shell", SimpleNamespace(schema=ShellConfig, agent_defn=Shell)
+    MEMORY_FILL = "memory_fill", LazyNamespace(
+        "ychaos.agents.system.memory",
+        schema="MemoryFillConfig",
+        agent_defn="MemoryFill",
+    )
+
+    IO_STRESS = "io_stress", LazyNamespace(
+        "ychaos.agents.system.io", schema="IOStressConfig", agent_defn="IOStress"
+    )
+
+    SHELL = "shell", LazyNamespace(
+        "ychaos.agents.system.shell", schema="ShellConfig", agent_defn="Shell"
+    )
@@ -1,13 +1,16 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import hashlib
+import os
 import shlex
 import shutil
 import subprocess  # nosec using shlex
+import uuid
 from enum import Enum
 from ipaddress import IPv4Address, IPv4Network
 from queue import LifoQueue
-from typing import List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Union
 
 from pydantic import (
     AnyHttpUrl,
@@ -34,28 +37,174 @@ class IptablesChain(Enum):
     INPUT = "INPUT"
 
 
-class IptablesRuleOperation(Enum):
-    INSERT = "-I"
-    DELETE = "-D"
+iptables_restore_command = shutil.which("iptables-restore") or "/sbin/iptables-restore"
+ipset_command = shutil.which("ipset") or "/sbin/ipset"
 
 
-iptables_command = shutil.which("iptables") or "/sbin/iptables"
+def iptables_rule_builder(port, endpoint, protocol: str = "tcp") -> str:
+    rule = f"-p {protocol} -j DROP"
+
+    if port:
+        rule += f" --dport {port}"
+
+    if endpoint:
+        rule += f" -d {endpoint}"
+
+    return rule
+
+
+# The maximum length of the name of an iptables chain. The ipsets, named after the
+# chains, allow up to 31 characters
+IPTABLES_CHAIN_NAME_MAX_LENGTH = 28
+
+
+def ychaos_chain_id(agent_name: str) -> str:
+    """
+    A short identifier unique to an agent instance, from which the names of its YChaos chains are built,
+    so that the agents with the same name do not share the chains. For example, `3F2A9C1E`.
+    """
+    return (
+        hashlib.sha1(  # nosec : Not used for security
+            f"{agent_name}:{os.getpid()}:{uuid.uuid4()}".encode()
+        )
+        .hexdigest()[:8]
+        .upper()
+    )
 
 
-def iptables_command_builder(
-    operation, chain, port, endpoint, iptable_wait_second
+def ychaos_chain_name(chain_id: str, chain: IptablesChain) -> str:
+    """
+    Name of the YChaos chain of an agent to which the `chain` jumps.
+    For example, `YCHAOS_3F2A9C1E_INPUT`. The identifier is truncated
+    to keep the name within the limit of iptables.
+    """
+    prefix = "YCHAOS_"
+    chain_id = chain_id[
+        : IPTABLES_CHAIN_NAME_MAX_LENGTH - len(prefix) - len(chain.value) - 1
+    ]
+    return f"{prefix}{chain_id}_{chain.value}"
+
+
+def ychaos_chains_insert_builder(
+    chain_id: str, rules: Dict[IptablesChain, List[str]]
 ) -> str:
-    command = f"sudo {iptables_command} {shlex.quote(operation)} {shlex.quote(chain)}"
+    """
+    Builds the `iptables-restore` input that creates (or flushes, if already present) the
+    YChaos chains of an agent, appends the `rules` to them and inserts a jump to each
+    of the YChaos chains at the top of the built-in chain.
+
+    Args:
+        chain_id: Identifier of the agent instance. See `ychaos_chain_id()`
+        rules: Rules to be added keyed by the built-in chain
+
+    Returns:
+        `iptables-restore` input for the filter table
+    """
+    lines = ["*filter"]
+    for chain in rules:
+        lines.append(f":{ychaos_chain_name(chain_id, chain)} - [0:0]")
+    for chain, _rules in rules.items():
+        for rule in _rules:
+            lines.append(f"-A {ychaos_chain_name(chain_id, chain)} {rule}")
+    for chain in rules:
+        lines.append(f"-I {chain.value} -j {ychaos_chain_name(chain_id, chain)}")
+    lines.append("COMMIT")
+    return "\n".join(lines) + "\n"
+
+
+def ychaos_chains_delete_builder(chain_id: str, chains: Iterable[IptablesChain]) -> str:
+    """
+    Builds the `iptables-restore` input that removes the jumps to the YChaos chains of an agent
+    and deletes the YChaos chains along with all the rules in them.
+
+    Args:
+        chain_id: Identifier of the agent instance. See `ychaos_chain_id()`
+        chains: The built-in chains that jump to the YChaos chains
+
+    Returns:
+        `iptables-restore` input for the filter table
+    """
+    lines = ["*filter"]
+    for chain in chains:
+        name = ychaos_chain_name(chain_id, chain)
+        lines.extend((f"-D {chain.value} -j {name}", f"-F {name}", f"-X {name}"))
+    lines.append("COMMIT")
+    return "\n".join(lines) + "\n"
+
+
+def iptables_restore(rules: str, iptables_wait) -> subprocess.CompletedProcess:
+    """
+    Applies `rules` atomically with a single `iptables-restore` process. The existing
+    rules are not flushed.
+
+    Args:
+        rules: `iptables-restore` input
+        iptables_wait: Wait for the xtables lock in seconds
+
+    Returns:
+        The completed `iptables-restore` process
+    """
+    return subprocess.run(  # nosec using shlex
+        f"sudo {iptables_restore_command} --noflush -w {shlex.quote(str(iptables_wait))}".split(),
+        input=rules,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
 
-    args = f" -p tcp -j DROP -w {shlex.quote(str(iptable_wait_second))}"
 
-    if port:
-        args += f" --dport {shlex.quote(str(port))}"
+def ipset_create_builder(sets: Dict[str, List[str]]) -> str:
+    """
+    Builds the `ipset restore` input that creates (or flushes, if already present) a
+    `hash:net` set for each of the `sets` and adds the networks to it.
 
-    if endpoint:
-        args += f" -d {shlex.quote(endpoint)}"
+    Args:
+        sets: IPv4 networks or addresses keyed by the name of the set
+
+    Returns:
+        `ipset restore` input
+    """
+    lines = list()
+    for name, networks in sets.items():
+        lines.append(
+            f"create {name} hash:net family inet maxelem {max(len(networks), 65536)}"
+        )
+        lines.append(f"flush {name}")
+        lines.extend(f"add {name} {network}" for network in networks)
+    return "\n".join(lines) + "\n"
+
+
+def ipset_destroy_builder(names: Iterable[str]) -> str:
+    """
+    Builds the `ipset restore` input that destroys the sets
+
+    Args:
+        names: Names of the sets
 
-    return command + args
+    Returns:
+        `ipset restore` input
+    """
+    return "".join(f"destroy {name}\n" for name in names)
+
+
+def ipset_restore(sets: str) -> subprocess.CompletedProcess:
+    """
+    Applies `sets` with a single `ipset restore` process. Creating a set that is already
+    present or adding an element that is already in the set is not an error.
+
+    Args:
+        sets: `ipset restore` input
+
+    Returns:
+        The completed `ipset restore` process
+    """
+    return subprocess.run(  # nosec
+        f"sudo {ipset_command} -exist restore".split(),
+        input=sets,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
 
 
 class IPTablesBlockConfig(TimedAgentConfig):
@@ -98,11 +247,35 @@ class IPTablesBlockConfig(TimedAgentConfig):
         examples=["203.0.113.0", "https://yahoo.com:443"],
     )
 
+    ipset: bool = Field(
+        description=(
+            "Load the IPv4 endpoints into an ipset (hash:net) for each direction and match them with a single "
+            "iptables rule, instead of one rule per endpoint. Recommended for large lists of endpoints"
+        ),
+        default=False,
+    )
+
 
 class IPTablesBlock(Agent):
+    """
+    Blocks the traffic to the configured ports and endpoints by adding the DROP rules to the
+    YChaos chains of the agent, one chain each for the INPUT and OUTPUT chains.
+    All the rules are applied with a single `iptables-restore` transaction, so that either all or none of
+    the rules are in effect, and are removed on teardown by deleting the YChaos chains, one transaction
+    per chain.
+
+    With `ipset` enabled, the IPv4 endpoints are loaded into a `hash:net` ipset for each direction,
+    named after the YChaos chain, and matched with a single rule. The cost of matching a packet
+    against the set does not grow with the number of endpoints in it.
+
+    The chains (and the ipsets) are named after an identifier unique to the agent instance, so that
+    multiple agents, even with the same name, neither share nor remove each other's rules.
+    """
+
     @validate_arguments
     def __init__(self, config: IPTablesBlockConfig):
         super(IPTablesBlock, self).__init__(config)
+        self.chain_id = ychaos_chain_id(config.name)
 
     def monitor(self) -> LifoQueue:
         super(IPTablesBlock, self).monitor()
@@ -123,172 +296,122 @@ class IPTablesBlock(Agent):
         if proc.returncode != 0:
             raise IOError(f"{message}  stderr: {proc.stderr}")
 
-    @log_agent_lifecycle
-    def run(self) -> None:
-        super(IPTablesBlock, self).run()
+    @staticmethod
+    def _endpoint_rule(
+        endpoint: Union[IPvAnyNetwork, AnyHttpUrl, IPvAnyAddress]
+    ) -> Optional[str]:
+        if isinstance(endpoint, AnyHttpUrl):
+            return iptables_rule_builder(endpoint.port, str(endpoint.host))
+        elif isinstance(endpoint, (IPv4Network, IPv4Address)):
+            return iptables_rule_builder(None, str(endpoint))
+        return None
+
+    def _sets(self) -> Dict[IptablesChain, List[str]]:
+        sets: Dict[IptablesChain, List[str]] = dict()
+        if not self.config.ipset:
+            return sets
+
+        for chain, endpoints in (
+            (IptablesChain.INPUT, self.config.incoming_endpoints),
+            (IptablesChain.OUTPUT, self.config.outgoing_endpoints),
+        ):
+            networks = [
+                str(endpoint)
+                for endpoint in endpoints
+                if isinstance(endpoint, (IPv4Network, IPv4Address))
+            ]
+            if networks:
+                sets[chain] = networks
+        return sets
+
+    def _rules(self) -> Dict[IptablesChain, List[str]]:
+        rules: Dict[IptablesChain, List[str]] = {
+            IptablesChain.INPUT: list(),
+            IptablesChain.OUTPUT: list(),
+        }
         for port in self.config.incoming_ports:
-            proc = subprocess.run(  # nosec using shlex
-                iptables_command_builder(
-                    IptablesRuleOperation.INSERT.value,
-                    IptablesChain.INPUT.value,
-                    port,
-                    None,
-                    self.config.iptables_wait,
-                ).split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            self.raise_io_error_on_iptables_failure(
-                proc, f"Error While Adding IpTable Rule: DROP {port} to INPUT Chain"
-            )
+            rules[IptablesChain.INPUT].append(iptables_rule_builder(port, None))
         for port in self.config.destination_ports:
-            proc = subprocess.run(  # nosec using shlex
-                iptables_command_builder(
-                    IptablesRuleOperation.INSERT.value,
-                    IptablesChain.OUTPUT.value,
-                    port,
-                    None,
-                    self.config.iptables_wait,
-                ).split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            self.raise_io_error_on_iptables_failure(
-                proc, f"Error While Adding IpTable Rule: DROP {port} to OUTPUT Chain"
-            )
-
-        for endpoint in self.config.incoming_endpoints:
-            if isinstance(endpoint, AnyHttpUrl):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.INSERT.value,
-                        IptablesChain.INPUT.value,
-                        endpoint.port,
-                        str(endpoint.host),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                self.raise_io_error_on_iptables_failure(
-                    proc,
-                    f"Error While Adding IpTable Rule: DROP {endpoint} to INPUT Chain",
-                )
+            rules[IptablesChain.OUTPUT].append(iptables_rule_builder(port, None))
 
-            elif isinstance(endpoint, (IPv4Network, IPv4Address)):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.INSERT.value,
-                        IptablesChain.INPUT.value,
-                        None,
-                        str(endpoint),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                self.raise_io_error_on_iptables_failure(
-                    proc,
-                    f"Error While Adding IpTable Rule: DROP {endpoint} to INPUT Chain",
-                )
+        for chain in self._sets():
+            rules[chain].append(
+                f"-p tcp -j DROP -m set --match-set {ychaos_chain_name(self.chain_id, chain)} dst"
+            )
 
-        for endpoint in self.config.outgoing_endpoints:
-            if isinstance(endpoint, AnyHttpUrl):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.INSERT.value,
-                        IptablesChain.OUTPUT.value,
-                        endpoint.port,
-                        str(endpoint.host),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                self.raise_io_error_on_iptables_failure(
-                    proc,
-                    f"Error While Adding IpTable Rule: DROP {endpoint} to INPUT Chain",
-                )
+        for chain, endpoints in (
+            (IptablesChain.INPUT, self.config.incoming_endpoints),
+            (IptablesChain.OUTPUT, self.config.outgoing_endpoints),
+        ):
+            for endpoint in endpoints:
+                if self.config.ipset and isinstance(
+                    endpoint, (IPv4Network, IPv4Address)
+                ):
+                    # Matched by the ipset rule
+                    continue
+                rule = self._endpoint_rule(endpoint)
+                if rule is not None:
+                    rules[chain].append(rule)
+
+        return {chain: _rules for chain, _rules in rules.items() if _rules}
 
-            elif isinstance(endpoint, (IPv4Network, IPv4Address)):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.INSERT.value,
-                        IptablesChain.OUTPUT.value,
-                        None,
-                        str(endpoint),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
+    @log_agent_lifecycle
+    def run(self) -> None:
+        super(IPTablesBlock, self).run()
+        rules = self._rules()
+        if not rules:
+            return
+
+        sets = self._sets()
+        if sets:
+            proc = ipset_restore(
+                ipset_create_builder(
+                    {
+                        ychaos_chain_name(self.chain_id, chain): networks
+                        for chain, networks in sets.items()
+                    }
                 )
+            )
+            self.raise_io_error_on_iptables_failure(
+                proc, "Error While Creating ipsets of the endpoints"
+            )
 
-                self.raise_io_error_on_iptables_failure(
-                    proc,
-                    f"Error While Adding IpTable Rule: DROP {endpoint} to INPUT Chain",
-                )
+        proc = iptables_restore(
+            ychaos_chains_insert_builder(self.chain_id, rules),
+            self.config.iptables_wait,
+        )
+        self.raise_io_error_on_iptables_failure(
+            proc,
+            "Error While Adding IpTable Rules: DROP to YChaos Chains",
+        )
 
     @log_agent_lifecycle
     def teardown(self) -> None:
         super(IPTablesBlock, self).teardown()
+        rules = self._rules()
+        if not rules:
+            return
+
+        # Each of the chains is deleted in its own transaction, so that a chain
+        # that cannot be deleted does not leave the other chain in place
         error = False
-        for port in self.config.incoming_ports:
-            proc = subprocess.run(  # nosec using shlex
-                iptables_command_builder(
-                    IptablesRuleOperation.DELETE.value,
-                    IptablesChain.INPUT.value,
-                    port,
-                    None,
-                    self.config.iptables_wait,
-                ).split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+        for chain in rules:
+            proc = iptables_restore(
+                ychaos_chains_delete_builder(self.chain_id, (chain,)),
+                self.config.iptables_wait,
             )
             error = proc.returncode != 0 or error
 
-        for port in self.config.destination_ports:
-            proc = subprocess.run(  # nosec using shlex
-                iptables_command_builder(
-                    IptablesRuleOperation.DELETE.value,
-                    IptablesChain.OUTPUT.value,
-                    port,
-                    None,
-                    self.config.iptables_wait,
-                ).split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+        # The sets can only be destroyed after the rules referring to them are deleted
+        sets = self._sets()
+        if sets:
+            proc = ipset_restore(
+                ipset_destroy_builder(
+                    ychaos_chain_name(self.chain_id, chain) for chain in sets
+                )
             )
             error = proc.returncode != 0 or error
 
-        for endpoint in self.config.incoming_endpoints:
-            if isinstance(endpoint, AnyHttpUrl):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.DELETE.value,
-                        IptablesChain.INPUT.value,
-                        endpoint.port,
-                        str(endpoint.host),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                error = proc.returncode != 0 or error
-
-            elif isinstance(endpoint, (IPv4Network, IPv4Address)):
-                proc = subprocess.run(  # nosec using shlex
-                    iptables_command_builder(
-                        IptablesRuleOperation.DELETE.value,
-                        IptablesChain.OUTPUT.value,
-                        None,
-                        str(endpoint),
-                        self.config.iptables_wait,
-                    ).split(),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                error = proc.returncode != 0 or error
-
         if error:
             raise AgentError("Error Occurred while removing IpTable rule")
 
@@ -317,6 +440,7 @@ class DNSBlock(Agent):
     @validate_arguments
     def __init__(self, config: DNSBlockConfig):
         super(DNSBlock, self).__init__(config)
+        self.chain_id = ychaos_chain_id(config.name)
 
     def monitor(self) -> LifoQueue:
         return self._status
@@ -330,28 +454,26 @@ class DNSBlock(Agent):
         if proc.returncode != 0:
             raise IOError(message)
 
+    def _rules(self) -> Dict[IptablesChain, List[str]]:
+        return {
+            IptablesChain.OUTPUT: [
+                iptables_rule_builder(self.DNS_PORT, None, protocol="udp"),
+                iptables_rule_builder(self.DNS_PORT, None, protocol="tcp"),
+            ]
+        }
+
     @log_agent_lifecycle
     def run(self):
         super(DNSBlock, self).run()
 
-        _cmd = f"sudo {iptables_command} -I OUTPUT -p udp --dport {self.DNS_PORT} -j DROP -w {shlex.quote(str(self.config.iptables_wait))}".split()
-        proc = subprocess.run(  # nosec
-            _cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        proc = iptables_restore(
+            ychaos_chains_insert_builder(self.chain_id, self._rules()),
+            self.config.iptables_wait,
         )
         self.raise_io_error_on_iptables_failure(
-            proc, "Error While Adding IPTables Rule: DROP udp port: 53 to OUTPUT chain"
-        )
-
-        _cmd = f"sudo {iptables_command} -I OUTPUT -p tcp --dport {self.DNS_PORT} -j DROP -w {shlex.quote(str(self.config.iptables_wait))}".split()
-        proc = subprocess.run(  # nosec
-            _cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        self.raise_io_error_on_iptables_failure(
-            proc, "Error While Adding IpTable Rule: DROP tcp port: 53 to OUTPUT Chain"
+            proc,
+            f"Error While Adding IPTables Rules: DROP udp and tcp port: 53 to "
+            f"{ychaos_chain_name(self.chain_id, IptablesChain.OUTPUT)} chain",
         )
 
     @log_agent_lifecycle
@@ -364,23 +486,11 @@ class DNSBlock(Agent):
             AgentState.ERROR,
             AgentState.ABORTED,
         ):
-            _cmd = f"sudo {iptables_command} -D OUTPUT -p udp --dport {self.DNS_PORT} -j DROP -w {self.config.iptables_wait}".split()
-            proc = subprocess.run(  # nosec
-                _cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-
-            error = proc.returncode != 0 or error
-
-            _cmd = f"sudo {iptables_command} -D OUTPUT -p tcp --dport {self.DNS_PORT} -j DROP -w {self.config.iptables_wait}".split()
-            proc = subprocess.run(  # nosec
-                _cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+            proc = iptables_restore(
+                ychaos_chains_delete_builder(self.chain_id, self._rules()),
+                self.config.iptables_wait,
             )
-
-            error = proc.returncode != 0 or error
+            error = proc.returncode != 0
 
         if error:
             raise AgentError("Error Occurred while removing iptables rule")
@@ -0,0 +1,350 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import shutil
+import socket
+import subprocess  # nosec : Arguments are not passed through a shell
+import time
+from ipaddress import IPv4Network
+from queue import LifoQueue
+from threading import Thread
+from typing import List, Optional
+
+from pydantic import Field, PositiveInt, root_validator, validate_arguments
+
+from ...utils.builtins import BuiltinUtils
+from ..agent import Agent, AgentMonitoringDataPoint, TimedAgentConfig
+from ..exceptions import AgentError
+from ..utils.annotations import log_agent_lifecycle
+
+__all__ = ["NetworkShapeConfig", "NetworkShape"]
+
+
+tc_command = shutil.which("tc") or "/sbin/tc"
+
+
+class NetworkShapeConfig(TimedAgentConfig):
+    """
+    Defines the Network Shape configuration to degrade the outgoing traffic of an interface.
+    The framework delays, drops, duplicates and reorders the packets with `netem` and caps the
+    bandwidth with `tbf`.
+
+    By default, all the outgoing traffic of the `interface` is shaped. When `destination_ports` or
+    `destinations` are configured, only the traffic to those ports or destinations is shaped. When both
+    are configured, only the traffic to one of the ports of one of the destinations is shaped.
+    """
+
+    name = "network_shape"
+    description = "This agent degrades the outgoing network traffic with tc/netem"
+
+    is_sudo = True
+
+    interface: str = Field(
+        default="eth0",
+        description="The network interface of which the outgoing traffic is shaped",
+        examples=["eth0", "bond0"],
+        regex=r"^[\w.:@-]+$",
+    )
+
+    delay_ms: float = Field(
+        default=0, description="Delay added to each packet in milliseconds", ge=0
+    )
+
+    jitter_ms: float = Field(
+        default=0,
+        description="Random variation of the delay in milliseconds",
+        ge=0,
+    )
+
+    correlation_pct: float = Field(
+        default=0,
+        description="Correlation of the delay of a packet with the delay of the previous packet",
+        ge=0,
+        le=100,
+    )
+
+    loss_pct: float = Field(
+        default=0, description="Percentage of the packets dropped", ge=0, le=100
+    )
+
+    duplicate_pct: float = Field(
+        default=0, description="Percentage of the packets duplicated", ge=0, le=100
+    )
+
+    reorder_pct: float = Field(
+        default=0,
+        description="Percentage of the packets sent immediately, ahead of the delayed packets. Requires `delay_ms`",
+        ge=0,
+        le=100,
+    )
+
+    bandwidth_kbit: Optional[PositiveInt] = Field(
+        default=None,
+        description="Bandwidth cap in kilobits per second",
+        examples=[1024],
+    )
+
+    destination_ports: List[int] = Field(
+        default=list(),
+        description="List of destination ports of the traffic to shape",
+        examples=[[443, 4443]],
+    )
+
+    destinations: List[IPv4Network] = Field(
+        default=list(),
+        description="List of destination networks or addresses of the traffic to shape",
+        examples=[["203.0.113.0/24", "198.51.100.7"]],
+    )
+
+    probe_host: Optional[str] = Field(
+        default=None,
+        description=(
+            "Host to which the round trip time is measured with a TCP connection during monitoring. "
+            "The round trip time is not measured if not configured"
+        ),
+        examples=["yahoo.com", "203.0.113.7"],
+    )
+
+    probe_port: int = Field(
+        default=443, description="Port of `probe_host` to connect to", gt=0, lt=65536
+    )
+
+    probe_timeout: float = Field(
+        default=5,
+        description="Timeout (in seconds) of the TCP connection to `probe_host`",
+        gt=0,
+    )
+
+    @root_validator(skip_on_failure=True)
+    def _validate_shaping(cls, values):
+        if values["reorder_pct"] and not values["delay_ms"]:
+            raise ValueError("reorder_pct requires delay_ms to be configured")
+        if values["jitter_ms"] and not values["delay_ms"]:
+            raise ValueError("jitter_ms requires delay_ms to be configured")
+        return values
+
+    def netem_args(self) -> str:
+        """
+        Builds the arguments of the `netem` qdisc from the configuration
+
+        Returns:
+            netem arguments
+        """
+        args = f"delay {self.delay_ms:g}ms"
+        if self.jitter_ms:
+            args += f" {self.jitter_ms:g}ms"
+            if self.correlation_pct:
+                args += f" {self.correlation_pct:g}%"
+        if self.loss_pct:
+            args += f" loss {self.loss_pct:g}%"
+        if self.duplicate_pct:
+            args += f" duplicate {self.duplicate_pct:g}%"
+        if self.reorder_pct:
+            args += f" reorder {self.reorder_pct:g}%"
+        return args
+
+    def tbf_args(self) -> Optional[str]:
+        """
+        Builds the arguments of the `tbf` qdisc from the configuration
+
+        Returns:
+            tbf arguments, None if the bandwidth is not capped
+        """
+        if self.bandwidth_kbit is None:
+            return None
+
+        # The bucket should hold at least the bytes sent in a timer tick (10ms) and a full size packet
+        burst = max(self.bandwidth_kbit * 1000 // 8 // 100, 1600)
+        return f"rate {self.bandwidth_kbit}kbit burst {burst}b latency 50ms"
+
+
+class NetworkShape(Agent):
+    """
+    Shapes the outgoing traffic of an interface by replacing its root qdisc. Without filters,
+    the root qdisc is a `netem` qdisc (with a `tbf` child if the bandwidth is capped). With filters,
+    the root qdisc is a `prio` qdisc with an additional band, to which the `u32` filters classify the
+    matching traffic, and the `netem` qdisc is attached to that band. The rest of the traffic is
+    prioritized by the `prio` qdisc just as with the default qdisc.
+
+    All the qdiscs and filters are added with a single `tc -batch` process. The root qdisc is added
+    with the distinctive handle `ROOT_HANDLE`, so that teardown deletes it only if it is still the one
+    added by this agent. Deleting the root qdisc restores the default qdisc of the interface.
+    To make that restore the original state, the agent refuses to run on an interface on which a
+    root qdisc has been configured by someone else.
+
+    The round trip time to the `probe_host` is measured on a background thread, so that a slow probe
+    does not hold up the coordinator. Each call to `monitor` reports the last measured round trip time
+    and starts a new probe if the previous one is complete.
+    """
+
+    # Distinctive handle of the root qdisc added by this agent
+    ROOT_HANDLE = "ca05:"
+
+    NETEM_HANDLE = "ca06:"
+    TBF_HANDLE = "ca07:"
+
+    # Band of the prio qdisc to which the filtered traffic is classified
+    SHAPED_BAND = 4
+
+    @validate_arguments
+    def __init__(self, config: NetworkShapeConfig):
+        super(NetworkShape, self).__init__(config)
+        self.original_qdisc: Optional[str] = None
+
+        self._rtt_ms: float = BuiltinUtils.Float.NAN
+        self._prober: Optional[Thread] = None
+
+    def _tc(
+        self, *args: str, batch: Optional[str] = None
+    ) -> subprocess.CompletedProcess:
+        return subprocess.run(  # nosec : Arguments are not passed through a shell
+            ["sudo", tc_command, *args],
+            input=batch,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def _root_qdisc(self) -> str:
+        proc = self._tc("qdisc", "show", "dev", self.config.interface)
+        if proc.returncode != 0:
+            raise AgentError(
+                f"Error while reading the qdisc of {self.config.interface}: {proc.stderr}"
+            )
+        for qdisc in proc.stdout.splitlines():
+            if " root " in f"{qdisc} ":
+                return qdisc.strip()
+        return ""
+
+    def _is_default_qdisc(self, qdisc: str) -> bool:
+        # The qdiscs attached by the kernel have the handle 0:, e.g. "qdisc fq_codel 0: root refcnt 2 ..."
+        fields = qdisc.split()
+        return len(fields) < 3 or fields[2] == "0:"
+
+    def _is_shaped(self, qdisc: str) -> bool:
+        fields = qdisc.split()
+        return len(fields) >= 3 and fields[2] == self.ROOT_HANDLE
+
+    def tc_batch(self) -> str:
+        """
+        Builds the `tc -batch` input that shapes the traffic
+
+        Returns:
+            tc batch commands
+        """
+        dev = self.config.interface
+        netem = self.config.netem_args()
+        tbf = self.config.tbf_args()
+
+        filters: List[str] = list()
+        destinations = [str(destination) for destination in self.config.destinations]
+        ports = [str(port) for port in self.config.destination_ports]
+        if destinations and ports:
+            filters = [
+                f"match ip dst {destination} match ip dport {port} 0xffff"
+                for destination in destinations
+                for port in ports
+            ]
+        elif destinations or ports:
+            filters = [f"match ip dst {destination}" for destination in destinations]
+            filters += [f"match ip dport {port} 0xffff" for port in ports]
+
+        commands = list()
+        if not filters:
+            commands.append(
+                f"qdisc add dev {dev} root handle {self.ROOT_HANDLE} netem {netem}"
+            )
+            netem_handle = self.ROOT_HANDLE
+        else:
+            flowid = f"{self.ROOT_HANDLE}{self.SHAPED_BAND}"
+            commands.append(
+                f"qdisc add dev {dev} root handle {self.ROOT_HANDLE} prio bands {self.SHAPED_BAND}"
+            )
+            commands.append(
+                f"qdisc add dev {dev} parent {flowid} handle {self.NETEM_HANDLE} netem {netem}"
+            )
+            commands.extend(
+                f"filter add dev {dev} parent {self.ROOT_HANDLE} protocol ip prio 1 u32 {_filter} flowid {flowid}"
+                for _filter in filters
+            )
+            netem_handle = self.NETEM_HANDLE
+
+        if tbf is not None:
+            commands.append(
+                f"qdisc add dev {dev} parent {netem_handle}1 handle {self.TBF_HANDLE} tbf {tbf}"
+            )
+
+        return "\n".join(commands) + "\n"
+
+    def _measure_rtt(self) -> float:
+        if self.config.probe_host is None:
+            return BuiltinUtils.Float.NAN
+
+        start = time.perf_counter()
+        try:
+            with socket.create_connection(
+                (self.config.probe_host, self.config.probe_port),
+                timeout=self.config.probe_timeout,
+            ):
+                return (time.perf_counter() - start) * 1000
+        except OSError:
+            return BuiltinUtils.Float.NAN
+
+    def _probe(self) -> None:
+        self._rtt_ms = self._measure_rtt()
+
+    def monitor(self) -> LifoQueue:
+        super(NetworkShape, self).monitor()
+        if self.config.probe_host is not None and (
+            self._prober is None or not self._prober.is_alive()
+        ):
+            self._prober = Thread(
+                target=self._probe, name=self.config.name + "_probe", daemon=True
+            )
+            self._prober.start()
+
+        self._status.put(
+            AgentMonitoringDataPoint(
+                data=dict(
+                    interface=self.config.interface,
+                    rtt_ms=self._rtt_ms,
+                ),
+                state=self.current_state,
+            )
+        )
+        return self._status
+
+    @log_agent_lifecycle
+    def setup(self) -> None:
+        super(NetworkShape, self).setup()
+        self.original_qdisc = self._root_qdisc()
+        if not self._is_default_qdisc(self.original_qdisc):
+            raise AgentError(
+                f"{self.config.interface} has a configured root qdisc, which cannot be restored after shaping: "
+                f"{self.original_qdisc}"
+            )
+
+    @log_agent_lifecycle
+    def run(self) -> None:
+        super(NetworkShape, self).run()
+        proc = self._tc("-batch", "-", batch=self.tc_batch())
+        if proc.returncode != 0:
+            # tc -batch stops at the first failure. Remove what was added before it
+            self._restore()
+            raise IOError(
+                f"Error while shaping the traffic of {self.config.interface}  stderr: {proc.stderr}"
+            )
+
+    def _restore(self) -> bool:
+        if not self._is_shaped(self._root_qdisc()):
+            return True
+
+        proc = self._tc("qdisc", "del", "dev", self.config.interface, "root")
+        return proc.returncode == 0
+
+    @log_agent_lifecycle
+    def teardown(self) -> None:
+        super(NetworkShape, self).teardown()
+        if not self._restore():
+            raise AgentError(
+                f"Error Occurred while restoring the qdisc of {self.config.interface}"
+            )
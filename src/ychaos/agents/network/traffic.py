@@ -1,10 +1,14 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import errno
+import os
 import shutil
+import subprocess  # nosec : Arguments are not passed through a shell
+import warnings
 from pathlib import Path
 from queue import LifoQueue
-from stat import S_IREAD, S_IRGRP, S_IROTH
+from stat import S_IMODE, S_IREAD, S_IRGRP, S_IROTH
 from tempfile import NamedTemporaryFile
 from typing import List, Optional
 
@@ -35,6 +39,60 @@ class TrafficBlockConfig(TimedAgentConfig):
         examples=[["yahoo.com", "google.com"]],
     )
 
+    flush_dns_cache: bool = Field(
+        description=(
+            "Flush the host caches of nscd and systemd-resolved after modifying the hosts file, "
+            "so that the block takes effect immediately"
+        ),
+        default=False,
+    )
+
+
+def _write_atomically(path: Path, content: str) -> None:
+    """
+    Replaces the content of the file at `path` with `content` by writing it to a temporary file
+    in the same directory and renaming it over `path`, so that the readers of the file
+    see either the old or the new content and never a partially written file. The mode and the owner
+    of the file are preserved.
+
+    The file is written in place if it cannot be renamed over, for example when it is a bind mount.
+    When `path` is a symbolic link, the file it points to is replaced and the link is kept.
+    """
+    path = Path(os.path.realpath(path))
+    stat = path.stat()
+    with NamedTemporaryFile(
+        mode="w", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as f:
+        try:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+            os.chmod(f.name, S_IMODE(stat.st_mode))
+            try:
+                os.chown(f.name, stat.st_uid, stat.st_gid)
+            except PermissionError:  # pragma: no cover
+                pass
+
+            os.replace(f.name, path)
+        except OSError as e:
+            os.unlink(f.name)
+            if e.errno not in (errno.EBUSY, errno.EXDEV):
+                raise
+
+            with open(path, "w") as hosts_file:
+                hosts_file.write(content)
+                hosts_file.flush()
+                os.fsync(hosts_file.fileno())
+            return
+
+    # Persist the rename
+    directory = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
 
 class TrafficBlock(Agent):
     LOCALHOST = "127.0.0.1"
@@ -65,21 +123,50 @@ class TrafficBlock(Agent):
         self.permission = Path(self.config.backup_hostsfile).lstat().st_mode
         Path(self.config.backup_hostsfile).chmod(S_IREAD | S_IRGRP | S_IROTH)
 
+    def _flush_dns_cache(self) -> None:
+        if not self.config.flush_dns_cache:
+            return
+
+        for command in (
+            ("nscd", "--invalidate", "hosts"),
+            ("resolvectl", "flush-caches"),
+        ):
+            executable = shutil.which(command[0])
+            if executable is None:
+                continue
+
+            proc = subprocess.run(  # nosec : Arguments are not passed through a shell
+                [executable, *command[1:]],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            )
+            if proc.returncode != 0:
+                warnings.warn(
+                    f"Failed to flush the cache with {command[0]}: {proc.stderr}",
+                    category=RuntimeWarning,
+                )
+
     @log_agent_lifecycle
     def run(self) -> None:
         super(TrafficBlock, self).run()
-        with open(self.config.hostsfile, "a") as hosts_file:
-            hosts_file.write("\n")
-            for host in self.config.hosts:
-                hosts_file.write(f"{self.LOCALHOST}\t{host}\n")
+        content = Path(self.config.hostsfile).read_text()
+        content += "\n" + "".join(
+            f"{self.LOCALHOST}\t{host}\n" for host in self.config.hosts
+        )
+        _write_atomically(Path(self.config.hostsfile), content)
+        self._flush_dns_cache()
 
     @log_agent_lifecycle
     def teardown(self) -> None:
         super(TrafficBlock, self).teardown()
 
-        # Restore the permissions for the file and move it to original location
+        # Restore the permissions of the backup and write its content to the original location
         self.config.backup_hostsfile.chmod(self.permission)
-        shutil.copy(self.config.backup_hostsfile, self.config.hostsfile)
+        _write_atomically(
+            Path(self.config.hostsfile), self.config.backup_hostsfile.read_text()
+        )
+        self._flush_dns_cache()
 
         # Delete the backup hostsfile
         self.config.backup_hostsfile.unlink()
@@ -1,45 +1,89 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 import math
+import os
+import time
 import warnings
 from datetime import datetime, timedelta
-from multiprocessing import Pool, cpu_count
+from enum import Enum
+from multiprocessing import Array, Process, cpu_count
+from pathlib import Path
 from queue import LifoQueue
+from typing import List, Optional, Sequence, Tuple
 
-from pydantic import Field, validate_arguments
+from pydantic import Field, PositiveInt, validate_arguments
 
 from ...utils.builtins import BuiltinUtils
 from ...utils.dependency import DependencyUtils
 from ..agent import Agent, AgentMonitoringDataPoint, TimedAgentConfig
 from ..utils.annotations import log_agent_lifecycle
 
-__all__ = ["CPUBurnConfig", "CPUBurn"]
+__all__ = ["CPUBurnConfig", "CPUBurn", "LoadProfile"]
 
 
-def _burn(end: datetime) -> None:
+def _burn(
+    end: datetime,
+    duty_cycle: Optional[Sequence[float]] = None,
+    index: int = 0,
+    slice_seconds: float = 0.1,
+    cpu: Optional[int] = None,
+) -> None:
     """
-    A simple timed infinite loop that is supposed to run on all the processors
-    The while loop should contain a CPU intensive operation that can burn CPU during its run.
+    A timed loop that burns the CPU for a fraction of each time slice and sleeps for
+    the rest of the slice. The fraction is read from `duty_cycle[index]` at the start of every slice,
+    so that it can be adjusted by the parent process while this is running.
 
     Args:
         end: when to stop the execution of the agent
+        duty_cycle: Shared array of the fraction of the slice to burn the CPU. Burns the CPU throughout if not provided
+        index: Index of this worker in the `duty_cycle` array
+        slice_seconds: Length of a slice in seconds
+        cpu: The CPU to which this worker is pinned. The worker is not pinned if not provided
 
     Returns:
         None
     """
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:  # pragma: no cover
+            pass
+
+    end_timestamp = end.timestamp()
     while True:
-        if datetime.now() >= end:
-            _ = (
-                22112**47373
-            )  # Random Number Powered by Random Number (Make sure to test this completes execution in a second)
+        slice_start = time.time()
+        if slice_start >= end_timestamp:
             break
 
+        duty = 1.0 if duty_cycle is None else duty_cycle[index]
+        burn_until = slice_start + slice_seconds * duty
+        while time.time() < burn_until:
+            pass
+
+        idle = min(slice_start + slice_seconds, end_timestamp) - time.time()
+        if idle > 0 and duty < 1:
+            time.sleep(idle)
+
+
+class LoadProfile(Enum):
+    """
+    Defines how the target CPU utilization varies over the `duration` of the CPU burn
+    """
+
+    CONSTANT = "constant"
+    LINEAR = "linear"
+    STEP = "step"
+    SINE = "sine"
+
 
 class CPUBurnConfig(TimedAgentConfig):
     """
     Defines the CPU Burn configuration to initiate a CPU burn attack. The framework will
     attack only a percentage of cores that is defined in the `cores_pct` attribute. By default,
     `cores_pct` is set to 100, implying all the CPU cores are targeted simultaneously.
+
+    Each of the cores is burned up to the utilization defined in `cpu_pct`, which can be varied over the
+    `duration` with a load `profile`. By default, the cores are burned at 100%.
     """
 
     name = "cpu_burn"
@@ -55,18 +99,156 @@ class CPUBurnConfig(TimedAgentConfig):
         le=100,
     )
 
+    cpu_pct: float = Field(
+        default=100,
+        description=(
+            "Target utilization (in percentage) of each of the cores being burned. "
+            "The utilization is measured with psutil and the load is adjusted to hold this level"
+        ),
+        gt=0,
+        le=100,
+    )
+
+    profile: LoadProfile = Field(
+        default=LoadProfile.CONSTANT,
+        description=(
+            "Variation of the target utilization over the duration. "
+            "`linear` and `step` ramp up to `cpu_pct` over `ramp_duration` and ramp down to 0 by the end of duration, "
+            "`sine` oscillates between 0 and `cpu_pct` with a period of `period` seconds"
+        ),
+    )
+
+    ramp_duration: float = Field(
+        default=0,
+        description="Duration (in seconds) of the ramp up and ramp down. Defaults to half of the duration if set to 0",
+        ge=0,
+    )
+
+    steps: PositiveInt = Field(
+        default=4, description="Number of steps in the `step` load profile"
+    )
+
+    period: float = Field(
+        default=60,
+        description="Period (in seconds) of the `sine` load profile",
+        gt=0,
+    )
+
+    slice_ms: float = Field(
+        default=100,
+        description=(
+            "Length of the duty cycle (in ms). Each core is burned for a fraction of every slice "
+            "and left idle for the rest of it"
+        ),
+        ge=10,
+        le=1000,
+    )
+
+    def effective_cpus(self) -> List[int]:
+        """
+        Selects the cores to be burned from the `cores_pct` information. Only the cores
+        this process is allowed to run on are considered and the number of cores is limited
+        by the CPU quota of the cgroup of this process.
+
+        Returns:
+            The CPUs to be burned
+        """
+        if hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:  # pragma: no cover
+            cpus = list(range(cpu_count()))
+
+        count = math.floor(self.cores_pct * len(cpus) / 100)
+
+        cgroup_cpu_limit = _get_cgroup_cpu_limit()
+        if cgroup_cpu_limit is not None:
+            count = min(count, math.ceil(cgroup_cpu_limit))
+
+        return cpus[:count]
+
     def effective_cpu_count(self) -> int:
         """
         Calculates the number of cores to be used from the cores_pct information
         Returns:
             number of cores that fits in the `cores_pct` percentage
         """
-        return math.floor(self.cores_pct * cpu_count() / 100)
+        return len(self.effective_cpus())
+
+    def target_cpu_pct(self, elapsed: float) -> float:
+        """
+        Calculates the target utilization of each core from the load `profile`
+
+        Args:
+            elapsed: Seconds elapsed since the start of the CPU burn
+
+        Returns:
+            Target utilization in percentage
+        """
+        if self.profile == LoadProfile.CONSTANT:
+            return self.cpu_pct
+
+        if self.profile == LoadProfile.SINE:
+            return (
+                self.cpu_pct * (1 - math.cos(2 * math.pi * elapsed / self.period)) / 2
+            )
+
+        ramp_duration = self.ramp_duration or self.duration / 2
+        if ramp_duration <= 0:
+            return self.cpu_pct
+
+        fraction = max(
+            min(elapsed / ramp_duration, (self.duration - elapsed) / ramp_duration, 1),
+            0,
+        )
+        if self.profile == LoadProfile.STEP:
+            fraction = math.ceil(fraction * self.steps) / self.steps
+        return self.cpu_pct * fraction
+
+
+def _get_cgroup_cpu_limit() -> Optional[float]:
+    """
+    Reads the CPU quota of the cgroup (v2 or v1) of this process.
+
+    Returns:
+        The number of CPUs worth of quota, None if there is no limit
+    """
+    try:
+        # cgroup v2 : "<quota> <period>" or "max <period>"
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # cgroup v1 : quota is -1 if there is no limit
+        quota = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text().strip()
+        period = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text().strip()
+        if int(quota) <= 0:
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        return None
 
 
 class CPUBurn(Agent):
+    """
+    Burns a set of cores with one worker process pinned to each of the cores. Each worker burns
+    the CPU for a fraction (the duty cycle) of every slice of `slice_ms`. The duty cycles are adjusted
+    every `CONTROL_INTERVAL` seconds from the utilization of the cores measured with psutil, so that the
+    utilization of each core, including the load not caused by this agent, is held at the target.
+    Without psutil, the duty cycle is set to the target utilization.
+    """
+
     _psutil = None
 
+    # Interval (in seconds) between two adjustments of the duty cycle
+    CONTROL_INTERVAL = 0.5
+
+    # Fraction of the error in utilization corrected in each adjustment
+    CONTROL_GAIN = 0.5
+
     @validate_arguments
     def __init__(self, config: CPUBurnConfig):
         super(CPUBurn, self).__init__(config)
@@ -80,6 +262,11 @@ class CPUBurn(Agent):
                 category=ImportWarning,
             )
 
+        self._cpus: List[int] = list()
+        self._duty_cycle: Optional[Sequence[float]] = None
+        self._workers: List[Process] = list()
+        self._target_cpu_pct = BuiltinUtils.Float.NAN
+
     def monitor(self) -> LifoQueue:
         # If `psutil` is installed, the agent will be able to monitor the system metrics within
         # the agent. If the `psutil` package is not installed, the agent will not able to monitor
@@ -94,7 +281,12 @@ class CPUBurn(Agent):
         self._status.put(
             AgentMonitoringDataPoint(
                 data=dict(
-                    cpu_count=self.config.effective_cpu_count(), cpu_usage=cpu_usage
+                    cpu_count=self.config.effective_cpu_count(),
+                    cpu_usage=cpu_usage,
+                    target_cpu_pct=self._target_cpu_pct,
+                    duty_cycle=(
+                        list(self._duty_cycle) if self._duty_cycle is not None else []
+                    ),
                 ),
                 state=self.current_state,
             )
@@ -105,17 +297,99 @@ class CPUBurn(Agent):
     def setup(self) -> None:
         super(CPUBurn, self).setup()
 
+    def _get_busy_times(self) -> Optional[List[Tuple[float, float]]]:
+        if self._psutil is None or not hasattr(self._psutil, "cpu_times"):
+            return None
+
+        cpu_times = self._psutil.cpu_times(percpu=True)
+        busy_times = list()
+        for cpu in self._cpus:
+            _times = cpu_times[cpu]
+            _idle = _times.idle + getattr(_times, "iowait", 0)
+            busy_times.append((sum(_times) - _idle, sum(_times)))
+        return busy_times
+
+    @classmethod
+    def _adjust_duty_cycle(
+        cls, duty_cycle: float, measured_cpu_pct: float, target_cpu_pct: float
+    ) -> float:
+        """
+        Integral controller to hold the measured utilization of a core at the target
+
+        Args:
+            duty_cycle: The current duty cycle of the core
+            measured_cpu_pct: Utilization of the core measured over the last interval
+            target_cpu_pct: Target utilization of the core
+
+        Returns:
+            The adjusted duty cycle
+        """
+        duty_cycle += cls.CONTROL_GAIN * (target_cpu_pct - measured_cpu_pct) / 100
+        return min(max(duty_cycle, 0.0), 1.0)
+
     @log_agent_lifecycle
     def run(self) -> None:
         super(CPUBurn, self).run()
-        end = datetime.now() + timedelta(seconds=self.config.duration)
+        start = datetime.now()
+        end = start + timedelta(seconds=self.config.duration)
 
-        if self.config.effective_cpu_count() == 0:
+        self._cpus = self.config.effective_cpus()
+        if not self._cpus:
             return
 
-        process_pool = Pool(self.config.effective_cpu_count())
-        process_pool.map_async(_burn, (end,) * self.config.effective_cpu_count())
+        self._target_cpu_pct = self.config.target_cpu_pct(0)
+        self._duty_cycle = Array(
+            "d", [self._target_cpu_pct / 100] * len(self._cpus), lock=False
+        )
+        self._workers = [
+            Process(
+                target=_burn,
+                args=(end, self._duty_cycle, index, self.config.slice_ms / 1000, cpu),
+                name=f"{self.config.name}_{cpu}",
+                daemon=True,
+            )
+            for index, cpu in enumerate(self._cpus)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        try:
+            busy_times = self._get_busy_times()
+            while not self.stop_async_run:
+                remaining = (end - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                time.sleep(min(self.CONTROL_INTERVAL, remaining))
+
+                self._target_cpu_pct = self.config.target_cpu_pct(
+                    (datetime.now() - start).total_seconds()
+                )
+                last_busy_times, busy_times = busy_times, self._get_busy_times()
+                for index in range(len(self._cpus)):
+                    if busy_times is None or last_busy_times is None:
+                        # Open loop without psutil
+                        self._duty_cycle[index] = self._target_cpu_pct / 100  # type: ignore
+                        continue
+
+                    busy = busy_times[index][0] - last_busy_times[index][0]
+                    total = busy_times[index][1] - last_busy_times[index][1]
+                    if total <= 0:
+                        continue
+                    self._duty_cycle[index] = self._adjust_duty_cycle(  # type: ignore
+                        self._duty_cycle[index],
+                        busy / total * 100,
+                        self._target_cpu_pct,
+                    )
+        finally:
+            self._stop_workers()
+
+    def _stop_workers(self):
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
 
     @log_agent_lifecycle
     def teardown(self) -> None:
         super(CPUBurn, self).teardown()
+        self._stop_workers()
@@ -1,11 +1,23 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import errno
 import math
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
 from pathlib import Path
 from queue import LifoQueue
-
-from pydantic import Field
+from threading import Lock
+from typing import List, Tuple
+
+from pydantic import (
+    ByteSize,
+    Field,
+    PositiveInt,
+    validate_arguments,
+    validator,
+)
 
 from ..agent import (
     Agent,
@@ -16,6 +28,21 @@ from ..agent import (
 from ..utils.annotations import log_agent_lifecycle
 
 
+class DiskFillStrategy(Enum):
+    """
+    Defines how the disk fill files are allocated
+    """
+
+    # Allocate the blocks of the files with fallocate, without writing any data
+    FALLOCATE = "fallocate"
+
+    # Write zeros to the files in chunks
+    WRITE = "write"
+
+    # Write a single byte at the end of the files. Creates sparse files on most filesystems
+    SPARSE = "sparse"
+
+
 class DiskFillConfig(TimedAgentConfig):
     """
     Defines the Disk Fill configuration to consume the disk space. The framework will
@@ -54,6 +81,26 @@ class DiskFillConfig(TimedAgentConfig):
         gt=1024,
     )
 
+    strategy: DiskFillStrategy = Field(
+        default=DiskFillStrategy.FALLOCATE,
+        description=(
+            "Allocation strategy of the disk fill files. `fallocate` allocates real blocks instantly, "
+            "`write` writes zeros to the files and `sparse` only sets the size of the files, which "
+            "does not consume the disk space on most filesystems. `fallocate` falls back to `write` "
+            "if the filesystem does not support it"
+        ),
+    )
+
+    write_chunk_size: ByteSize = Field(
+        default=ByteSize(1024 * 1024),
+        description="Size of each write in the `write` strategy. At least 4KiB",
+    )
+
+    writer_threads: PositiveInt = Field(
+        default=1,
+        description="Number of threads across which the disk fill files are spread",
+    )
+
     disk_fill_dir: str = Field(
         default="ychaos_diskfill",
         description=(
@@ -62,6 +109,12 @@ class DiskFillConfig(TimedAgentConfig):
         ),
     )
 
+    @validator("write_chunk_size")
+    def _validate_write_chunk_size(cls, v):
+        if v < 4096:
+            raise ValueError("write_chunk_size should be at least 4KiB")
+        return v
+
     def effective_disk_to_fill(self) -> int:
         """
         Calculates the disk space that needs to be filled based on the available space in the partition and
@@ -75,6 +128,19 @@ class DiskFillConfig(TimedAgentConfig):
 
 
 class DiskFill(Agent):
+    """
+    Fills the disk with files of up to `max_file_size` each, allocated with the configured
+    `strategy`. The files are spread across `writer_threads` threads.
+    """
+
+    @validate_arguments
+    def __init__(self, config: DiskFillConfig):
+        super(DiskFill, self).__init__(config)
+
+        self._lock = Lock()
+        self._zeros = b""
+        self.disk_space_filled = 0
+
     def monitor(self) -> LifoQueue:
         super(DiskFill, self).monitor()
         available_space = shutil.disk_usage(self.config.partition).free
@@ -83,6 +149,7 @@ class DiskFill(Agent):
             AgentMonitoringDataPoint(
                 data=dict(
                     disk_space_to_fill=self.config.effective_disk_to_fill(),
+                    disk_space_filled=self.disk_space_filled,
                     disk_free_space=available_space,
                 ),
                 state=self.current_state,
@@ -94,6 +161,47 @@ class DiskFill(Agent):
     def setup(self) -> None:
         super(DiskFill, self).setup()
 
+    def _filled(self, size: int) -> None:
+        with self._lock:
+            self.disk_space_filled += size
+
+    def _write(self, f, size: int) -> None:
+        zeros = memoryview(self._zeros)
+        offset = 0
+        while offset < size:
+            if self.stop_async_run:
+                break
+            written = f.write(zeros[: min(len(zeros), size - offset)])
+            if not written:
+                raise IOError(f"No data could be written to {f.name}")
+            offset += written
+            self._filled(written)
+
+    def _fill_file(self, file: Tuple[Path, int]) -> None:
+        path, size = file
+        if self.stop_async_run:
+            return
+
+        with open(path, "wb") as f:
+            if self.config.strategy == DiskFillStrategy.SPARSE:
+                f.seek(size - 1)
+                f.write(b"\0")
+                self._filled(size)
+                return
+
+            if self.config.strategy == DiskFillStrategy.FALLOCATE and hasattr(
+                os, "posix_fallocate"
+            ):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    self._filled(size)
+                    return
+                except OSError as e:
+                    if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+
+            self._write(f, size)
+
     @log_agent_lifecycle
     def run(self) -> None:
         super(DiskFill, self).run()
@@ -103,24 +211,31 @@ class DiskFill(Agent):
         disk_fill_dir = Path(self.config.partition / self.config.disk_fill_dir)
         disk_fill_dir.mkdir(parents=True, exist_ok=True)
 
+        files: List[Tuple[Path, int]] = list()
         space_remaining = size
-        index = 0
         while space_remaining > 0:
-            if self.stop_async_run:
-                break
-            tmp = space_remaining
-            cur_file_size = self.config.max_file_size
+            files.append(
+                (
+                    disk_fill_dir / f"filler{len(files)}.txt",
+                    min(space_remaining, self.config.max_file_size),
+                )
+            )
             space_remaining -= self.config.max_file_size
-            if space_remaining <= 0:
-                cur_file_size = tmp
-            with open(disk_fill_dir / f"filler{index}.txt", "wb") as f:
-                f.seek(cur_file_size - 1)
-                f.write(b"\0")
-            index += 1
+
+        # A single zero buffer is reused for all the writes of all the threads
+        self._zeros = bytes(min(int(self.config.write_chunk_size), size))
+
+        with ThreadPoolExecutor(
+            max_workers=self.config.writer_threads,
+            thread_name_prefix=self.config.name,
+        ) as executor:
+            # Consume the results to raise the errors from the threads
+            list(executor.map(self._fill_file, files))
 
     @log_agent_lifecycle
     def teardown(self) -> None:
         super(DiskFill, self).teardown()
+        self.disk_space_filled = 0
         tmp_dir = self.config.partition / self.config.disk_fill_dir
         if tmp_dir.exists():
             shutil.rmtree(tmp_dir)
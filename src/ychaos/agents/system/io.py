@@ -0,0 +1,364 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import errno
+import mmap
+import os
+import random
+import shutil
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from queue import LifoQueue
+from threading import Lock, Thread
+from typing import List, Optional
+
+from pydantic import (
+    ByteSize,
+    Field,
+    PositiveInt,
+    validate_arguments,
+    validator,
+)
+
+from ...utils.histogram import LatencyHistogram
+from ..agent import (
+    Agent,
+    AgentMonitoringDataPoint,
+    AgentPriority,
+    AgentState,
+    TimedAgentConfig,
+)
+from ..utils.annotations import log_agent_lifecycle
+
+__all__ = ["IOStressConfig", "IOStress"]
+
+
+class IOStressConfig(TimedAgentConfig):
+    """
+    Defines the I/O Stress configuration to generate a sustained read/write load on a disk.
+    The framework writes a file of `file_size` bytes in `directory` and then reads and writes
+    blocks of `block_size` from it, in the mix defined by `read_pct` and `random_pct`, for the `duration`.
+
+    The load is generated as fast as the disk allows, unless limited by `iops` or `bandwidth`.
+    """
+
+    name = "io_stress"
+    description = "This agent generates read and write load on a disk."
+
+    priority = AgentPriority.MODERATE_PRIORITY
+
+    directory: Path = Field(
+        default=Path(tempfile.gettempdir()),
+        description="Directory on the disk to stress, in which the I/O stress file is written",
+        examples=["/var/tmp", "/home/tmpuser"],
+    )
+
+    file_size: ByteSize = Field(
+        default=ByteSize(1024 * 1024 * 1024),
+        description="Size of the file on which the I/O is performed",
+        examples=["1GiB", "512MB"],
+    )
+
+    block_size: ByteSize = Field(
+        default=ByteSize(4096),
+        description=(
+            "Size of each read and write. Must be a multiple of 512 bytes. Direct I/O "
+            "also needs a multiple of the filesystem block size, and at least 4096 bytes"
+        ),
+        examples=["4KiB", "1MiB"],
+    )
+
+    read_pct: float = Field(
+        default=50,
+        description="Percentage of the operations that are reads. The rest of the operations are writes",
+        ge=0,
+        le=100,
+    )
+
+    random_pct: float = Field(
+        default=100,
+        description="Percentage of the operations on a random block. The rest of the operations are sequential",
+        ge=0,
+        le=100,
+    )
+
+    iops: Optional[PositiveInt] = Field(
+        default=None,
+        description="Target number of operations per second across all the workers",
+    )
+
+    bandwidth: Optional[ByteSize] = Field(
+        default=None,
+        description="Target bytes read and written per second across all the workers",
+        examples=["50MiB"],
+    )
+
+    direct: bool = Field(
+        default=False,
+        description=(
+            "Bypass the page cache with direct I/O (O_DIRECT). Falls back to buffered I/O "
+            "if the filesystem does not support direct I/O"
+        ),
+    )
+
+    fsync_every: int = Field(
+        default=0,
+        description="Number of writes after which the file is synced to the disk with fsync. 0 never syncs the file",
+        ge=0,
+    )
+
+    workers: PositiveInt = Field(
+        default=1, description="Number of threads performing the I/O concurrently"
+    )
+
+    @validator("block_size")
+    def _validate_block_size(cls, v, values):
+        if v <= 0 or v % 512 != 0:
+            raise ValueError("block_size must be a multiple of 512 bytes")
+        if "file_size" in values and v > values["file_size"]:
+            raise ValueError("block_size must not be larger than file_size")
+        return v
+
+    def effective_iops(self) -> Optional[float]:
+        """
+        Calculates the operations per second to target from `iops` and `bandwidth`.
+
+        Returns:
+            The lower of the two rates, None if neither is configured
+        """
+        rates = list()
+        if self.iops is not None:
+            rates.append(float(self.iops))
+        if self.bandwidth is not None:
+            rates.append(self.bandwidth / self.block_size)
+        return min(rates) if rates else None
+
+
+class IOStress(Agent):
+    """
+    Generates disk contention with `workers` threads performing reads and writes of `block_size`
+    on a file written in full at the start of the run, so that every operation hits allocated blocks.
+    The file is dropped from the page cache before the stress so that the reads reach the disk.
+    The `duration` of the stress starts once the file is written.
+
+    An error in any of the workers (e.g. ENOSPC or EIO) stops all the workers, is put on
+    the `exception` queue and moves the agent to the ERROR state.
+
+    Each operation is timed and recorded in a latency histogram, from which the percentiles
+    are reported by `monitor()` along with the achieved throughput. The time taken by fsync
+    is included in the latency of the write after which the file is synced.
+    """
+
+    # Size of the writes used to fill the file before the stress
+    FILL_CHUNK_SIZE = 1 << 20
+
+    # Minimum alignment of the offsets and sizes of direct I/O. Disks with 4K
+    # sectors reject direct I/O that is only aligned to 512 bytes
+    DIRECT_IO_ALIGNMENT = 4096
+
+    LATENCY_PERCENTILES = (50, 90, 99)
+
+    IO_STRESS_FILE = "iostress"
+
+    @validate_arguments
+    def __init__(self, config: IOStressConfig):
+        super(IOStress, self).__init__(config)
+
+        self._lock = Lock()
+        self._read_latency = LatencyHistogram()
+        self._write_latency = LatencyHistogram()
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+        self._io_stress_dir: Optional[Path] = None
+        self._workers: List[Thread] = list()
+        self._start: Optional[float] = None
+        self._end: Optional[float] = None
+        self._stopped: Optional[float] = None
+
+    def monitor(self) -> LifoQueue:
+        super(IOStress, self).monitor()
+
+        with self._lock:
+            elapsed = 0.0
+            if self._start is not None:
+                elapsed = (self._stopped or time.monotonic()) - self._start
+
+            data = dict(
+                elapsed=elapsed,
+                read_mbps=self.bytes_read / elapsed / 1e6 if elapsed else 0.0,
+                write_mbps=self.bytes_written / elapsed / 1e6 if elapsed else 0.0,
+                iops=(
+                    (self._read_latency.count + self._write_latency.count) / elapsed
+                    if elapsed
+                    else 0.0
+                ),
+                read_latency=self._read_latency.summary(self.LATENCY_PERCENTILES),
+                write_latency=self._write_latency.summary(self.LATENCY_PERCENTILES),
+            )
+
+        self._status.put(AgentMonitoringDataPoint(data=data, state=self.current_state))
+        return self._status
+
+    @log_agent_lifecycle
+    def setup(self) -> None:
+        super(IOStress, self).setup()
+        self._io_stress_dir = Path(
+            tempfile.mkdtemp(prefix="ychaos_iostress_", dir=self.config.directory)
+        )
+
+    def _fill(self, path: Path) -> None:
+        chunk = os.urandom(self.FILL_CHUNK_SIZE)
+        remaining = int(self.config.file_size)
+        with open(path, "wb") as f:
+            while remaining > 0:
+                if self.stop_async_run:
+                    return
+                remaining -= f.write(chunk[: min(remaining, len(chunk))])
+            f.flush()
+            os.fsync(f.fileno())
+
+            if hasattr(os, "posix_fadvise"):
+                # Drop the file from the page cache, so that the reads reach the disk
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+    def _direct_io_alignment(self, path: Path) -> int:
+        return max(self.DIRECT_IO_ALIGNMENT, os.statvfs(path).f_bsize)
+
+    def _open(self, path: Path) -> int:
+        flags = os.O_RDWR
+        if self.config.direct:
+            if self.config.block_size % self._direct_io_alignment(path) == 0:
+                try:
+                    return os.open(path, flags | os.O_DIRECT)
+                except (AttributeError, OSError) as e:
+                    if isinstance(e, OSError) and e.errno != errno.EINVAL:
+                        raise
+                    warnings.warn(
+                        "Direct I/O is not supported on this platform or filesystem. Falling back to buffered I/O",
+                        category=RuntimeWarning,
+                    )
+            else:
+                warnings.warn(
+                    "block_size is not a multiple of the direct I/O alignment of the filesystem. "
+                    "Falling back to buffered I/O",
+                    category=RuntimeWarning,
+                )
+        return os.open(path, flags)
+
+    def _work(self, fd: int, index: int, rate: Optional[float]) -> None:
+        try:
+            self._stress(fd, index, rate)
+        except Exception as e:
+            # Stops the other workers as well
+            self.exception.put(e)
+
+    def _stress(self, fd: int, index: int, rate: Optional[float]) -> None:
+        assert self._end is not None  # For mypy
+
+        block_size = int(self.config.block_size)
+        blocks = int(self.config.file_size) // block_size
+
+        # Anonymous memory maps are page aligned, as required by direct I/O
+        buffer = mmap.mmap(-1, block_size)
+        buffer.write(os.urandom(block_size))
+
+        rng = random.Random()
+        cursor = index * blocks // self.config.workers
+        operations = 0
+        writes = 0
+        start = time.monotonic()
+        try:
+            while (
+                not self.stop_async_run
+                and self.exception.empty()
+                and time.monotonic() < self._end
+            ):
+                if rng.random() * 100 < self.config.random_pct:
+                    block = rng.randrange(blocks)
+                else:
+                    block = cursor
+                cursor = (block + 1) % blocks
+
+                is_read = rng.random() * 100 < self.config.read_pct
+                operation_start = time.perf_counter()
+                if is_read:
+                    size = os.preadv(fd, [buffer], block * block_size)
+                else:
+                    size = os.pwrite(fd, buffer, block * block_size)
+                    writes += 1
+                    if (
+                        self.config.fsync_every
+                        and writes % self.config.fsync_every == 0
+                    ):
+                        os.fsync(fd)
+                latency = (time.perf_counter() - operation_start) * 1000
+
+                with self._lock:
+                    if is_read:
+                        self._read_latency.record(latency)
+                        self.bytes_read += size
+                    else:
+                        self._write_latency.record(latency)
+                        self.bytes_written += size
+
+                operations += 1
+                if rate:
+                    # Sleep until the time at which the next operation is due
+                    time.sleep(
+                        max(
+                            min(
+                                start + operations / rate - time.monotonic(),
+                                self._end - time.monotonic(),
+                            ),
+                            0,
+                        )
+                    )
+        finally:
+            buffer.close()
+
+    @log_agent_lifecycle
+    def run(self) -> None:
+        super(IOStress, self).run()
+        assert self._io_stress_dir is not None  # For mypy
+        path = self._io_stress_dir / self.IO_STRESS_FILE
+
+        self._fill(path)
+        if self.stop_async_run:
+            return
+
+        rate = self.config.effective_iops()
+        fds = [self._open(path) for _ in range(self.config.workers)]
+        try:
+            self._start = time.monotonic()
+            self._end = self._start + self.config.duration
+            self._workers = [
+                Thread(
+                    target=self._work,
+                    args=(fd, index, rate / self.config.workers if rate else None),
+                    name=f"{self.config.name}_{index}",
+                    daemon=True,
+                )
+                for index, fd in enumerate(fds)
+            ]
+            for worker in self._workers:
+                worker.start()
+            for worker in self._workers:
+                worker.join()
+        finally:
+            self._stopped = time.monotonic()
+            for fd in fds:
+                os.close(fd)
+
+        if not self.exception.empty():
+            self.advance_state(AgentState.ERROR)
+
+    @log_agent_lifecycle
+    def teardown(self) -> None:
+        super(IOStress, self).teardown()
+        for worker in self._workers:
+            worker.join()
+
+        if self._io_stress_dir is not None and self._io_stress_dir.exists():
+            shutil.rmtree(self._io_stress_dir)
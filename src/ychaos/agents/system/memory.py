@@ -0,0 +1,226 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from enum import Enum
+from pathlib import Path
+from queue import LifoQueue
+from typing import List, Optional
+
+from pydantic import ByteSize, Field, validate_arguments
+
+from ...utils.builtins import BuiltinUtils
+from ...utils.dependency import DependencyUtils
+from ..agent import (
+    Agent,
+    AgentMonitoringDataPoint,
+    AgentPriority,
+    TimedAgentConfig,
+)
+from ..utils.annotations import log_agent_lifecycle
+
+__all__ = ["MemoryFillConfig", "MemoryFill", "MemoryFillMode"]
+
+
+class MemoryFillMode(Enum):
+    """
+    Defines the kind of memory filled by the Memory Fill agent
+    """
+
+    # Anonymous memory of the agent process
+    ANONYMOUS = "anonymous"
+
+    # Anonymous memory backed by transparent hugepages
+    HUGEPAGES = "hugepages"
+
+    # Page cache of the files written by the agent
+    PAGE_CACHE = "page_cache"
+
+
+class MemoryFillConfig(TimedAgentConfig):
+    """
+    Defines the Memory Fill configuration to consume the memory of the system. The framework
+    allocates and touches memory up to `memory_size` bytes, or `memory_pct` percent of the total memory
+    of the system when `memory_size` is not configured, at a rate of `rate` bytes per second.
+    The memory is held until the `duration` elapses and is released on teardown.
+    """
+
+    name = "memory_fill"
+    description = "This agent consumes the memory of the system."
+
+    priority = AgentPriority.MODERATE_PRIORITY
+
+    memory_pct: float = Field(
+        default=80,
+        description="Percentage of the total memory of the system to fill",
+        gt=0,
+        le=100,
+    )
+
+    memory_size: Optional[ByteSize] = Field(
+        default=None,
+        description="Size of the memory to fill. Overrides `memory_pct` when configured",
+        examples=["512MiB", "4GB", 1073741824],
+    )
+
+    rate: Optional[ByteSize] = Field(
+        default=None,
+        description="Bytes of memory filled per second. The memory is filled as fast as possible if not configured",
+        examples=["100MiB"],
+    )
+
+    chunk_size: ByteSize = Field(
+        default=ByteSize(64 * 1024 * 1024),
+        description="Size of each of the memory mapped buffers allocated",
+    )
+
+    mode: MemoryFillMode = Field(
+        default=MemoryFillMode.ANONYMOUS,
+        description=(
+            "Kind of memory to fill. `anonymous` fills the memory of the agent process, `hugepages` "
+            "requests transparent hugepages for it and `page_cache` fills the page cache by writing files"
+        ),
+    )
+
+    page_cache_dir: Path = Field(
+        default=Path(tempfile.gettempdir()),
+        description="Directory in which the files are written in the `page_cache` mode",
+    )
+
+    def effective_memory_to_fill(self) -> int:
+        """
+        Calculates the memory to be filled from `memory_size` or `memory_pct` of the total memory.
+
+        Returns:
+            Memory to fill in bytes
+        """
+        if self.memory_size is not None:
+            return int(self.memory_size)
+
+        total_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        return math.floor(self.memory_pct / 100 * total_memory)
+
+
+class MemoryFill(Agent):
+    """
+    Fills the memory with memory mapped buffers of `chunk_size` and writes to each of their pages,
+    so that the memory is actually allocated by the kernel. Closing the buffers on teardown releases the
+    memory immediately. In the `page_cache` mode, the buffers are mapped to files in the `page_cache_dir`,
+    that are removed on teardown.
+    """
+
+    _psutil = None
+
+    @validate_arguments
+    def __init__(self, config: MemoryFillConfig):
+        super(MemoryFill, self).__init__(config)
+
+        self._psutil = DependencyUtils.import_module("psutil", raise_error=False)
+
+        if self._psutil is None:
+            warnings.warn(
+                "psutil is not installed. The agent cannot monitor the metrics related to the system."
+                "You can install psutil if you are interested in getting the system data",
+                category=ImportWarning,
+            )
+
+        self._buffers: List[mmap.mmap] = list()
+        self._page_cache_dir: Optional[Path] = None
+        self.memory_filled = 0
+
+    def monitor(self) -> LifoQueue:
+        super(MemoryFill, self).monitor()
+
+        rss = BuiltinUtils.Float.NAN
+        available_memory = BuiltinUtils.Float.NAN
+        if self._psutil is not None:
+            rss = self._psutil.Process().memory_info().rss
+            available_memory = self._psutil.virtual_memory().available
+
+        self._status.put(
+            AgentMonitoringDataPoint(
+                data=dict(
+                    memory_to_fill=self.config.effective_memory_to_fill(),
+                    memory_filled=self.memory_filled,
+                    rss=rss,
+                    available_memory=available_memory,
+                ),
+                state=self.current_state,
+            )
+        )
+        return self._status
+
+    @log_agent_lifecycle
+    def setup(self) -> None:
+        super(MemoryFill, self).setup()
+
+    def _allocate(self, size: int) -> mmap.mmap:
+        if self.config.mode == MemoryFillMode.PAGE_CACHE:
+            assert self._page_cache_dir is not None  # For mypy
+            with open(self._page_cache_dir / f"filler{len(self._buffers)}", "w+b") as f:
+                f.truncate(size)
+                buffer = mmap.mmap(f.fileno(), size)
+        else:
+            buffer = mmap.mmap(-1, size)
+            if self.config.mode == MemoryFillMode.HUGEPAGES and hasattr(
+                mmap, "MADV_HUGEPAGE"
+            ):
+                buffer.madvise(mmap.MADV_HUGEPAGE)
+
+        # Touch every page of the buffer so that the memory is actually allocated
+        buffer[:: mmap.PAGESIZE] = b"\x01" * math.ceil(size / mmap.PAGESIZE)
+        return buffer
+
+    @log_agent_lifecycle
+    def run(self) -> None:
+        super(MemoryFill, self).run()
+        start = time.monotonic()
+        end = start + self.config.duration
+
+        size = self.config.effective_memory_to_fill()
+        if self.config.mode == MemoryFillMode.PAGE_CACHE:
+            self._page_cache_dir = Path(
+                tempfile.mkdtemp(
+                    prefix="ychaos_memoryfill_", dir=self.config.page_cache_dir
+                )
+            )
+
+        chunk_size = int(self.config.chunk_size)
+        if self.config.rate:
+            # Smaller chunks, filled in about 100ms each, for a steady rate
+            chunk_size = min(chunk_size, max(self.config.rate // 10, mmap.PAGESIZE))
+
+        while self.memory_filled < size and not self.stop_async_run:
+            chunk = min(chunk_size, size - self.memory_filled)
+            self._buffers.append(self._allocate(chunk))
+            self.memory_filled += chunk
+
+            if self.config.rate:
+                # Sleep until the time at which the memory filled so far is due
+                time.sleep(
+                    max(
+                        start
+                        + self.memory_filled / self.config.rate
+                        - time.monotonic(),
+                        0,
+                    )
+                )
+
+        # Hold the memory until the duration elapses
+        while not self.stop_async_run and time.monotonic() < end:
+            time.sleep(max(min(0.1, end - time.monotonic()), 0))
+
+    @log_agent_lifecycle
+    def teardown(self) -> None:
+        super(MemoryFill, self).teardown()
+        while self._buffers:
+            self._buffers.pop().close()
+        self.memory_filled = 0
+
+        if self._page_cache_dir is not None and self._page_cache_dir.exists():
+            shutil.rmtree(self._page_cache_dir)
@@ -1,18 +1,29 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import json
+import os
+import re
+import socket
+import ssl
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatch
+from ipaddress import ip_address
 from pathlib import Path
 from queue import LifoQueue
-from socket import gaierror, timeout
+from threading import Lock
 from types import SimpleNamespace
-from typing import List, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
 
 from pydantic import (
     AnyHttpUrl,
     BaseModel,
+    DirectoryPath,
     Field,
     FilePath,
+    PositiveInt,
+    root_validator,
     validate_arguments,
     validator,
 )
@@ -22,8 +33,8 @@ from ...utils.dependency import DependencyUtils
 from ..agent import Agent, AgentConfig, AgentMonitoringDataPoint, AgentPriority
 from ..utils.annotations import log_agent_lifecycle
 
-(X509,) = DependencyUtils.import_from(
-    "OpenSSL.crypto", ("X509",), raise_error=False, warn=False
+X509, CryptoError = DependencyUtils.import_from(
+    "OpenSSL.crypto", ("X509", "Error"), raise_error=False, warn=False
 )
 
 pyopenssl = DependencyUtils.import_module(
@@ -49,8 +60,31 @@ class ServerCertValidationConfig(AgentConfig):
         default=5, description="Default timeout to fetch the certificates in seconds"
     )
 
+    concurrency: PositiveInt = Field(
+        default=16,
+        description="Maximum number of servers from which the certificates are fetched concurrently",
+    )
+
+
+# Errors of fetching and loading the certificate of a server, recorded as the error of that server.
+# Includes the timeouts, the name resolution and the TLS errors (OSError) and the certificates
+# that cannot be loaded (OpenSSL.crypto.Error)
+SERVER_CERT_ERRORS: Tuple[Type[Exception], ...] = (OSError,) + (
+    (CryptoError,) if CryptoError is not None else ()
+)
+
 
 class ServerCertValidation(Agent):
+    """
+    Fetches the certificates of the servers concurrently, with up to `concurrency` connections
+    at a time. The certificate of each server (host and port) is fetched once, with a single connection,
+    irrespective of the number of URLs of that server. The hostname is sent in the TLS handshake (SNI),
+    so that the certificate served for that hostname is validated.
+
+    The certificates are fetched without verifying them, so that the expired certificates
+    are reported as well. One data point is recorded for each of the URLs, in the order of `urls`.
+    """
+
     @validate_arguments
     def __init__(self, config: ServerCertValidationConfig):
         super(ServerCertValidation, self).__init__(config)
@@ -65,47 +99,86 @@ class ServerCertValidation(Agent):
 
     @staticmethod
     def get_server_cert(host: str, port: int, timeout_=5):
-        from socket import setdefaulttimeout
+        """
+        Fetches the certificate of a server. The timeout applies only to this connection.
 
-        setdefaulttimeout(timeout_)
+        Args:
+            host: Hostname of the server, also sent in the TLS handshake (SNI) if not an IP address
+            port: Port of the server
+            timeout_: Timeout of the connection and the handshake in seconds
 
+        Raises:
+            ssl.SSLError: when the server does not present a certificate
+
+        Returns:
+            The certificate of the server
+        """
         assert pyopenssl is not None
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+        try:
+            ip_address(host)
+            server_hostname = None
+        except ValueError:
+            server_hostname = host
+
+        with socket.create_connection((host, port), timeout=timeout_) as sock:
+            with context.wrap_socket(sock, server_hostname=server_hostname) as tls:
+                der = tls.getpeercert(binary_form=True)
+
+        if der is None:
+            raise ssl.SSLError(f"{host}:{port} did not present a certificate")
+
         return pyopenssl.OpenSSL.crypto.load_certificate(
-            pyopenssl.OpenSSL.crypto.FILETYPE_PEM,
-            pyopenssl.ssl.get_server_certificate((host, port)),
+            pyopenssl.OpenSSL.crypto.FILETYPE_ASN1, der
         )
 
+    def _validate_server(self, server: Tuple[str, int]) -> Dict:
+        host, port = server
+        data: Dict = dict(error=None)
+        try:
+            cert = self.get_server_cert(host, port, timeout_=self.config.timeout)
+            cert_expiry_date = datetime.strptime(
+                cert.get_notAfter().decode("ascii"), "%Y%m%d%H%M%SZ"
+            )
+            cert_expiry_date.replace(tzinfo=timezone.utc)
+
+            data.update(
+                dict(
+                    not_valid_after=cert_expiry_date,
+                    is_expired=datetime.utcnow() >= cert_expiry_date,
+                    is_critical=datetime.utcnow() + self.config.expiry_threshold
+                    >= cert_expiry_date,
+                )
+            )
+        except SERVER_CERT_ERRORS as error:
+            data.update(error=str(error.__class__.__name__))
+        return data
+
     @log_agent_lifecycle
     def run(self) -> None:
+        servers: List[Tuple[str, int]] = list()
         for url in self.config.urls:
             if url.port is None:
                 url.port = "443"
+            servers.append((url.host, int(url.port)))
+
+        unique_servers = list(dict.fromkeys(servers))
+        with ThreadPoolExecutor(
+            max_workers=min(self.config.concurrency, len(unique_servers)),
+            thread_name_prefix=self.config.name,
+        ) as executor:
+            results = dict(
+                zip(unique_servers, executor.map(self._validate_server, unique_servers))
+            )
 
-            data = dict(host=url.host, port=int(url.port), error=None)
-
-            try:
-                cert = self.get_server_cert(
-                    url.host, int(url.port), timeout_=self.config.timeout
-                )
-                cert_expiry_date = datetime.strptime(
-                    cert.get_notAfter().decode("ascii"), "%Y%m%d%H%M%SZ"
-                )
-                cert_expiry_date.replace(tzinfo=timezone.utc)
-
-                data.update(
-                    dict(
-                        not_valid_after=cert_expiry_date,
-                        is_expired=datetime.utcnow() >= cert_expiry_date,
-                        is_critical=datetime.utcnow() + self.config.expiry_threshold
-                        >= cert_expiry_date,
-                    )
-                )
-            except (timeout, gaierror) as error:
-                data.update(error=str(error.__class__.__name__))
-
+        for host, port in servers:
             self._status.put(
                 AgentMonitoringDataPoint(
-                    data=data,
+                    data=dict(host=host, port=port, **results[(host, port)]),
                     state=self.current_state,
                 )
             )
@@ -144,6 +217,23 @@ class CertificateFileConfig(BaseModel):
     )
 
 
+class CertificateDirectoryConfig(BaseModel):
+    path: DirectoryPath = Field(
+        ..., description="Path to the directory containing the certificate files"
+    )
+    patterns: List[str] = Field(
+        default=["*.pem", "*.crt", "*.cer", "*.der"],
+        description="Glob patterns of the names of the certificate files in the directory",
+    )
+    recursive: bool = Field(
+        default=True, description="Include the certificate files in the subdirectories"
+    )
+    type: Optional[CertificateFileType] = Field(
+        default=None,
+        description="Type of the certificate files. Detected from the content of each file if not configured",
+    )
+
+
 class CertificateFileValidationConfig(AgentConfig):
     name = "cert_file_validation"
     desc = "This agent decodes the local certificates and validates for expiry/critical"
@@ -156,7 +246,26 @@ class CertificateFileValidationConfig(AgentConfig):
     paths: List[Union[FilePath, CertificateFileConfig]] = Field(
         default=list(),
         description="List of Certificate files to be validated",
-        min_items=1,
+    )
+
+    directories: List[Union[DirectoryPath, CertificateDirectoryConfig]] = Field(
+        default=list(),
+        description="List of directories in which the certificate files are validated",
+        examples=[["/etc/ssl/certs", {"path": "/etc/secrets", "patterns": ["*.pem"]}]],
+    )
+
+    workers: PositiveInt = Field(
+        default=8, description="Number of threads decoding the certificate files"
+    )
+
+    cache_file: Optional[Path] = Field(
+        default=None,
+        description=(
+            "JSON file in which the expiry dates decoded from each certificate file are cached between the runs. "
+            "The certificate files that have not changed since the previous run are not decoded again. "
+            "Not cached if not configured"
+        ),
+        examples=["~/.cache/ychaos/certificates.json"],
     )
 
     @validator("paths", each_item=True)
@@ -165,8 +274,53 @@ class CertificateFileValidationConfig(AgentConfig):
             return CertificateFileConfig(path=v)
         return v
 
+    @validator("directories", each_item=True)
+    def parse_directories(cls, v, values):
+        if isinstance(v, Path):
+            return CertificateDirectoryConfig(path=v)
+        return v
+
+    @root_validator(skip_on_failure=True)
+    def _validate_certificates(cls, values):
+        if not values["paths"] and not values["directories"]:
+            raise ValueError("At least one of paths or directories must be configured")
+        return values
+
+
+class _DecodedFile(NamedTuple):
+    type: CertificateFileType
+    expiry_dates: List[datetime]
+    error: Optional[str]
+
 
 class CertificateFileValidation(Agent):
+    """
+    Decodes the certificate files in `paths` and in the `directories`, and records one data point
+    for each of the certificates, so that each of the certificates in a PEM bundle is validated.
+    The files are decoded in parallel by `workers` threads.
+
+    With a `cache_file`, the expiry dates decoded from each file are cached in the `cache_file`, keyed by
+    the inode, modification time and size of the file, and the unchanged files are not decoded again
+    by the subsequent runs. The cache file is replaced atomically at the end of each run, and holds only
+    the files of that run. A file reachable through multiple paths (hard links or symbolic links) is
+    decoded only once per run.
+    """
+
+    # Changing the cached data requires a new cache format
+    CACHE_FORMAT = 1
+
+    _PEM_CERTIFICATE = re.compile(
+        rb"-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----", re.DOTALL
+    )
+
+    @validate_arguments
+    def __init__(self, config: CertificateFileValidationConfig):
+        super(CertificateFileValidation, self).__init__(config)
+        self._lock = Lock()
+        self._cache: Dict[str, Tuple[List[Any], _DecodedFile]] = dict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def monitor(self) -> LifoQueue:
         super(CertificateFileValidation, self).monitor()
         return self._status
@@ -175,44 +329,203 @@ class CertificateFileValidation(Agent):
     def setup(self) -> None:
         super(CertificateFileValidation, self).setup()
 
-    @log_agent_lifecycle
-    def run(self) -> None:
-        super(CertificateFileValidation, self).run()
-        for cert_path_config in self.config.paths:
-            data = dict(
-                path=str(cert_path_config.path),
-                type=cert_path_config.type.value,
-                error=None,
-            )
+    def _files(self) -> List[Tuple[Path, CertificateFileType, os.stat_result]]:
+        files = list()
+        visited = set()
+
+        def _add(path: Path, type_: Optional[CertificateFileType]):
             try:
-                assert pyopenssl is not None
-                cert = pyopenssl.OpenSSL.crypto.load_certificate(
-                    cert_path_config.type.binder(),
-                    cert_path_config.path.read_bytes(),
-                )
+                stat = path.stat()
+            except OSError:
+                stat = None
+            else:
+                if (stat.st_dev, stat.st_ino) in visited:
+                    return
+                visited.add((stat.st_dev, stat.st_ino))
+            files.append((path, type_, stat))
 
-                cert_expiry_date = datetime.strptime(
-                    cert.get_notAfter().decode("ascii"), "%Y%m%d%H%M%SZ"
-                )
-                cert_expiry_date.replace(tzinfo=timezone.utc)
-
-                data.update(
-                    dict(
-                        not_valid_after=cert_expiry_date,
-                        is_expired=datetime.utcnow() >= cert_expiry_date,
-                        is_critical=datetime.utcnow() + self.config.expiry_threshold
-                        >= cert_expiry_date,
+        for cert_path_config in self.config.paths:
+            _add(cert_path_config.path, cert_path_config.type)
+
+        for directory in self.config.directories:
+            for root, dirs, names in os.walk(directory.path):
+                if not directory.recursive:
+                    dirs.clear()
+                dirs.sort()
+                for name in sorted(names):
+                    if any(fnmatch(name, pattern) for pattern in directory.patterns):
+                        _add(Path(root) / name, directory.type)
+
+        return files
+
+    def _decode(self, content: bytes, type_: CertificateFileType) -> _DecodedFile:
+        assert pyopenssl is not None
+        blocks = [content]
+        if type_ == CertificateFileType.PEM:
+            blocks = self._PEM_CERTIFICATE.findall(content)
+            if not blocks:
+                return _DecodedFile(type_, list(), "decoding_error")
+
+        expiry_dates = list()
+        try:
+            for block in blocks:
+                cert = pyopenssl.OpenSSL.crypto.load_certificate(type_.binder(), block)
+                expiry_dates.append(
+                    datetime.strptime(
+                        cert.get_notAfter().decode("ascii"), "%Y%m%d%H%M%SZ"
                     )
                 )
-            except pyopenssl.OpenSSL.crypto.Error:  # type: ignore
-                data.update(error="decoding_error")
+        except pyopenssl.OpenSSL.crypto.Error:  # type: ignore
+            return _DecodedFile(type_, list(), "decoding_error")
+        return _DecodedFile(type_, expiry_dates, None)
+
+    def _decode_file(
+        self,
+        path: Path,
+        type_: Optional[CertificateFileType],
+        stat: Optional[os.stat_result],
+    ) -> _DecodedFile:
+        if stat is None:
+            return _DecodedFile(type_ or CertificateFileType.PEM, list(), "read_error")
+
+        key = [
+            stat.st_ino,
+            stat.st_mtime_ns,
+            stat.st_size,
+            type_.value if type_ is not None else None,
+        ]
+        with self._lock:
+            cached = self._cache.get(str(path))
+            if cached is not None and cached[0] == key:
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return _DecodedFile(type_ or CertificateFileType.PEM, list(), "read_error")
+
+        if type_ is None:
+            type_ = (
+                CertificateFileType.PEM
+                if b"-----BEGIN" in content
+                else CertificateFileType.ASN1
+            )
 
-            self._status.put(
-                AgentMonitoringDataPoint(
-                    data=data,
-                    state=self.current_state,
+        decoded = self._decode(content, type_)
+        with self._lock:
+            self._cache[str(path)] = (key, decoded)
+        return decoded
+
+    def _load_cache(self) -> Dict[str, Tuple[List[Any], _DecodedFile]]:
+        if self.config.cache_file is None:
+            return dict()
+
+        try:
+            with open(self.config.cache_file.expanduser(), "r") as fp:
+                data = json.load(fp)
+            if data["format"] != self.CACHE_FORMAT:
+                return dict()
+            return {
+                path: (
+                    entry["key"],
+                    _DecodedFile(
+                        CertificateFileType(entry["type"]),
+                        [
+                            datetime.fromisoformat(expiry_date)
+                            for expiry_date in entry["expiry_dates"]
+                        ],
+                        entry["error"],
+                    ),
                 )
-            )
+                for path, entry in data["files"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return dict()
+
+    def _save_cache(self) -> None:
+        if self.config.cache_file is None:
+            return
+
+        path = self.config.cache_file.expanduser()
+        with self._lock:
+            files = {
+                _path: dict(
+                    key=key,
+                    type=decoded.type.value,
+                    expiry_dates=[
+                        expiry_date.isoformat() for expiry_date in decoded.expiry_dates
+                    ],
+                    error=decoded.error,
+                )
+                for _path, (key, decoded) in self._cache.items()
+            }
+
+        # Replaced atomically, so that a concurrent run reads either the previous or the new cache
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "w") as fp:
+                json.dump(dict(format=self.CACHE_FORMAT, files=files), fp)
+            os.replace(temp_path, path)
+        except OSError:
+            # The cache is an optimization. The validation does not fail on its account
+            if temp_path.exists():
+                temp_path.unlink()
+
+    @log_agent_lifecycle
+    def run(self) -> None:
+        super(CertificateFileValidation, self).run()
+        files = self._files()
+
+        # Only the files of this run are cached
+        cache = self._load_cache()
+        with self._lock:
+            self._cache = {
+                str(path): cache[str(path)]
+                for path, _, _ in files
+                if str(path) in cache
+            }
+
+        with ThreadPoolExecutor(
+            max_workers=self.config.workers, thread_name_prefix=self.config.name
+        ) as executor:
+            decoded_files = executor.map(lambda file: self._decode_file(*file), files)
+
+            for (path, _, _), decoded in zip(files, decoded_files):
+                if decoded.error is not None:
+                    self._status.put(
+                        AgentMonitoringDataPoint(
+                            data=dict(
+                                path=str(path),
+                                type=decoded.type.value,
+                                error=decoded.error,
+                            ),
+                            state=self.current_state,
+                        )
+                    )
+                    continue
+
+                for index, cert_expiry_date in enumerate(decoded.expiry_dates):
+                    self._status.put(
+                        AgentMonitoringDataPoint(
+                            data=dict(
+                                path=str(path),
+                                type=decoded.type.value,
+                                error=None,
+                                index=index,
+                                not_valid_after=cert_expiry_date,
+                                is_expired=datetime.utcnow() >= cert_expiry_date,
+                                is_critical=datetime.utcnow()
+                                + self.config.expiry_threshold
+                                >= cert_expiry_date,
+                            ),
+                            state=self.current_state,
+                        )
+                    )
+
+        self._save_cache()
 
     @log_agent_lifecycle
     def teardown(self) -> None:
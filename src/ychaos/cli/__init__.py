@@ -3,16 +3,18 @@
 from abc import ABC
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from pydantic import ValidationError
 from rich.console import Console
 from rich.panel import Panel
 
-from ..testplan.schema import TestPlan
 from ..utils.argparse import SubCommand
-from .exceptions import YChaosCLIError
 from ..utils.builtins import BuiltinUtils
+from .exceptions import YChaosCLIError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..testplan.schema import TestPlan
 
 
 class YChaosArgumentParser(ArgumentParser):
@@ -90,7 +92,11 @@ class YChaosTestplanInputSubCommand(YChaosSubCommand, ABC):
 
         return parser
 
-    def get_validated_test_plan(self, path: Path) -> Optional[TestPlan]:
+    def get_validated_test_plan(self, path: Path) -> Optional["TestPlan"]:
+        # The testplan schema imports the agent and verification configurations.
+        # Imported here so that the subcommands not requiring a testplan do not import them
+        from ..testplan.schema import TestPlan
+
         self.console.log("Getting Test plan")
         self.console.line()
         try:
@@ -99,8 +105,11 @@ class YChaosTestplanInputSubCommand(YChaosSubCommand, ABC):
         except ValidationError as validation_error:
             self.set_exitcode(1)
             self.console.print(
-                Panel.fit(BuiltinUtils.OscSequenceSanitizer.validate(str(validation_error)),
-                          title="Validation Error", style="red")
+                Panel.fit(
+                    BuiltinUtils.OscSequenceSanitizer.validate(str(validation_error)),
+                    title="Validation Error",
+                    style="red",
+                )
             )
         except IsADirectoryError as is_directory:
             self.set_exitcode(1)
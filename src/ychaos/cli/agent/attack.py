@@ -10,6 +10,7 @@ from ...agents.coordinator import Coordinator
 from ...testplan.schema import TestPlan
 from ...utils.yaml import Dumper
 from .. import YChaosCLIHook, YChaosTestplanInputSubCommand
+from .commands import ATTACK
 
 __all__ = ["Attack"]
 
@@ -21,8 +22,7 @@ class Attack(YChaosTestplanInputSubCommand):
     the target system.
     """
 
-    name = "attack"
-    help = "YChaos Agent Attack Subcommand"
+    __command__ = ATTACK
 
     @classmethod
     def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
@@ -0,0 +1,13 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+from ...utils.argparse import LazySubCommand
+
+__all__ = ["ATTACK", "COMMANDS"]
+
+# The sub-commands of `ychaos agent`. The module of a sub-command is imported only when it is invoked
+
+ATTACK = LazySubCommand(
+    "attack", "ychaos.cli.agent.attack:Attack", help="YChaos Agent Attack Subcommand"
+)
+
+COMMANDS = (ATTACK,)
@@ -5,7 +5,8 @@ from argparse import ArgumentParser
 
 from ...utils.argparse import SubCommandParsersAction
 from .. import YChaosSubCommand
-from .attack import Attack
+from ..commands import AGENT
+from .commands import COMMANDS
 
 __all__ = ["Agent"]
 
@@ -16,8 +17,7 @@ class Agent(YChaosSubCommand):
     under `agent` requires testplan.
     """
 
-    name = "agent"
-    help = "The agent subcommand of YChaos"
+    __command__ = AGENT
 
     @classmethod
     def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
@@ -26,5 +26,6 @@ class Agent(YChaosSubCommand):
         )
         assert isinstance(test_plan_command_subparser, SubCommandParsersAction)
 
-        test_plan_command_subparser.add_parser(cls=Attack)
+        for command in COMMANDS:
+            test_plan_command_subparser.add_parser(cls=command)
         return parser
@@ -0,0 +1,31 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+from ..utils.argparse import LazySubCommand
+
+__all__ = ["TESTPLAN", "MANUAL", "AGENT", "VERIFY", "EXECUTE", "COMMANDS"]
+
+# The sub-commands of `ychaos`. The module of a sub-command is imported only when it is invoked
+
+TESTPLAN = LazySubCommand(
+    "testplan",
+    "ychaos.cli.testplan:TestPlan",
+    help="sub command for test plan operations",
+)
+
+MANUAL = LazySubCommand(
+    "manual", "ychaos.cli.manual:Manual", help="Print the manual for YChaos CLI"
+)
+
+AGENT = LazySubCommand(
+    "agent", "ychaos.cli.agent.main:Agent", help="The agent subcommand of YChaos"
+)
+
+VERIFY = LazySubCommand(
+    "verify", "ychaos.cli.verify:Verify", help="The verification subcommand of YChaos"
+)
+
+EXECUTE = LazySubCommand(
+    "execute", "ychaos.cli.execute:Execute", help="The execute subcommand of YChaos"
+)
+
+COMMANDS = (TESTPLAN, MANUAL, AGENT, VERIFY, EXECUTE)
@@ -9,6 +9,7 @@ from ..core.executor.MachineTargetExecutor import MachineTargetExecutor
 from ..core.executor.SelfTargetExecutor import SelfTargetExecutor
 from ..testplan.attack import TargetType
 from . import YChaosCLIHook, YChaosTestplanInputSubCommand
+from .commands import EXECUTE
 
 
 class YChaosCLITargetExecutorHook(YChaosCLIHook, ABC):
@@ -19,8 +20,7 @@ class YChaosCLITargetExecutorHook(YChaosCLIHook, ABC):
 
 class Execute(YChaosTestplanInputSubCommand):
 
-    name = "execute"
-    help = "The execute subcommand of YChaos"
+    __command__ = EXECUTE
 
     def __init__(self, **kwargs):
         super(Execute, self).__init__(**kwargs)
@@ -14,11 +14,7 @@ from ..app_logger import AppLogger
 from ..settings import ApplicationSettings, DevSettings, ProdSettings, Settings
 from ..utils.argparse import SubCommandParsersAction
 from . import YChaosArgumentParser, YChaosSubCommand
-from .agent.main import Agent
-from .execute import Execute
-from .manual import Manual
-from .testplan import TestPlan
-from .verify import Verify
+from .commands import COMMANDS
 
 
 class YChaos:
@@ -125,12 +121,9 @@ class YChaos:
 
         assert isinstance(ychaos_cli_subparsers, SubCommandParsersAction)
 
-        # Subcommands
-        ychaos_cli_subparsers.add_parser(cls=TestPlan)
-        ychaos_cli_subparsers.add_parser(cls=Manual)
-        ychaos_cli_subparsers.add_parser(cls=Agent)
-        ychaos_cli_subparsers.add_parser(cls=Verify)
-        ychaos_cli_subparsers.add_parser(cls=Execute)
+        # Subcommands. The module of a subcommand is imported only when it is invoked
+        for command in COMMANDS:
+            ychaos_cli_subparsers.add_parser(cls=command)
 
         args = ychaos_cli.parse_args(program_arguments)
 
@@ -216,7 +209,8 @@ class App:
         if parser._subparsers is not None:
             for action in parser._subparsers._actions:
                 if isinstance(action, SubCommandParsersAction):
-                    for command, subparser in action.choices.items():
+                    for command in list(action.choices):
+                        subparser = action.load(command)
                         tree[subparser.prog] = subparser.format_help()
                         tree = self._walk_parser(subparser, tree)
         return tree
@@ -9,6 +9,7 @@ from typing import Any, Optional
 from rich.markdown import Markdown
 
 from . import YChaosSubCommand
+from .commands import MANUAL
 
 __all__ = ["Manual"]
 
@@ -21,8 +22,7 @@ class Manual(YChaosSubCommand):
     the console.
     """
 
-    name = "manual"
-    help = "Print the manual for YChaos CLI"
+    __command__ = MANUAL
 
     def __init__(self, **kwargs):
         super(Manual, self).__init__(**kwargs)
@@ -5,6 +5,7 @@ from argparse import ArgumentParser
 
 from ...utils.argparse import SubCommandParsersAction
 from .. import YChaosSubCommand
+from ..commands import TESTPLAN
 from .validate import TestPlanValidatorCommand
 
 __all__ = ["TestPlan"]
@@ -16,8 +17,7 @@ class TestPlan(YChaosSubCommand):
     See Testplan documentation for more details.
     """
 
-    name = "testplan"
-    help = "sub command for test plan operations"
+    __command__ = TESTPLAN
 
     @classmethod
     def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
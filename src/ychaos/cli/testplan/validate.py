@@ -1,20 +1,20 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import os
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from typing import Any, List
+from typing import Any, List, Optional
 
-from pydantic import ValidationError
 from rich.panel import Panel
 
-from ...testplan.validator import TestPlanValidator
+from ...testplan.validator import TestPlanValidationCache, TestPlanValidator
+from ...utils.argparse import positive_int
+from ...utils.builtins import BuiltinUtils
 from .. import YChaosSubCommand
 
 __all__ = ["TestPlanValidatorCommand"]
 
-from ...utils.builtins import BuiltinUtils
-
 
 class TestPlanValidatorCommand(YChaosSubCommand):
     """
@@ -34,6 +34,23 @@ class TestPlanValidatorCommand(YChaosSubCommand):
             help="Space separated list of file/directory paths to validate",
             metavar="path",
         )
+        parser.add_argument(
+            "--workers",
+            type=positive_int,
+            default=os.cpu_count() or 1,
+            help="Number of processes validating the testplans",
+            metavar="int",
+        )
+        parser.add_argument(
+            "--cache",
+            type=Path,
+            default=None,
+            help=(
+                "File to cache the validation results in. The testplans of which the content "
+                "has not changed since the previous validation are not validated again"
+            ),
+            metavar="path",
+        )
 
         return parser
 
@@ -41,6 +58,8 @@ class TestPlanValidatorCommand(YChaosSubCommand):
         super(TestPlanValidatorCommand, self).__init__(**kwargs)
 
         self.paths: List[Path] = kwargs.pop("paths")
+        self.workers: int = kwargs.pop("workers", 1)
+        self.cache_path: Optional[Path] = kwargs.pop("cache", None)
 
     def resolve_validation_paths(self) -> List[Path]:
         file_types = ("json", "yaml", "yml")
@@ -71,34 +90,42 @@ class TestPlanValidatorCommand(YChaosSubCommand):
         self.console.log("Validating Test plans")
         self.console.line()
 
-        for file in sorted(resolved_filepaths):
-            try:
-                TestPlanValidator.validate_file(file)
+        files = sorted(resolved_filepaths)
+        cache = TestPlanValidationCache(self.cache_path) if self.cache_path else None
+        results = TestPlanValidator.validate_files(
+            [file for file in files if file.exists()],
+            workers=self.workers,
+            cache=cache,
+        )
+        if cache is not None:
+            cache.save()
+
+        for file in files:
+            if file not in results:
+                self.set_exitcode(1)
+                self.console.print(
+                    f":mag: {file} [italic]not found[/italic]",
+                    style="indian_red",
+                )
+            elif results[file] is None:
                 self.console.print(
                     f":white_check_mark: {file}",
                     style="green",
                 )
-
-            except ValidationError as validation_error:
+            else:
                 self.set_exitcode(1)
 
                 self.console.print("")
                 self.console.print(f":exclamation: {file}", style="bold red")
                 self.console.print(
                     Panel.fit(
-                        BuiltinUtils.OscSequenceSanitizer.validate(str(validation_error)),
-                        title="Validation Error", style="red"
+                        BuiltinUtils.OscSequenceSanitizer.validate(results[file]),
+                        title="Validation Error",
+                        style="red",
                     )
                 )
                 self.console.print("")
 
-            except FileNotFoundError as file_not_found_error:
-                self.set_exitcode(1)
-                self.console.print(
-                    f":mag: {file} [italic]not found[/italic]",
-                    style="indian_red",
-                )
-
     @classmethod
     def main(cls, args: Namespace) -> Any:
         validator = cls(**vars(args))
@@ -1,17 +1,22 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import json
+import os
 from abc import ABC
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import Any, List, Optional, Union
 
 from pydantic import validate_arguments
 
 from ..core.verification.controller import VerificationController
 from ..core.verification.data import VerificationStateData
+from ..core.verification.report import JSONLinesReport
 from ..testplan import SystemState
 from ..testplan.verification import VerificationConfig, VerificationType
+from ..utils.argparse import positive_float, positive_int
 from . import YChaosCLIHook, YChaosTestplanInputSubCommand
+from .commands import VERIFY
 
 __all__ = ["Verify"]
 
@@ -21,10 +26,13 @@ class Verify(YChaosTestplanInputSubCommand):
     The `verify` subcommand of YChaos is used to verify the state of the system. This
     subcommand requires a valid testplan which can be provided with the -t/--testplan argument.
     The subcommand also requires a valid state at which the system is verified.
+
+    With `--continuous`, the system is verified repeatedly every `--interval` seconds until `--duration`
+    elapses or a strict plugin fails. The JSON and YAML reports are rewritten and the JSON Lines report is
+    appended to at the end of each round.
     """
 
-    name = "verify"
-    help = "The verification subcommand of YChaos"
+    __command__ = VERIFY
 
     def __init__(self, **kwargs):
         super(Verify, self).__init__(**kwargs)
@@ -34,9 +42,16 @@ class Verify(YChaosTestplanInputSubCommand):
 
         self.dump_yaml: Optional[Path] = kwargs.pop("dump_yaml", None)
         self.dump_json: Optional[Path] = kwargs.pop("dump_json", None)
+        self.dump_jsonl: Optional[Path] = kwargs.pop("dump_jsonl", None)
 
         self.state_data_path: Optional[Path] = kwargs.pop("state_data", None)
 
+        self.concurrency: int = kwargs.pop("concurrency", 1)
+
+        self.continuous: bool = kwargs.pop("continuous", False)
+        self.interval: float = kwargs.pop("interval", 10)
+        self.duration: Optional[float] = kwargs.pop("duration", None)
+
     @classmethod
     def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
         parser = super(Verify, cls).build_parser(parser)
@@ -66,25 +81,78 @@ class Verify(YChaosTestplanInputSubCommand):
             metavar="path",
         )
 
+        report_argument_group.add_argument(
+            "--dump-jsonl",
+            type=Path,
+            help=(
+                "Append the verification data of the state to a report in JSON Lines format. "
+                "The report can be used as the state data of the later runs"
+            ),
+            required=False,
+            metavar="path",
+        )
+
         parser.add_argument(
             "--state-data",
             type=Path,
-            help="The path of the verification data state file (JSON/YAML)",
+            help="The path of the verification data state file (JSON/YAML/JSON Lines)",
             required=False,
             metavar="path",
         )
 
+        parser.add_argument(
+            "--concurrency",
+            type=positive_int,
+            help="Number of verification plugins to be run concurrently",
+            default=1,
+            required=False,
+            metavar="count",
+        )
+
+        continuous_argument_group = parser.add_argument_group("continuous verification")
+        continuous_argument_group.add_argument(
+            "--continuous",
+            action="store_true",
+            help="Verify the system repeatedly until the duration elapses or a strict plugin fails",
+            default=False,
+        )
+
+        continuous_argument_group.add_argument(
+            "--interval",
+            type=positive_float,
+            help="Interval (in seconds) between the rounds of continuous verification",
+            default=10,
+            required=False,
+            metavar="seconds",
+        )
+
+        continuous_argument_group.add_argument(
+            "--duration",
+            type=float,
+            help="Duration (in seconds) of the continuous verification",
+            default=None,
+            required=False,
+            metavar="seconds",
+        )
+
         return parser
 
-    def get_state_data(self):
+    def get_state_data(self, size: Optional[int] = None):
         self.console.log("Getting state data")
         self.console.line()
         try:
-            import yaml
-
             path = Path(self.state_data_path)
+            if path.suffix == ".jsonl":
+                return JSONLinesReport(path).load(size)
+
             with open(path, "r") as file:
-                state_data = yaml.safe_load(file)
+                if path.suffix == ".json":
+                    # The JSON parser is much faster than the YAML parser for the same data
+                    state_data = json.load(file)
+                else:
+                    import yaml
+
+                    state_data = yaml.safe_load(file)
             return state_data
         except IsADirectoryError as is_directory:
             self.set_exitcode(1)
@@ -124,11 +192,26 @@ class Verify(YChaosTestplanInputSubCommand):
             )
             return
 
+        # The report is written to a temporary file and then renamed, so that the
+        # report is never read partially written when it is rewritten in continuous mode
+        report_file_path = Path(report_file_path)
+        temp_report_file_path = report_file_path.with_name(
+            f".{report_file_path.name}.tmp"
+        )
         try:
-            with open(report_file_path, "w") as fp:
+            if output_format == "jsonl":
+                # JSON Lines reports are appended to, retaining the data of the previous runs
+                with open(report_file_path, "a") as fp:
+                    verification_controller.dump_verification_jsonl(
+                        fp, states=[self.state]
+                    )
+                return
+
+            with open(temp_report_file_path, "w") as fp:
                 verification_controller.dump_verification(
                     fp, output_format=output_format
                 )
+            os.replace(temp_report_file_path, report_file_path)
         except PermissionError as permission_error:
             self.console.log(
                 ":file_folder: [italic]Permission denied to create report file[/italic]",
@@ -143,7 +226,7 @@ class Verify(YChaosTestplanInputSubCommand):
 
         state_data = list()
         if self.state_data_path:
-            state_data = self.get_state_data()
+            state_data = self.get_state_data(size=len(testplan.verification))
             if self._exitcode != 0:
                 return
 
@@ -179,10 +262,29 @@ class Verify(YChaosTestplanInputSubCommand):
                     )
                 )
 
+        class OnEachRoundEndHook(VerificationHook):
+            def __init__(
+                self,
+                app,
+                state: SystemState,
+                command: "Verify",
+                controller: VerificationController,
+            ):
+                super(OnEachRoundEndHook, self).__init__(app, state)
+                self.command = command
+                self.controller = controller
+
+            def __call__(self, round_number: int, verify_list: List[bool]):
+                self.console.log(
+                    f"Completed round {round_number} of [i]{self.state.value.lower()}[/i] state verification;"
+                    f" verified={all(verify_list)}"
+                )
+                self.command._generate_verification_reports(self.controller)
+
         # end section
 
         verification_controller = VerificationController(
-            testplan, self.state, state_data
+            testplan, self.state, state_data, concurrency=self.concurrency
         )
         verification_controller.register_hook(
             "on_each_plugin_start", OnEachPluginStartHook(self.app, self.state)
@@ -197,7 +299,16 @@ class Verify(YChaosTestplanInputSubCommand):
         self.console.log(
             f"Starting [i]{self.state.value.lower()}[/i] state verification."
         )
-        is_verified = verification_controller.execute()
+        if self.continuous:
+            verification_controller.register_hook(
+                "on_each_round_end",
+                OnEachRoundEndHook(self.app, self.state, self, verification_controller),
+            )
+            is_verified = verification_controller.execute_continuously(
+                interval=self.interval, duration=self.duration
+            )
+        else:
+            is_verified = verification_controller.execute()
 
         self.set_exitcode(int(not is_verified))
 
@@ -214,6 +325,15 @@ class Verify(YChaosTestplanInputSubCommand):
             )
 
         self.console.line()
+
+        # The JSON Lines report has already been appended to at the end of each round
+        self._generate_verification_reports(
+            verification_controller, jsonl=not self.continuous
+        )
+
+    def _generate_verification_reports(
+        self, verification_controller: VerificationController, jsonl: bool = True
+    ):
         if self.dump_json:
             self._generate_verification_report(
                 verification_controller,
@@ -228,6 +348,13 @@ class Verify(YChaosTestplanInputSubCommand):
                 output_format="yaml",
             )
 
+        if self.dump_jsonl and jsonl:
+            self._generate_verification_report(
+                verification_controller,
+                report_file_path=self.dump_jsonl,
+                output_format="jsonl",
+            )
+
     @classmethod
     def main(cls, args: Namespace) -> Any:  # pragma: no cover
         verification_command = Verify(**vars(args))
@@ -5,6 +5,7 @@ import random
 import shutil
 from pathlib import Path
 from types import SimpleNamespace
+from typing import Optional
 
 from ...agents.index import AgentType
 from ...app_logger import AppLogger
@@ -13,6 +14,7 @@ from ...testplan.schema import TestPlan
 from ...utils.dependency import DependencyUtils
 from ...utils.hooks import EventHook
 from .BaseExecutor import BaseExecutor
+from .bundle import AgentBundle
 
 (YChaosAnsibleResultCallback,) = DependencyUtils.import_from(
     "ychaos.core.executor.common",
@@ -52,7 +54,17 @@ class MachineTargetExecutor(BaseExecutor):
     by connecting to the hosts via SSH. The input for the executor is the testplan,
     within which, the target_type is defined as `machine`. The target_config will
     provide the list of hosts out of which random `blast_radius`% of the hosts
-    is selected for attack.
+    is selected for attack. When `stratify` is configured in the target_config, `blast_radius`% of
+    the hosts of each group of the hosts are selected. The selection is seeded with the `seed` of
+    the target_config, or with a seed drawn at random, which is logged to replay the selection.
+
+    When `agent_bundle` is configured in the target_config, the agents are installed from a
+    bundle built once on the local machine. The bundle is cached on each of the hosts and the
+    installation is skipped on the hosts that already have the same bundle.
+
+    The selected hosts are attacked `forks` hosts at a time. When `serial` is configured
+    in the target_config, the hosts are attacked in rolling waves of `serial` hosts and all the
+    hosts of a wave are attacked in parallel, unless `forks` is configured otherwise.
 
     The following are the valid hooks to this executor
 
@@ -128,19 +140,25 @@ class MachineTargetExecutor(BaseExecutor):
     ):
         super(MachineTargetExecutor, self).__init__(testplan, is_debug_mode)
 
+        self.logger = AppLogger.get_logger(self.__class__.__name__)
+
         # Selects a `blast_radius`% of hosts at random from the
         # effective hosts and uses it as the target hosts for the attack
         self._compute_target_hosts()
 
         self.ansible_context = SimpleNamespace()
-
-        self.logger = AppLogger.get_logger(self.__class__.__name__)
+        self.agent_bundle: Optional[AgentBundle] = None
 
     def _compute_target_hosts(self):
         target_defn: MachineTargetDefinition = self.testplan.attack.get_target_config()
-        effective_hosts = target_defn.get_effective_hosts()
-        self.target_hosts = random.sample(
-            effective_hosts, target_defn.blast_radius * len(effective_hosts) // 100
+
+        # The seed is logged, so that the selection can be replayed by configuring the seed
+        self.seed = target_defn.seed
+        if self.seed is None:
+            self.seed = random.SystemRandom().getrandbits(32)
+        self.target_hosts = target_defn.sample_effective_hosts(random.Random(self.seed))
+        self.logger.info(
+            f"Selected {len(self.target_hosts)} target hosts with the seed {self.seed}"
         )
 
     def prepare(self):
@@ -157,10 +175,17 @@ class MachineTargetExecutor(BaseExecutor):
             self.testplan.attack.get_target_config()
         )
 
-        # Hosts to be in comma separated string
-        hosts = ",".join(target_config.get_effective_hosts())
-        if len(target_config.get_effective_hosts()) == 1:
-            hosts += ","
+        if target_config.agent_bundle:
+            self.agent_bundle = AgentBundle(
+                requirement=target_config.agent_bundle.requirement,
+                pip_args=target_config.agent_bundle.pip_args,
+            )
+            self.agent_bundle.build()
+
+        # Hosts to be in comma separated string. Only the target hosts are attacked,
+        # so the inventory is not built from all the effective hosts.
+        # The trailing comma marks the string as a list of hosts, even with a single host
+        hosts = ",".join(self.target_hosts) + ","
         self.ansible_context.inventory = InventoryManager(
             loader=self.ansible_context.loader, sources=hosts
         )
@@ -177,6 +202,7 @@ class MachineTargetExecutor(BaseExecutor):
                 conn_pass=target_config.ssh_config.password.get_secret_value() or "",
             ),
             stdout_callback=self.ansible_context.results_callback,
+            forks=target_config.get_forks(),
         )
 
         self.ansible_context.play_source = dict(
@@ -204,44 +230,7 @@ class MachineTargetExecutor(BaseExecutor):
                         "result_which_python3.rc != 0"
                     ],
                 ),
-                dict(
-                    name="Create a virtual environment",
-                    register="result_pip",
-                    action=dict(
-                        module="pip",
-                        chdir="{{result_pwd.stdout}}",
-                        name="pip",
-                        state="latest",
-                        virtualenv="ychaos_env",
-                        virtualenv_command="{{result_which_python3.stdout}} -m venv",
-                    ),
-                    failed_when=[
-                        # Failed in these following reasons
-                        # 1. pip not installed
-                        # 2. Failed to installed latest pip version
-                        "result_pip.state == 'absent'"
-                    ],
-                    vars=dict(
-                        ansible_python_interpreter="{{result_which_python3.stdout}}"
-                    ),
-                ),
-                dict(
-                    name="Install ychaos[agents]",
-                    register="result_pip_install_ychaos_agents",
-                    action=dict(
-                        module="pip",
-                        chdir="{{result_pwd.stdout}}",
-                        name="ychaos[agents]",
-                        virtualenv="ychaos_env",
-                    ),
-                    failed_when=[
-                        # Failed if unable to install ychaos[agents]
-                        "result_pip_install_ychaos_agents.state == 'absent'"
-                    ],
-                    vars=dict(
-                        ansible_python_interpreter="{{result_which_python3.stdout}}"
-                    ),
-                ),
+                *self.get_setup_tasks(),
                 dict(
                     name="Create a workspace directory for storing local report files",
                     register="result_create_workspace",
@@ -260,7 +249,7 @@ class MachineTargetExecutor(BaseExecutor):
                         module="shell",
                         cmd=" ".join(
                             [
-                                "source {{result_pip.virtualenv}}/bin/activate",
+                                f"source {self.get_virtualenv()}/bin/activate",
                                 "&&",
                                 "ychaos --log-file {{result_create_workspace.path}}/ychaos.log",
                                 "agent attack --testplan {{result_testplan_file.dest}} --attack-report-yaml {{result_create_workspace.path}}/attack_report.yaml",
@@ -294,17 +283,172 @@ class MachineTargetExecutor(BaseExecutor):
                         state="absent",
                     ),
                 ),
+            ],
+        )
+
+        if not self.agent_bundle:
+            # The bundled virtual environment is cached on the host for the next runs
+            self.ansible_context.play_source["tasks"].append(
                 dict(
                     name="Delete Virtual environment",
                     action=dict(
                         module="file",
-                        path="{{result_pip.virtualenv}}",
+                        path=self.get_virtualenv(),
                         state="absent",
                     ),
-                ),
-            ],
+                )
+            )
+
+        # Rolling wave mode
+        if target_config.serial:
+            self.ansible_context.play_source["serial"] = target_config.serial
+        if target_config.max_fail_percentage is not None:
+            self.ansible_context.play_source[
+                "max_fail_percentage"
+            ] = target_config.max_fail_percentage
+
+    def get_bundle_directory(self) -> str:
+        """
+        Returns the directory on the target host where the agent bundle is cached.
+        In debug mode, the local ychaos source is unpacked over the installed package,
+        so a separate directory is used to keep the cached bundle untouched.
+        """
+        assert self.agent_bundle is not None and self.agent_bundle.digest is not None
+        target_config: MachineTargetDefinition = (
+            self.testplan.attack.get_target_config()
+        )
+        assert target_config.agent_bundle is not None
+
+        bundle_id = self.agent_bundle.digest + ("-debug" if self.debug_mode else "")
+        return (
+            "{{result_pwd.stdout}}/"
+            + f"{target_config.agent_bundle.cache_dir}/{bundle_id}"
         )
 
+    def get_virtualenv(self) -> str:
+        """
+        Returns the path of the virtual environment on the target host in which YChaos is installed.
+        """
+        if self.agent_bundle:
+            return self.get_bundle_directory() + "/ychaos_env"
+        return "{{result_pip.virtualenv}}"
+
+    def get_setup_tasks(self):
+        """
+        Returns the tasks that install YChaos agents on the target host.
+        """
+        if self.agent_bundle:
+            return self.get_bundle_setup_tasks()
+
+        return [
+            dict(
+                name="Create a virtual environment",
+                register="result_pip",
+                action=dict(
+                    module="pip",
+                    chdir="{{result_pwd.stdout}}",
+                    name="pip",
+                    state="latest",
+                    virtualenv="ychaos_env",
+                    virtualenv_command="{{result_which_python3.stdout}} -m venv",
+                ),
+                failed_when=[
+                    # Failed in these following reasons
+                    # 1. pip not installed
+                    # 2. Failed to installed latest pip version
+                    "result_pip.state == 'absent'"
+                ],
+                vars=dict(ansible_python_interpreter="{{result_which_python3.stdout}}"),
+            ),
+            dict(
+                name="Install ychaos[agents]",
+                register="result_pip_install_ychaos_agents",
+                action=dict(
+                    module="pip",
+                    chdir="{{result_pwd.stdout}}",
+                    name="ychaos[agents]",
+                    virtualenv="ychaos_env",
+                ),
+                failed_when=[
+                    # Failed if unable to install ychaos[agents]
+                    "result_pip_install_ychaos_agents.state == 'absent'"
+                ],
+                vars=dict(ansible_python_interpreter="{{result_which_python3.stdout}}"),
+            ),
+        ]
+
+    def get_bundle_setup_tasks(self):
+        """
+        Returns the tasks that install YChaos agents from the agent bundle. All the tasks
+        except the cache lookup are skipped when the host has the same bundle installed.
+        """
+        assert self.agent_bundle is not None
+        bundle_directory = self.get_bundle_directory()
+        not_cached = "not result_agent_bundle_cache.stat.exists"
+
+        return [
+            dict(
+                name="Check cached agent bundle",
+                register="result_agent_bundle_cache",
+                action=dict(
+                    module="stat",
+                    path=f"{bundle_directory}/{AgentBundle.INSTALLED_MARKER}",
+                ),
+            ),
+            dict(
+                name="Create agent bundle directory",
+                when=not_cached,
+                action=dict(
+                    module="file",
+                    path=bundle_directory,
+                    state="directory",
+                    mode="0755",
+                ),
+            ),
+            dict(
+                name="Copy agent bundle to remote",
+                when=not_cached,
+                action=dict(
+                    module="ansible.builtin.unarchive",
+                    src=str(self.agent_bundle.path),
+                    dest=bundle_directory,
+                ),
+            ),
+            dict(
+                name="Create a virtual environment from agent bundle",
+                when=not_cached,
+                action=dict(
+                    module="pip",
+                    name="pip",
+                    state="latest",
+                    extra_args=f"--no-index --find-links {bundle_directory}/{AgentBundle.WHEELHOUSE_DIR}",
+                    virtualenv=self.get_virtualenv(),
+                    virtualenv_command="{{result_which_python3.stdout}} -m venv",
+                ),
+                vars=dict(ansible_python_interpreter="{{result_which_python3.stdout}}"),
+            ),
+            dict(
+                name="Install agent bundle",
+                when=not_cached,
+                action=dict(
+                    module="pip",
+                    requirements=f"{bundle_directory}/{AgentBundle.REQUIREMENTS_FILE}",
+                    extra_args=f"--no-index --find-links {bundle_directory}/{AgentBundle.WHEELHOUSE_DIR}",
+                    virtualenv=self.get_virtualenv(),
+                ),
+                vars=dict(ansible_python_interpreter="{{result_which_python3.stdout}}"),
+            ),
+            dict(
+                name="Mark agent bundle as installed",
+                when=not_cached,
+                action=dict(
+                    module="copy",
+                    content=self.agent_bundle.digest,
+                    dest=f"{bundle_directory}/{AgentBundle.INSTALLED_MARKER}",
+                ),
+            ),
+        ]
+
     def get_file_transfer_tasks(self):
         task_list = list()
         testplan = self.testplan.copy()
@@ -338,7 +482,7 @@ class MachineTargetExecutor(BaseExecutor):
                     name="Get site-package parent directory",
                     action=dict(
                         module="command",
-                        args=dict(cmd="ls {{result_pip.virtualenv}}/lib"),
+                        args=dict(cmd=f"ls {self.get_virtualenv()}/lib"),
                     ),
                     register="site_packages_parent_dir",
                     changed_when="false",
@@ -352,7 +496,8 @@ class MachineTargetExecutor(BaseExecutor):
                     action=dict(
                         module="ansible.builtin.unarchive",
                         src=f"{ychaos_src_zip_path}.zip",
-                        dest="{{result_pip.virtualenv}}/lib/{{site_packages_parent_dir.stdout}}/site-packages/ychaos",
+                        dest=self.get_virtualenv()
+                        + "/lib/{{site_packages_parent_dir.stdout}}/site-packages/ychaos",
                     ),
                 )
             )
@@ -405,3 +550,5 @@ class MachineTargetExecutor(BaseExecutor):
                 self.ansible_context.loader.cleanup_all_tmp_files()
             if self.debug_mode:
                 os.remove(f"{self.testplan.__src_path__.parent}/ychaos.zip")
+            if self.agent_bundle:
+                self.agent_bundle.cleanup()
@@ -0,0 +1,117 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import hashlib
+import shutil
+import subprocess  # nosec : Only runs pip with the arguments from testplan
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+
+class AgentBundle:
+    """
+    A self-contained wheelhouse of `ychaos[agents]` and all of its dependencies,
+    built once on the machine running the executor. The bundle is copied to the target
+    hosts and installed with pip without reaching out to a package index.
+
+    The bundle is identified by the `digest`, a content hash of all the wheels in the
+    wheelhouse. The digest is used by the executor as the cache key on the target hosts,
+    so that the hosts already having the same bundle installed skip the setup entirely.
+
+    Warning:
+        The wheels are built for the Python interpreter and the platform of the machine
+        building the bundle. The target hosts are expected to have the same Python version and platform.
+    """
+
+    REQUIREMENTS_FILE = "requirements.txt"
+    WHEELHOUSE_DIR = "wheelhouse"
+    INSTALLED_MARKER = ".installed"
+
+    def __init__(
+        self,
+        requirement: str = "ychaos[agents]",
+        pip_args: Sequence[str] = tuple(),
+        build_dir: Optional[Path] = None,
+    ):
+        """
+        Initialize an agent bundle
+
+        Args:
+            requirement: pip requirement specifier of the package to be bundled
+            pip_args: Additional arguments to be passed to `pip wheel`
+            build_dir: Directory in which the bundle is built. Defaults to a temporary directory
+        """
+        self.requirement = requirement
+        self.pip_args = list(pip_args)
+        self.build_dir = (
+            Path(build_dir)
+            if build_dir
+            else Path(tempfile.mkdtemp(prefix="ychaos_bundle_"))
+        )
+
+        self.digest: Optional[str] = None
+        self.path: Optional[Path] = None
+
+    def _build_wheelhouse(self, wheelhouse: Path) -> None:
+        subprocess.run(  # nosec : Arguments are not passed through a shell
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "wheel",
+                "--quiet",
+                "--wheel-dir",
+                str(wheelhouse),
+                # pip is bundled to upgrade the pip on the target without an index
+                "pip",
+                self.requirement,
+                *self.pip_args,
+            ],
+            check=True,
+        )
+
+    def build(self) -> Path:
+        """
+        Builds the wheelhouse, pins the version of each of the wheels in
+        `requirements.txt` and archives them into a tarball.
+
+        Raises:
+            CalledProcessError: if pip fails to build the wheelhouse
+
+        Returns:
+            Path of the bundle tarball
+        """
+        wheelhouse = self.build_dir / self.WHEELHOUSE_DIR
+        self._build_wheelhouse(wheelhouse)
+
+        _hash = hashlib.sha256()
+        requirements: List[str] = list()
+        for wheel in sorted(wheelhouse.glob("*.whl")):
+            _hash.update(wheel.name.encode())
+            with open(wheel, "rb") as fp:
+                for chunk in iter(lambda: fp.read(1 << 20), b""):
+                    _hash.update(chunk)
+
+            # Wheel filename : {distribution}-{version}(-{build})?-{python}-{abi}-{platform}.whl
+            distribution, version = wheel.name.split("-")[:2]
+            requirements.append(f"{distribution}=={version}")
+
+        self.digest = _hash.hexdigest()[:16]
+
+        requirements_file = self.build_dir / self.REQUIREMENTS_FILE
+        requirements_file.write_text("\n".join(requirements) + "\n")
+
+        self.path = self.build_dir / f"ychaos_bundle_{self.digest}.tar.gz"
+        with tarfile.open(self.path, "w:gz") as tar:
+            tar.add(str(wheelhouse), arcname=self.WHEELHOUSE_DIR)
+            tar.add(str(requirements_file), arcname=self.REQUIREMENTS_FILE)
+
+        return self.path
+
+    def cleanup(self) -> None:
+        """
+        Removes the build directory along with the bundle tarball.
+        """
+        shutil.rmtree(self.build_dir, ignore_errors=True)
@@ -1,6 +1,9 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Event
 from typing import Dict, List, Optional, Type
 
 from pydantic import validate_arguments
@@ -9,27 +12,22 @@ from ...app_logger import AppLogger
 from ...testplan import SystemState
 from ...testplan.schema import TestPlan
 from ...testplan.verification import VerificationConfig, VerificationType
+from ...utils.dependency import LazyImportDict
 from ...utils.hooks import EventHook
 from ...utils.yaml import Dumper
 from .data import VerificationData, VerificationStateData
 from .plugins.BaseVerificationPlugin import BaseVerificationPlugin
-from .plugins.HTTPRequestVerificationPlugin import (
-    HTTPRequestVerificationPlugin,
-)
-from .plugins.OpenTSDBVerificationPlugin import OpenTSDBVerificationPlugin
-from .plugins.PythonModuleVerificationPlugin import (
-    PythonModuleVerificationPlugin,
-)
-from .plugins.SDv4VerificationPlugin import SDv4VerificationPlugin
+from .report import JSONLinesReport
 
-# Enum value to corresponding Plugin Map
+# Enum value to corresponding Plugin Map. The plugin modules are imported
+# when the plugin is first looked up
 
-VERIFICATION_PLUGIN_MAP: Dict[str, Type[BaseVerificationPlugin]] = {
-    "python_module": PythonModuleVerificationPlugin,
-    "http_request": HTTPRequestVerificationPlugin,
-    "sdv4": SDv4VerificationPlugin,
-    "tsdb": OpenTSDBVerificationPlugin,
-}
+VERIFICATION_PLUGIN_MAP: Dict[str, Type[BaseVerificationPlugin]] = LazyImportDict(
+    python_module="ychaos.core.verification.plugins.PythonModuleVerificationPlugin:PythonModuleVerificationPlugin",
+    http_request="ychaos.core.verification.plugins.HTTPRequestVerificationPlugin:HTTPRequestVerificationPlugin",
+    sdv4="ychaos.core.verification.plugins.SDv4VerificationPlugin:SDv4VerificationPlugin",
+    tsdb="ychaos.core.verification.plugins.OpenTSDBVerificationPlugin:OpenTSDBVerificationPlugin",
+)
 
 
 class VerificationController(EventHook):
@@ -87,10 +85,35 @@ class VerificationController(EventHook):
             def callable_hook(index:int, plugin_type: VerificationType): ...
         ```
 
+    === "on_each_round_end"
+        Hook that gets called in the continuous mode when a round of verification has ended. `round_number`
+        starts from 0 and `verify_list` is the result of the plugins in that round.
+
+        ```python
+            def callable_hook(round_number: int, verify_list: List[bool]): ...
+        ```
+
     ---
     Each of the hooks get called on a certain event. The caller can register as many hooks for a particular event,
     by calling the `register_hook(event_name, hook_method)` method. All the hooks are executed sequentially. The best example
     of this is to register a hook to print information on CLI.
+
+    ## Concurrent mode
+
+    When the controller is initialized with `concurrency` greater than 1, the plugins are run in a thread pool
+    of `concurrency` workers. The `delay_before` and `delay_after` of a plugin only delay the run of the same plugin and
+    a plugin configured with `depends_on` waits for the plugins it depends on to complete before it runs.
+
+    The hooks are always called from the thread calling `execute()` in the order of the index.
+    `on_each_plugin_start` is called when a plugin is scheduled to run and `on_each_plugin_end` is called
+    when the result of the plugin is collected, after the results of all the preceding plugins.
+
+    ## Continuous mode
+
+    `execute_continuously()` runs the verification plugins repeatedly, once every `interval` seconds,
+    until the `duration` elapses, `stop()` is called or a strict plugin fails. The verification data
+    always holds the result of the latest round. This is meant to be run throughout the attack, so that
+    a regression is detected while the system is under chaos rather than after the attack has ended.
     """
 
     __hook_events__ = {
@@ -100,6 +123,7 @@ class VerificationController(EventHook):
             int, VerificationConfig, VerificationStateData
         ),
         "on_plugin_not_found": EventHook.CallableType(int, VerificationType),
+        "on_each_round_end": EventHook.CallableType(int, List[bool]),
         "on_end": EventHook.CallableType(List[bool]),
     }
 
@@ -109,6 +133,7 @@ class VerificationController(EventHook):
         testplan: TestPlan,
         current_state: SystemState,
         verification_data: List[Dict[SystemState, Optional[VerificationStateData]]],
+        concurrency: int = 1,
     ):
         """
         Initialize a verification controller object.
@@ -117,6 +142,7 @@ class VerificationController(EventHook):
             testplan: A valid testplan object
             current_state: The state in which the system is expected to be in
             verification_data (List[VerificationData]): The verification data probably from previous run.
+            concurrency: Maximum number of plugins run concurrently. Defaults to 1 (sequential)
         """
         super(VerificationController, self).__init__()
         self.logger = AppLogger.get_logger(self.__class__.__name__)
@@ -125,6 +151,10 @@ class VerificationController(EventHook):
         self.testplan = testplan
         self.current_state = current_state
 
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer")
+        self.concurrency = concurrency
+
         if not verification_data:
             verification_data = [
                 dict(),
@@ -136,6 +166,25 @@ class VerificationController(EventHook):
         for data in verification_data:
             self.verification_data.append(VerificationData.parse_obj(data))
 
+        # Set to end the continuous verification
+        self._stop_event = Event()
+
+    def _build_plugin(
+        self,
+        index: int,
+        verification_plugin: VerificationConfig,
+        data: VerificationData,
+    ) -> Optional[BaseVerificationPlugin]:
+        plugin_class = VERIFICATION_PLUGIN_MAP.get(verification_plugin.type.value, None)
+
+        if plugin_class is None:
+            # This can happen when a new plugin is not implemented yet, but is
+            # available in the schema
+            self.execute_hooks("on_plugin_not_found", index, verification_plugin.type)
+            return None
+
+        return plugin_class(verification_plugin.config, data)
+
     def execute(self) -> bool:
         """
         Execute the Verification controller.
@@ -148,6 +197,71 @@ class VerificationController(EventHook):
         # If there were no hooks registered, this will be no-op
         self.execute_hooks("on_start")
 
+        _verify_list = self._execute_round()
+
+        # Call all the hooks that were registered for `verification_end`.
+        self.execute_hooks("on_end", _verify_list)
+
+        return all(_verify_list)
+
+    def execute_continuously(
+        self, interval: float, duration: Optional[float] = None
+    ) -> bool:
+        """
+        Execute the Verification controller repeatedly. A round of verification is started
+        every `interval` seconds. If a round takes longer than the `interval`, the next round
+        starts as soon as the previous one ends.
+
+        Args:
+            interval: Interval (in seconds) between the start of two rounds of verification
+            duration: Duration (in seconds) after which no more rounds are started. Runs until a
+                strict plugin fails or `stop()` is called if not provided
+
+        Returns:
+            True if all the verification plugins passed in all the rounds, False otherwise
+        """
+        if interval <= 0:
+            raise ValueError("interval must be a positive number")
+
+        self._stop_event.clear()
+        self.execute_hooks("on_start")
+
+        deadline = time.monotonic() + (duration if duration is not None else math.inf)
+        round_number = 0
+        while True:
+            round_start = time.monotonic()
+
+            _verify_list = self._execute_round()
+            self.execute_hooks("on_each_round_end", round_number, _verify_list)
+            round_number += 1
+
+            if not all(_verify_list):
+                self.logger.info(msg="Stopping verification on failure of a plugin")
+                break
+
+            next_round_start = round_start + interval
+            if next_round_start >= deadline or self._stop_event.wait(
+                max(next_round_start - time.monotonic(), 0)
+            ):
+                break
+
+        self.execute_hooks("on_end", _verify_list)
+
+        return all(_verify_list)
+
+    def stop(self) -> None:
+        """
+        Stop the continuous verification after the round in progress.
+        """
+        self._stop_event.set()
+
+    def _execute_round(self) -> List[bool]:
+        if self.concurrency > 1:
+            return self._execute_concurrently()
+        else:
+            return self._execute_sequentially()
+
+    def _execute_sequentially(self) -> List[bool]:
         _verify_list = list()
         for index, (verification_plugin, data) in enumerate(
             zip(self.testplan.verification, self.verification_data)
@@ -158,20 +272,10 @@ class VerificationController(EventHook):
                 self.logger.info(
                     msg=f"Starting {verification_plugin.type.value} verification"
                 )
-                plugin_class = VERIFICATION_PLUGIN_MAP.get(
-                    verification_plugin.type.value, None
-                )
-
-                if plugin_class is None:
-                    # This can happen when a new plugin is not implemented yet, but is
-                    # available in the schema
-                    self.execute_hooks(
-                        "on_plugin_not_found", index, verification_plugin.type
-                    )
+                plugin = self._build_plugin(index, verification_plugin, data)
+                if plugin is None:
                     continue
 
-                plugin = plugin_class(verification_plugin.config, data)
-
                 # Delay before verifying
                 time.sleep(verification_plugin.delay_before / 1000)
 
@@ -197,10 +301,74 @@ class VerificationController(EventHook):
             # Delay after verifying
             time.sleep(verification_plugin.delay_after / 1000)
 
-        # Call all the hooks that were registered for `verification_end`.
-        self.execute_hooks("on_end", _verify_list)
+        return _verify_list
 
-        return all(_verify_list)
+    def _run_plugin(
+        self,
+        verification_plugin: VerificationConfig,
+        plugin: BaseVerificationPlugin,
+        dependencies: List[Future],
+    ) -> VerificationStateData:
+        # Dependencies are always submitted before the dependent plugin. The thread pool
+        # picks up the tasks in the order of submission, so this wait never deadlocks.
+        wait(dependencies)
+
+        time.sleep(verification_plugin.delay_before / 1000)
+
+        self.logger.info(msg=f"Starting {verification_plugin.type.value} verification")
+        state_data = plugin.run_verification()
+        self.logger.info(msg=f"Completed {verification_plugin.type.value} verification")
+
+        time.sleep(verification_plugin.delay_after / 1000)
+        return state_data
+
+    def _execute_concurrently(self) -> List[bool]:
+        _verify_list = list()
+        futures: Dict[int, Future] = dict()
+
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="verification"
+        ) as executor:
+            for index, (verification_plugin, data) in enumerate(
+                zip(self.testplan.verification, self.verification_data)
+            ):
+                assert isinstance(verification_plugin.states, List)  # For mypy
+                if self.current_state not in verification_plugin.states:
+                    data.add_data(self.current_state, None)
+                    continue
+
+                plugin = self._build_plugin(index, verification_plugin, data)
+                if plugin is None:
+                    continue
+
+                self.execute_hooks("on_each_plugin_start", index, verification_plugin)
+                futures[index] = executor.submit(
+                    self._run_plugin,
+                    verification_plugin,
+                    plugin,
+                    [
+                        futures[dependency]
+                        for dependency in verification_plugin.depends_on
+                        if dependency in futures
+                    ],
+                )
+
+            # Collect the results in the order of index
+            for index, future in futures.items():
+                verification_plugin = self.testplan.verification[index]
+                state_data = future.result()
+
+                self.execute_hooks(
+                    "on_each_plugin_end", index, verification_plugin, state_data
+                )
+
+                self.verification_data[index].replace_data(
+                    self.current_state, state_data
+                )
+                if verification_plugin.strict:
+                    _verify_list.append(state_data.rc == 0)
+
+        return _verify_list
 
     def get_encoded_verification_data(self):
         return [data.encoded_dict() for data in self.verification_data]
@@ -208,9 +376,24 @@ class VerificationController(EventHook):
     def dump_verification(self, fp, output_format):
         if output_format == "json":
             self.dump_verification_json(fp)
+        elif output_format == "jsonl":
+            self.dump_verification_jsonl(fp)
         else:
             self.dump_verification_yaml(fp)
 
+    def dump_verification_jsonl(self, fp, states: Optional[List[SystemState]] = None):
+        """
+        Write the verification data as JSON Lines records. Can be used to append the data
+        of the current run to an existing report.
+
+        Args:
+            fp: File object to which the records are written
+            states: System states of which the data is written. Defaults to all the states
+        """
+        JSONLinesReport.dump(
+            fp, self.verification_data, states if states else list(SystemState)
+        )
+
     def dump_verification_json(self, fp):
         import json
 
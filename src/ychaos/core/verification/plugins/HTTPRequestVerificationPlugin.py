@@ -3,25 +3,65 @@
 
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
-from typing import Optional
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
 from pydantic import BaseModel, validate_arguments
+from requests.adapters import HTTPAdapter
 
 from ....testplan.verification import HTTPRequestVerification
+from ....utils.histogram import LatencyHistogram
 from ..data import VerificationData, VerificationStateData
 from .BaseVerificationPlugin import RequestVerificationPlugin
 
 
+class RateLimiter:
+    """
+    Thread safe rate limiter that spaces out the callers of `acquire()`
+    to at most `rate` calls per second.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class HTTPRequestVerificationPlugin(RequestVerificationPlugin):
+    """
+    Verifies the status code and the latency of the responses of HTTP endpoints.
+
+    The data of the state data is a dictionary with the failed requests grouped by
+    the counter (`failures`), the latency summary (`latency`), the non-empty buckets of the
+    latency histogram (`latency_histogram`) and the breached latency percentiles (`latency_breaches`).
+    The latencies are None when no response was received.
+    """
+
     class HttpVerificationData(BaseModel):
         url: str  # Making this string since this is built with only trusted data
         status_code: Optional[int]
-        latency: Optional[int]
+        latency: Optional[float]
         error: Optional[str]
         error_desc: Optional[str]
 
     __verification_type__ = "http_request"
 
+    # Percentiles always reported in the latency summary
+    LATENCY_PERCENTILES = (50, 90, 99)
+
     @validate_arguments
     def __init__(
         self,
@@ -31,41 +71,114 @@ class HTTPRequestVerificationPlugin(RequestVerificationPlugin):
         super(HTTPRequestVerificationPlugin, self).__init__(config, state_data)
         self._session = self._build_session()
 
+        # Keep a pool of `concurrency` connections for each of the hosts
+        adapter = HTTPAdapter(
+            pool_connections=max(
+                len({urlparse(str(url)).netloc for url in self.config.urls}), 1
+            ),
+            pool_maxsize=self.config.concurrency,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(self.config.rate) if self.config.rate else None
+        )
+
+    def _request(self, url) -> Tuple[Optional[float], Optional[Dict[str, Any]]]:
+        """
+        Sends a request to the `url`
+
+        Returns:
+            Latency of the response in ms (None if the request failed) and the
+            failure data if the verification of the request failed (None otherwise)
+        """
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+
+        try:
+            response = self._session.request(
+                self.config.method,
+                url=str(url),
+                timeout=self.config.timeout / 1000,
+            )
+        except Exception as e:
+            return (
+                None,
+                self.HttpVerificationData(
+                    url=str(url), error=e.__class__.__name__, error_desc=str(e)
+                ).dict(),
+            )
+
+        latency = response.elapsed.total_seconds() * 1000
+        if response.status_code not in self.config.status_codes or (
+            # Latency is verified on percentiles when configured
+            not self.config.latency_percentiles
+            and latency > self.config.latency
+        ):
+            return (
+                latency,
+                self.HttpVerificationData(
+                    url=response.url,
+                    status_code=response.status_code,
+                    latency=latency,
+                ).dict(),
+            )
+        return latency, None
+
     def run_verification(self) -> VerificationStateData:
-        _rc = 0
-        _data = list()
-
-        for _ in range(self.config.count):
-            counter_data = list()
-
-            for url in self.config.urls:
-                try:
-                    response = self._session.request(
-                        self.config.method,
-                        url=str(url),
-                        timeout=self.config.timeout / 1000,
-                    )
-                    if (
-                        response.status_code not in self.config.status_codes
-                        or (response.elapsed.microseconds / 1000) > self.config.latency
-                    ):
-                        _rc = 1
-                        counter_data.append(
-                            self.HttpVerificationData(
-                                url=response.url,
-                                status_code=response.status_code,
-                                latency=response.elapsed.microseconds / 1000,
-                            ).dict()
-                        )
-                except Exception as e:
-                    _rc = 1
-                    counter_data.append(
-                        self.HttpVerificationData(
-                            url=str(url), error=e.__class__.__name__, error_desc=str(e)
-                        ).dict()
-                    )
-            _data.append(counter_data)
+        _requests = [
+            (counter, url)
+            for counter in range(self.config.count)
+            for url in self.config.urls
+        ]
+
+        if self.config.concurrency > 1:
+            with ThreadPoolExecutor(
+                max_workers=self.config.concurrency, thread_name_prefix="http_request"
+            ) as executor:
+                _results = list(
+                    executor.map(lambda request: self._request(request[1]), _requests)
+                )
+        else:
+            _results = [self._request(url) for _, url in _requests]
+
+        # The failures are grouped by the counter in the order of the urls
+        _failures: List[List[Dict[str, Any]]] = [
+            list() for _ in range(self.config.count)
+        ]
+        _histogram = LatencyHistogram()
+        for (counter, _), (latency, failure) in zip(_requests, _results):
+            if latency is not None:
+                _histogram.record(latency)
+            if failure is not None:
+                _failures[counter].append(failure)
+
+        _rc = int(any(_failures))
+
+        _latency_breaches: Dict[str, Optional[float]] = dict()
+        for percentile, expected_latency in self.config.latency_percentiles.items():
+            latency = _histogram.percentile(percentile)
+            if math.isnan(latency):
+                # No response was received
+                _latency_breaches[f"p{percentile:g}"] = None
+                _rc = 1
+            elif latency > expected_latency:
+                _latency_breaches[f"p{percentile:g}"] = latency
+                _rc = 1
 
         return VerificationStateData(
-            rc=_rc, type=self.__verification_type__, data=_data
+            rc=_rc,
+            type=self.__verification_type__,
+            data=dict(
+                failures=_failures,
+                latency=_histogram.summary(
+                    sorted(
+                        set(self.LATENCY_PERCENTILES)
+                        | set(self.config.latency_percentiles)
+                    )
+                ),
+                latency_histogram=_histogram.buckets(),
+                latency_breaches=_latency_breaches,
+            ),
         )
@@ -1,12 +1,20 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import json
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, validate_arguments
 
 from ....testplan.verification import OpenTSDBVerification
-from ....testplan.verification.plugins.metrics import MetricsComparator
+from ....testplan.verification.plugins.metrics import (
+    MetricsAggregator,
+    MetricsComparator,
+    TimeSeriesDataAggregator,
+)
+from ....utils.builtins import BuiltinUtils
+from ....utils.jsonstream import JSONArrayStream
 from ....utils.types import Json
 from ..data import VerificationData, VerificationStateData
 from .BaseVerificationPlugin import RequestVerificationPlugin
@@ -19,8 +27,18 @@ class OpenTSDBVerificationPlugin(RequestVerificationPlugin):
         data: Dict[datetime, float]
         response: Optional[Json]
 
+    class OpenTSDBSeriesSummary(BaseModel):
+        metric: Optional[str]
+        tags: Dict[str, str]
+        aggregatedTags: List[str]
+        datapoints: int
+        aggregated: Dict[str, float]
+
     __verification_type__ = "tsdb"
 
+    # Size of the chunks in which the response from the OpenTSDB server is read
+    CHUNK_SIZE = 1 << 16
+
     @validate_arguments
     def __init__(
         self,
@@ -38,6 +56,7 @@ class OpenTSDBVerificationPlugin(RequestVerificationPlugin):
             url=str(self.config.url),
             timeout=self.config.timeout / 1000,
             json=self.config.query,
+            stream=True,
         )
 
         if tsdb_response.status_code != 200:
@@ -52,38 +71,97 @@ class OpenTSDBVerificationPlugin(RequestVerificationPlugin):
                 ).dict(),
             )
 
-        else:
-            if len(self.config.criteria) != 0:
-                _rc = self.validate_criteria(tsdb_response.json())
-            else:
-                # TODO: Verify State Bound Critieria
-                pass
+        _summary = list()
+        with self._open_raw_data_file() as write_raw_data:
+            for _query_data in JSONArrayStream(
+                tsdb_response.iter_content(chunk_size=self.CHUNK_SIZE)
+            ):
+                write_raw_data(_query_data)
+
+                _aggregated = self._aggregate(_query_data["dps"])
+                if len(self.config.criteria) != 0:
+                    _rc = max(_rc, self._verify_criteria(_aggregated))
+                else:
+                    # TODO: Verify State Bound Critieria
+                    pass
+
+                _summary.append(
+                    self.OpenTSDBSeriesSummary(
+                        metric=_query_data.get("metric"),
+                        tags=_query_data.get("tags", dict()),
+                        aggregatedTags=_query_data.get("aggregatedTags", list()),
+                        datapoints=len(_query_data["dps"]),
+                        aggregated={
+                            _aggregator.value: _value
+                            for _aggregator, _value in _aggregated.items()
+                        },
+                    ).dict()
+                )
 
         return VerificationStateData(
-            rc=_rc, type=self.__verification_type__, data=tsdb_response.json()
+            rc=_rc,
+            type=self.__verification_type__,
+            data=dict(
+                series=_summary,
+                raw_data_file=BuiltinUtils.return_if_true(
+                    str(self.config.raw_data_file), self.config.raw_data_file
+                ),
+            ),
         )
 
-    def validate_criteria(self, response_data: List[Dict[str, Any]]):
+    @contextmanager
+    def _open_raw_data_file(self):
+        """
+        Yields a function that writes each of the time series to the `raw_data_file` as
+        an element of a JSON array, matching the response from the OpenTSDB server.
+        The function is a no-op when `raw_data_file` is not configured.
+        """
+        if not self.config.raw_data_file:
+            yield lambda query_data: None
+            return
+
+        with open(self.config.raw_data_file, "w") as raw_data_file:
+            separator = "["
+
+            def _write(query_data):
+                nonlocal separator
+                raw_data_file.write(separator)
+                json.dump(query_data, raw_data_file)
+                separator = ","
+
+            yield _write
+            raw_data_file.write("]" if separator == "," else "[]")
+
+    def _aggregate(self, dps: Dict[Any, float]) -> Dict[MetricsAggregator, float]:
+        # The datapoints are converted once and all the aggregators
+        # required by the criteria are computed together
+        return TimeSeriesDataAggregator.aggregate(
+            dps, {_criteria.aggregator for _criteria in self.config.criteria}
+        )
+
+    def _verify_criteria(self, aggregated: Dict[MetricsAggregator, float]) -> int:
         def _get_comparator_args(condition, aggregated_data):
             if condition.comparator == MetricsComparator.RANGE:
                 return condition.comparator_raw, aggregated_data, condition.value
             return aggregated_data, condition.value
 
-        for _query_data in response_data:
+        for _criteria in self.config.criteria:
 
-            for _criteria in self.config.criteria:
+            _aggregated_data = aggregated[_criteria.aggregator]
 
-                _aggregated_data = _criteria.aggregator.metadata.aggregate(  # type: ignore
-                    _query_data["dps"]
-                )
+            for _condition in _criteria.conditionals:
+                if _condition.comparator.metadata.compare(
+                    *_get_comparator_args(_condition, _aggregated_data)
+                ):
+                    break
+            else:
+                return 1
 
-                for _condition in _criteria.conditionals:
-                    if _condition.comparator.metadata.compare(
-                        *_get_comparator_args(_condition, _aggregated_data)
-                    ):
-                        break
-                else:
-                    return 1
+        return 0
 
+    def validate_criteria(self, response_data: List[Dict[str, Any]]):
+        for _query_data in response_data:
+            if self._verify_criteria(self._aggregate(_query_data["dps"])):
+                return 1
         else:
             return 0
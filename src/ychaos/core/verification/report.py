@@ -0,0 +1,125 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import re
+from pathlib import Path
+from typing import IO, Dict, Iterable, List, Optional, Union
+
+from ...testplan import SystemState
+from .data import VerificationData, VerificationStateData
+
+
+class JSONLinesReport:
+    """
+    Verification report in the JSON Lines format. Each line of the report is a record of the
+    state data of a verification plugin in a system state.
+
+    ```json
+    {"index": 0, "state": "STEADY", "data": {"rc": 0, "timestamp": 1627311600, "type": "http_request", "data": {...}}}
+    ```
+
+    The records are only ever appended to the report, so writing the data of a new run (or a new round of
+    continuous verification) does not require reading or rewriting the data of the previous runs. When the
+    report is read, the latest record of each plugin index and system state wins. Only the header of each
+    line is parsed to find the latest records and the state data is decoded lazily, when a plugin index is
+    requested, so the time taken to load the report grows only marginally with the history in it.
+    """
+
+    _header = re.compile(rb'^\{"index": (\d+), "state": "([A-Z]+)", "data": ')
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Path of the report file
+        """
+        self.path = Path(path)
+        self._offsets: Optional[Dict[int, Dict[SystemState, int]]] = None
+
+    @classmethod
+    def dump(
+        cls,
+        fp: IO[str],
+        verification_data: List[VerificationData],
+        states: Iterable[SystemState] = tuple(SystemState),
+    ) -> None:
+        """
+        Write the records of the verification data in `states` to `fp`. The records of
+        the states for which the data is not present are skipped.
+
+        Args:
+            fp: File object (opened in text mode) to which the records are written
+            verification_data: Verification data of the plugins, in the order of the testplan
+            states: System states of which the data is written
+        """
+        states = list(states)
+        for index, data in enumerate(verification_data):
+            for state in states:
+                state_data = data.get_data(state)
+                if state_data is not None:
+                    fp.write(
+                        f'{{"index": {index}, "state": "{state.value}", "data": {state_data.json()}}}\n'
+                    )
+
+    def _scan(self) -> Dict[int, Dict[SystemState, int]]:
+        if self._offsets is None:
+            self._offsets = dict()
+            offset = 0
+            with open(self.path, "rb") as fp:
+                for line in fp:
+                    match = self._header.match(line)
+                    # A line without a newline at the end is a record being written
+                    if match and line.endswith(b"\n"):
+                        self._offsets.setdefault(int(match.group(1)), dict())[
+                            SystemState(match.group(2).decode())
+                        ] = offset
+                    offset += len(line)
+        return self._offsets
+
+    def __len__(self):
+        offsets = self._scan()
+        return max(offsets) + 1 if offsets else 0
+
+    def _read(
+        self, fp: IO[bytes], index: int
+    ) -> Dict[SystemState, Optional[VerificationStateData]]:
+        records: Dict[SystemState, Optional[VerificationStateData]] = dict.fromkeys(
+            SystemState, None
+        )
+        for state, offset in self._scan().get(index, dict()).items():
+            fp.seek(offset)
+            line = fp.readline()
+            header_end = self._header.match(line).end()  # type: ignore
+            # The state data is the line after the header, without the closing brace
+            records[state] = VerificationStateData.parse_raw(
+                line[header_end:].rstrip()[:-1]
+            )
+        return records
+
+    def get(self, index: int) -> Dict[SystemState, Optional[VerificationStateData]]:
+        """
+        Returns the latest state data of the plugin at `index` in each of the system states.
+
+        Args:
+            index: Index of the verification plugin in the testplan
+
+        Returns:
+            The state data keyed by the system state, None for the states without data
+        """
+        with open(self.path, "rb") as fp:
+            return self._read(fp, index)
+
+    def load(
+        self, size: Optional[int] = None
+    ) -> List[Dict[SystemState, Optional[VerificationStateData]]]:
+        """
+        Returns the latest state data of each of the plugins
+
+        Args:
+            size: Number of verification plugins. Defaults to the highest index in the report + 1
+
+        Returns:
+            List of the state data of the plugins keyed by the system state, in the order of the testplan
+        """
+        if size is None:
+            size = len(self)
+        with open(self.path, "rb") as fp:
+            return [self._read(fp, index) for index in range(size)]
@@ -2,18 +2,47 @@
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 import getpass
 import os
+import random
 import re
+from collections import Counter
 from enum import Enum
 from pathlib import Path
 from types import SimpleNamespace
-from typing import Any, Dict, List, Optional, TypeVar, Union
-
-from pydantic import Field, FilePath, SecretStr, validator
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pydantic import (
+    Field,
+    FilePath,
+    PositiveInt,
+    PrivateAttr,
+    SecretStr,
+    validator,
+)
 
 from ..agents.index import AgentType
 from ..utils.builtins import FQDN, AEnum
 from . import SchemaModel
 from .common import Secret, SecretType
+from .inventory import (
+    NO_LABELS,
+    HostFile,
+    HostPattern,
+    allocate_quotas,
+    reservoir_sample,
+    stratified_sample,
+)
 
 
 class TargetDefinition(SchemaModel):
@@ -55,6 +84,107 @@ class SSHConfig(SchemaModel):
         return v
 
 
+class AgentBundleConfig(SchemaModel):
+    """
+    The configuration of the agent bundle. When configured, the executor builds a
+    wheelhouse of `requirement` locally, copies it once to each of the target hosts and
+    caches the installation on the host between the runs, keyed by the content hash of the bundle.
+    """
+
+    requirement: str = Field(
+        default="ychaos[agents]",
+        description="The pip requirement specifier of the package to be bundled",
+        examples=["ychaos[agents]", "ychaos[agents]==0.5.0"],
+    )
+    pip_args: List[str] = Field(
+        default=list(),
+        description="Additional arguments to be passed to `pip wheel` while building the bundle",
+        examples=[["--index-url", "https://pypi.example.com/simple"]],
+    )
+    cache_dir: str = Field(
+        default=".ychaos_cache",
+        description="The directory on the target host, relative to the login directory, where the bundles are cached",
+    )
+
+
+class StratificationConfig(SchemaModel):
+    """
+    The configuration of the stratified selection of the target hosts. The effective hosts are
+    grouped by the values of the `group_by` labels, and `blast_radius`% of the hosts of each group
+    are selected, so that the attack is spread across the groups (e.g. zones, racks or services)
+    in proportion to their size.
+
+    The labels of a host are read from the `label=value` columns following the host in the
+    `hostfiles` (See [HostFile][ychaos.testplan.inventory.HostFile]) and from the named groups of
+    `pattern` searched in the hostname. The columns take precedence over the pattern. The hosts
+    without a label are grouped together with an empty value for the label.
+    """
+
+    group_by: List[str] = Field(
+        ...,
+        description="The labels by which the effective hosts are grouped",
+        examples=[["zone"], ["zone", "rack"]],
+        min_items=1,
+    )
+
+    pattern: Optional[str] = Field(
+        default=None,
+        description=(
+            "Regular expression searched in each hostname. "
+            "The named groups of the expression are the labels of the host"
+        ),
+        examples=[r"^(?P<service>[a-z]+)\d+\.(?P<rack>[a-z0-9]+)\.yahoo\.com$"],
+    )
+
+    min_hosts_per_group: int = Field(
+        default=0,
+        description=(
+            "The minimum number of hosts selected from each group (or all the hosts of the group, if less). "
+            "Ensures that the small groups are attacked as well."
+        ),
+        ge=0,
+    )
+
+    max_hosts_per_group: Optional[PositiveInt] = Field(
+        default=None,
+        description="The maximum number of hosts selected from each group",
+        examples=[5],
+    )
+
+    _pattern = PrivateAttr(default=None)
+
+    def get_group(self, host: str, labels: Mapping[str, str]) -> Tuple[str, ...]:
+        """
+        Returns the group of a host, the values of its `group_by` labels
+
+        Args:
+            host: The host
+            labels: The labels of the host from the host file
+
+        Returns:
+            The group of the host
+        """
+        if self.pattern is not None:
+            if self._pattern is None:
+                self._pattern = re.compile(self.pattern)
+            match = self._pattern.search(host)
+            if match is not None:
+                labels = {
+                    **{k: v for k, v in match.groupdict().items() if v is not None},
+                    **labels,
+                }
+        return tuple(labels.get(label, "") for label in self.group_by)
+
+    @validator("pattern")
+    def validate_pattern(cls, v):
+        if v is not None:
+            try:
+                re.compile(v)
+            except re.error as error:
+                raise ValueError(f"Invalid regular expression: {error}")
+        return v
+
+
 class MachineTargetDefinition(TargetDefinition):
     """
     Represents the configuration when the target is a Virtual machine
@@ -65,13 +195,40 @@ class MachineTargetDefinition(TargetDefinition):
         blast_radius: The percentage of targets to be attacked. **This is a required field**
         ssh_config: The SSH Configuration to be used while logging into the hosts. See [SSHConfig][ychaos.testplan.attack.SSHConfig]
         hostnames: List of hosts as targets to run the agents on. These should be valid FQDNs.
-        hostpatterns: List of Host patterns with a single number range within the pattern
+        hostpatterns: List of Host patterns with one or more number ranges within the pattern
         hostfiles:
             List of files containing hostnames separated by a newline
             The path provided can be an absolute path or a relative path from which the tool is invoked.
+            See [HostFile][ychaos.testplan.inventory.HostFile]
+        hostfile_cache_dir: Directory in which the validated hosts of the `hostfiles` are cached.
+        seed: Seed of the random selection of the target hosts
+        stratify:
+            Select the target hosts from the groups of the hosts, in proportion to their size.
+            See [StratificationConfig][ychaos.testplan.attack.StratificationConfig]
         exclude:
             List of hosts to be always excluded out of the attack.
             The filtering criteria will always exclude the hosts in this list
+        forks: Number of hosts that are attacked in parallel.
+        serial:
+            Rolling wave size. When set, the target hosts are attacked in waves of `serial` hosts,
+            each wave starting once the previous wave has completed.
+        max_fail_percentage:
+            The maximum percentage of hosts in a wave that can fail before the remaining waves are aborted.
+        agent_bundle:
+            Install the agents from a bundle built locally instead of installing `ychaos[agents]`
+            from the package index on every host. See [AgentBundleConfig][ychaos.testplan.attack.AgentBundleConfig]
+
+    The effective hosts (the hosts from `hostnames`, `hostpatterns` and `hostfiles`, without duplicates
+    and without the `exclude` hosts) are streamed from the sources by `iterate_effective_hosts()`, and the
+    hosts to be attacked are selected from the stream by `sample_effective_hosts()` without building the
+    list of all the effective hosts. The number of the hosts to be selected depends on the number of the effective
+    hosts, so the sources are read twice: once to count the effective hosts (or, with `stratify`, the hosts of
+    each group) and once to select the hosts. Without `hostfile_cache_dir`, the `hostfiles` are parsed and validated
+    in both the passes. The selection depends only on the `seed` and the effective hosts, so that a run can be
+    replayed by configuring the seed of the run.
+
+    The effective hosts and their count are memoized, and are computed again when `hostnames`, `hostpatterns`,
+    `hostfiles` or `exclude` are reassigned.
 
     Warning:
         Testplan validator will not be able to validate each of the host entries if the targets are provided
@@ -97,24 +254,54 @@ class MachineTargetDefinition(TargetDefinition):
 
     hostpatterns: List[str] = Field(
         default=list(),
-        description="List of Host patterns with a single number range within the pattern",
+        description="List of Host patterns with one or more number ranges within the pattern",
         examples=[
-            ["myhost[12-34].yahoo.com", "hostpattern[00-10].mock.yahoo.com"],
+            ["myhost[12-34].yahoo.com", "hostpattern[00-10].rack[1-4].mock.yahoo.com"],
         ],
     )
 
     hostfiles: List[FilePath] = Field(
         default=list(),
         description=(
-            "List of files containing hostnames separated by a newline"
+            "List of files containing hostnames separated by a newline. "
+            "The text after a `#` is a comment and the blank lines are ignored. "
+            "The files can be compressed with gzip or zstd. "
             "The path provided can be an absolute path or a relative path from which the tool is invoked."
             "Note that the testplan will not validate each file during static validation."
         ),
         examples=[
-            ["/home/awesomeuser/hostlist.txt", "/home/awesomeuser/tmp/inventory.txt"]
+            ["/home/awesomeuser/hostlist.txt", "/home/awesomeuser/tmp/inventory.txt.gz"]
         ],
     )
 
+    hostfile_cache_dir: Optional[Path] = Field(
+        default=None,
+        description=(
+            "Directory in which the validated hosts of the `hostfiles` are cached, keyed by the content of the files. "
+            "The files that have not changed since the previous run are not read and validated again. "
+            "The hosts are not cached if not configured"
+        ),
+        examples=["~/.cache/ychaos/hostfiles"],
+    )
+
+    seed: Optional[int] = Field(
+        default=None,
+        description=(
+            "Seed of the random selection of the target hosts. "
+            "The same hosts are selected out of the same effective hosts with the same seed. "
+            "A seed is drawn at random if not configured"
+        ),
+        examples=[42],
+    )
+
+    stratify: Optional[StratificationConfig] = Field(
+        default=None,
+        description=(
+            "Select `blast_radius`% of the hosts of each group of the effective hosts, "
+            "instead of `blast_radius`% of all the effective hosts"
+        ),
+    )
+
     exclude: List[FQDN] = Field(
         default=list(),
         description=(
@@ -123,64 +310,172 @@ class MachineTargetDefinition(TargetDefinition):
         ),
     )
 
-    def iterate_hostfiles(self):
+    forks: Optional[PositiveInt] = Field(
+        default=None,
+        description=(
+            "Number of hosts that are attacked in parallel. "
+            "Defaults to the wave size (`serial`) in rolling wave mode and 5 otherwise."
+        ),
+    )
+
+    serial: Optional[PositiveInt] = Field(
+        default=None,
+        description=(
+            "Attack the target hosts in rolling waves of `serial` hosts. "
+            "The next wave is started only after the previous wave has completed."
+        ),
+        examples=[10, 100],
+    )
+
+    max_fail_percentage: Optional[int] = Field(
+        default=None,
+        description=(
+            "The maximum percentage of hosts in a wave that are allowed to fail. "
+            "The remaining waves are aborted once this percentage is exceeded."
+        ),
+        ge=0,
+        le=100,
+    )
+
+    agent_bundle: Optional[AgentBundleConfig] = Field(
+        default=None,
+        description=(
+            "Install the agents on the target hosts from a bundle built locally. "
+            "The bundle is cached on the hosts between the runs."
+        ),
+    )
+
+    def get_forks(self) -> Optional[int]:
+        """
+        Returns the number of hosts to be attacked in parallel. In rolling wave mode,
+        defaults to the size of the wave so that all the hosts in a wave are attacked together.
+        """
+        return self.forks or self.serial
+
+    # Memoized effective hosts, reset when one of the fields they are derived from is reassigned
+    _effective_hosts: Optional[List[str]] = PrivateAttr(default=None)
+    _effective_hosts_count: Optional[int] = PrivateAttr(default=None)
+
+    _effective_hosts_fields: ClassVar[FrozenSet[str]] = frozenset(
+        ("hostnames", "hostpatterns", "hostfiles", "exclude")
+    )
+
+    def __setattr__(self, name, value):
+        super(MachineTargetDefinition, self).__setattr__(name, value)
+        if name in self._effective_hosts_fields:
+            self._effective_hosts = None
+            self._effective_hosts_count = None
+
+    def iterate_hostfile_records(self) -> Iterator[Tuple[str, Mapping[str, str]]]:
+        cache_dir = self.hostfile_cache_dir
+        if cache_dir is not None:
+            cache_dir = cache_dir.expanduser()
         for file in self.hostfiles:
-            for host in file.read_text().strip().splitlines():
-                yield FQDN(host)
+            yield from HostFile(file, cache_dir).records()
+
+    def iterate_hostfiles(self):
+        for host, _ in self.iterate_hostfile_records():
+            yield host
 
     def iterate_hostpattern(self):
         for v in self.hostpatterns:
-            match = re.search(r"\[((\d+)-(\d+))\]", v)
-            if match is None:
-                yield FQDN(v)
-
-            else:
-                range_start = match.group(2)
-                range_end = match.group(3)
-
-                for num in range(int(range_start), int(range_end) + 1):
-                    yield FQDN(
-                        v[: match.start()]
-                        + str(num).zfill(len(range_start))
-                        + v[match.end() :]
-                    )
+            yield from HostPattern(v)
 
     def expand_hostpatterns(self) -> List[FQDN]:
-        expanded_list = list()
-        for hostname in self.iterate_hostpattern():
-            expanded_list.append(hostname)
-
-        return expanded_list
+        return list(self.iterate_hostpattern())
 
     def expand_hostfiles(self):
-        expanded_list = list()
-        for host in self.iterate_hostfiles():
-            expanded_list.append(host)
-        return expanded_list
-
-    def get_effective_hosts(self):
-        return list(
-            set(
-                self.expand_hostpatterns() + self.expand_hostfiles() + self.hostnames
-            ).difference(set(self.exclude))
+        return list(self.iterate_hostfiles())
+
+    def iterate_effective_records(self) -> Iterator[Tuple[str, Mapping[str, str]]]:
+        """
+        Streams the effective hosts from `hostpatterns`, `hostfiles` and `hostnames` (in that order)
+        along with their labels, skipping the duplicates and the `exclude` hosts. Only the set of
+        the hosts seen is held in memory. Only the hosts from the `hostfiles` have labels.
+
+        Returns:
+            Iterator of the effective hosts along with their labels
+        """
+        seen = set(self.exclude)
+        for source in (
+            ((host, NO_LABELS) for host in self.iterate_hostpattern()),
+            self.iterate_hostfile_records(),
+            ((host, NO_LABELS) for host in self.hostnames),
+        ):
+            for host, labels in source:
+                if host not in seen:
+                    seen.add(host)
+                    yield host, labels
+
+    def iterate_effective_hosts(self) -> Iterator[str]:
+        """
+        Streams the effective hosts. See `iterate_effective_records()`
+
+        Returns:
+            Iterator of the effective hosts
+        """
+        for host, _ in self.iterate_effective_records():
+            yield host
+
+    def get_effective_hosts(self) -> List[str]:
+        if self._effective_hosts is None:
+            self._effective_hosts = list(self.iterate_effective_hosts())
+            self._effective_hosts_count = len(self._effective_hosts)
+        return self._effective_hosts
+
+    def count_effective_hosts(self) -> int:
+        if self._effective_hosts_count is None:
+            self._effective_hosts_count = sum(1 for _ in self.iterate_effective_hosts())
+        return self._effective_hosts_count
+
+    def sample_effective_hosts(self, rng: Optional[random.Random] = None) -> List[str]:
+        """
+        Selects `blast_radius`% of the effective hosts at random. The hosts are selected with
+        reservoir sampling from the stream of the effective hosts, so that only the selected
+        hosts are held in memory. With `stratify`, `blast_radius`% of the hosts of each group
+        are selected instead (See [allocate_quotas][ychaos.testplan.inventory.allocate_quotas]).
+
+        Args:
+            rng: Random number generator. Defaults to a generator seeded with `seed`
+
+        Returns:
+            List of the selected hosts
+        """
+        rng = rng or random.Random(self.seed)
+        if self.stratify is None:
+            k = self.blast_radius * self.count_effective_hosts() // 100
+            return reservoir_sample(
+                self._effective_hosts
+                if self._effective_hosts is not None
+                else self.iterate_effective_hosts(),
+                k,
+                rng,
+            )
+
+        get_group = self.stratify.get_group
+        sizes = Counter(
+            get_group(host, labels) for host, labels in self.iterate_effective_records()
+        )
+        self._effective_hosts_count = sum(sizes.values())
+        quotas = allocate_quotas(
+            sizes,
+            self.blast_radius,
+            self.stratify.min_hosts_per_group,
+            self.stratify.max_hosts_per_group,
+        )
+        return stratified_sample(
+            (
+                (host, get_group(host, labels))
+                for host, labels in self.iterate_effective_records()
+            ),
+            quotas,
+            sizes,
+            rng,
         )
 
     @validator("hostpatterns", pre=True, each_item=True)
     def validate_hostpatterns(cls, v):
-        match = re.search(r"\[((\d+)-(\d+))\]", v)
-        if match is None:
-            FQDN(v)
-
-        else:
-            range_start = match.group(2)
-            range_end = match.group(3)
-
-            for num in range(int(range_start), int(range_end) + 1):
-                FQDN(
-                    v[: match.start()]
-                    + str(num).zfill(len(range_start))
-                    + v[match.end() :]
-                )
+        HostPattern(v).validate()
         return v
 
 
@@ -0,0 +1,406 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import math
+import os
+import random
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import (
+    IO,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from ..utils.builtins import FQDN
+from ..utils.dependency import DependencyUtils
+
+T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+
+# Marks the end of an iterator
+_END = object()
+
+# The labels of the hosts without labels, shared to avoid a dictionary per host
+NO_LABELS: Mapping[str, str] = MappingProxyType(dict())
+
+
+class HostPattern:
+    """
+    A host pattern with one or more number ranges, each of which is expanded to
+    the numbers in the range (both ends included). The numbers are zero padded
+    to the width of the start of the range.
+
+    ```python
+    >>> list(HostPattern("web[8-10].rack[01-02].yahoo.com"))
+    ['web8.rack01.yahoo.com', 'web8.rack02.yahoo.com', 'web9.rack01.yahoo.com', ...]
+    ```
+
+    The hosts are generated lazily and the number of hosts is computed without expanding
+    the pattern. As the ranges only insert digits into the pattern, every host expanded from
+    a pattern is a valid FQDN if the longest of them is, so the pattern is validated by
+    validating a single host.
+    """
+
+    _range = re.compile(r"\[(\d+)-(\d+)\]")
+
+    def __init__(self, pattern: str):
+        """
+        Args:
+            pattern: Host pattern
+        """
+        self.pattern = pattern[:-1] if pattern.endswith(".") else pattern
+
+        # The constant parts of the pattern, around the ranges
+        self._parts: List[str] = list()
+        self._ranges: List[range] = list()
+        self._widths: List[int] = list()
+
+        start = 0
+        for match in self._range.finditer(self.pattern):
+            self._parts.append(self.pattern[start : match.start()])
+            self._ranges.append(range(int(match.group(1)), int(match.group(2)) + 1))
+            self._widths.append(len(match.group(1)))
+            start = match.end()
+        self._parts.append(self.pattern[start:])
+
+    def _format(self, numbers: Iterable[int]) -> str:
+        host = self._parts[0]
+        for number, width, part in zip(numbers, self._widths, self._parts[1:]):
+            host += str(number).zfill(width) + part
+        return host
+
+    def __len__(self) -> int:
+        count = 1
+        for _range in self._ranges:
+            count *= len(_range)
+        return count
+
+    def __iter__(self) -> Iterator[str]:
+        for numbers in itertools.product(*self._ranges):
+            yield self._format(numbers)
+
+    def validate(self) -> None:
+        """
+        Validates that the hosts expanded from the pattern are valid FQDNs
+
+        Raises:
+            ValueError: If the hosts are not valid FQDNs
+        """
+        if len(self) > 0:
+            FQDN(self._format(_range[-1] for _range in self._ranges))
+
+
+class HostFile:
+    """
+    Hosts listed in a file, one host per line. The file can be compressed with gzip or zstd
+    (detected from the content of the file). The text after a `#` is a comment, and the blank
+    lines are skipped. The file is read line by line, so that only one line is held in memory.
+
+    The host can be followed by columns of `label=value` labelling the host, separated by whitespace.
+    The labels are used to group the hosts while selecting the hosts to attack.
+
+    ```
+    # host                 labels
+    web01.yahoo.com        zone=us-east-1a rack=r12
+    web02.yahoo.com        zone=us-east-1b rack=r07
+    ```
+
+    With a `cache_dir`, the validated hosts of the file are cached in `cache_dir` keyed by the SHA-256
+    digest of the file, and the file is neither decompressed nor validated again while it has the
+    same content. The digest of a file is recorded along with its size, modification time and inode,
+    so that the file is not read again while these have not changed.
+
+    Reading zstd compressed files requires the [zstandard](https://pypi.org/project/zstandard/) package.
+    """
+
+    GZIP_MAGIC = b"\x1f\x8b"
+    ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+    # Changing the parsing of the files requires a new cache format
+    CACHE_FORMAT = "2"
+
+    _label = re.compile(r"^([\w.-]+)=(\S+)$")
+
+    def __init__(self, path: Path, cache_dir: Optional[Path] = None):
+        """
+        Args:
+            path: Path of the host file
+            cache_dir: Directory in which the hosts are cached. The hosts are not cached if not configured
+        """
+        self.path = Path(path)
+        self.cache_dir = cache_dir
+
+    def _open(self) -> IO[str]:
+        with open(self.path, "rb") as fp:
+            magic = fp.read(4)
+
+        if magic.startswith(self.GZIP_MAGIC):
+            return gzip.open(self.path, "rt")
+        if magic.startswith(self.ZSTD_MAGIC):
+            zstandard = DependencyUtils.import_module(
+                "zstandard",
+                message="zstandard is required to read the zstd compressed host file {}".format(
+                    self.path
+                ),
+                warn=False,
+            )
+            return io.TextIOWrapper(
+                zstandard.ZstdDecompressor().stream_reader(open(self.path, "rb"))
+            )
+        return open(self.path, "r")
+
+    def _parse_labels(self, host: str, columns: List[str]) -> Mapping[str, str]:
+        if not columns:
+            return NO_LABELS
+
+        labels = dict()
+        for column in columns:
+            match = self._label.match(column)
+            if match is None:
+                raise ValueError(
+                    f"Invalid column {column} of {host} in {self.path}, expected label=value"
+                )
+            labels[match.group(1)] = match.group(2)
+        return labels
+
+    def parse(self) -> Iterator[Tuple[str, Mapping[str, str]]]:
+        """
+        Reads and validates the hosts of the file, without the cache
+
+        Raises:
+            ValueError: If a host is not a valid FQDN or a column is not a label
+
+        Returns:
+            Iterator of the hosts along with their labels
+        """
+        with self._open() as fp:
+            for line in fp:
+                columns = line.split("#", 1)[0].split()
+                if columns:
+                    host = FQDN(columns[0])
+                    yield host, self._parse_labels(host, columns[1:])
+
+    def _digest(self) -> str:
+        _hash = hashlib.sha256(self.CACHE_FORMAT.encode())
+        with open(self.path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                _hash.update(chunk)
+        return _hash.hexdigest()
+
+    def _cached_digest(self) -> str:
+        assert self.cache_dir is not None  # For mypy
+        path = str(self.path.resolve())
+        stat = os.stat(path)
+        key = [self.CACHE_FORMAT, stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+        name = hashlib.sha1(path.encode()).hexdigest()  # nosec : Not used for security
+        index = self.cache_dir / f"{name}.json"
+        try:
+            with open(index, "r") as fp:
+                entry = json.load(fp)
+            if entry["path"] == path and entry["key"] == key:
+                return entry["digest"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        digest = self._digest()
+        self._write_atomically(
+            index, json.dumps(dict(path=path, key=key, digest=digest))
+        )
+        return digest
+
+    @staticmethod
+    def _temp_path(path: Path) -> Path:
+        return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    @classmethod
+    def _write_atomically(cls, path: Path, content: str) -> None:
+        temp_path = cls._temp_path(path)
+        with open(temp_path, "w") as fp:
+            fp.write(content)
+        os.replace(temp_path, path)
+
+    def records(self) -> Iterator[Tuple[str, Mapping[str, str]]]:
+        """
+        Reads the hosts of the file along with their labels, from the cache if configured
+
+        Raises:
+            ValueError: If a host is not a valid FQDN or a column is not a label
+
+        Returns:
+            Iterator of the hosts along with their labels
+        """
+        if self.cache_dir is None:
+            yield from self.parse()
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        hosts_path = self.cache_dir / f"{self._cached_digest()}.hosts"
+        try:
+            with open(hosts_path, "r") as fp:
+                for line in fp:
+                    host, *columns = line.split()
+                    yield host, (
+                        dict(column.split("=", 1) for column in columns)
+                        if columns
+                        else NO_LABELS
+                    )
+            return
+        except FileNotFoundError:
+            pass
+
+        # The hosts are cached once the file is read and validated completely
+        temp_path = self._temp_path(hosts_path)
+        try:
+            with open(temp_path, "w") as fp:
+                for host, labels in self.parse():
+                    fp.write(
+                        " ".join([host, *(f"{k}={v}" for k, v in labels.items())])
+                        + "\n"
+                    )
+                    yield host, labels
+            os.replace(temp_path, hosts_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def __iter__(self) -> Iterator[str]:
+        for host, _ in self.records():
+            yield host
+
+
+def reservoir_sample(iterable: Iterable[T], k: int, rng: random.Random) -> List[T]:
+    """
+    Selects `k` items at random from an iterable of an unknown length in a single pass, holding only
+    the selected items in memory. Uses the Algorithm L (Li, 1994), which draws random numbers only
+    for the items replacing an item in the reservoir, i.e. `O(k(1 + log(n/k)))` random numbers.
+
+    Args:
+        iterable: Items to select from
+        k: Number of items to select
+        rng: Random number generator
+
+    Returns:
+        `k` items (or all the items, if there are less than `k`) in a random order
+    """
+    iterator = iter(iterable)
+    reservoir = list(itertools.islice(iterator, max(k, 0)))
+    if len(reservoir) < k or k <= 0:
+        rng.shuffle(reservoir)
+        return reservoir
+
+    # 1 - random() is in (0, 1], of which the logarithm is defined
+    w = math.exp(math.log(1 - rng.random()) / k)
+    while 0 < w < 1:
+        skip = math.floor(math.log(1 - rng.random()) / math.log(1 - w))
+        item = next(itertools.islice(iterator, skip, skip + 1), _END)
+        if item is _END:
+            break
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(1 - rng.random()) / k)
+
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def allocate_quotas(
+    sizes: Mapping[K, int],
+    percentage: int,
+    minimum: int = 0,
+    maximum: Optional[int] = None,
+) -> Dict[K, int]:
+    """
+    Allocates `percentage`% of the items of a number of groups to the groups, in proportion to the
+    size of the groups. The total is `percentage`% of all the items (rounded down), and each group
+    is allocated `percentage`% of its items, rounded down or up (the largest remainder method).
+    The allocation of each group is then raised to `minimum` (or the size of the group, if smaller)
+    and lowered to `maximum`.
+
+    ```python
+    >>> allocate_quotas({"us-east": 60, "us-west": 30, "eu": 10}, 15)
+    {'us-east': 9, 'us-west': 5, 'eu': 1}
+    ```
+
+    Args:
+        sizes: Number of items of each group
+        percentage: Percentage of the items to allocate
+        minimum: Minimum number of items allocated to each group
+        maximum: Maximum number of items allocated to each group. Not capped if None
+
+    Returns:
+        Number of items allocated to each group
+    """
+    quotas: Dict[K, int] = dict()
+    remainders: Dict[K, int] = dict()
+    for group, size in sizes.items():
+        quotas[group], remainders[group] = divmod(percentage * size, 100)
+
+    # The groups with the largest remainders get an additional item, the ties
+    # are resolved in the order of the groups, so that the allocation is deterministic
+    extra = percentage * sum(sizes.values()) // 100 - sum(quotas.values())
+    for group in heapq.nlargest(extra, remainders, key=remainders.__getitem__):
+        quotas[group] += 1
+
+    for group, size in sizes.items():
+        quotas[group] = max(quotas[group], min(minimum, size))
+        if maximum is not None:
+            quotas[group] = min(quotas[group], maximum)
+    return quotas
+
+
+def stratified_sample(
+    items: Iterable[Tuple[T, K]],
+    quotas: Mapping[K, int],
+    sizes: Mapping[K, int],
+    rng: random.Random,
+) -> List[T]:
+    """
+    Selects `quotas[group]` items at random out of the `sizes[group]` items of each group, in a
+    single pass over the items, holding only the selected items in memory. Each item is selected
+    with the probability of the number of items yet to be selected from its group over the number
+    of items of the group yet to be seen (the selection sampling, Algorithm S of Knuth), so that
+    exactly `quotas[group]` items are selected from each group, each of the items with the same
+    probability. A random number is drawn only for the items of the groups with items yet to be selected.
+
+    The items of the groups that are not in `sizes` and the items beyond the size of their group are skipped.
+
+    Args:
+        items: Items along with their group
+        quotas: Number of items to select from each group
+        sizes: Number of items of each group
+        rng: Random number generator
+
+    Returns:
+        The selected items in a random order
+    """
+    remaining = dict(sizes)
+    wanted = {group: min(quotas.get(group, 0), size) for group, size in sizes.items()}
+
+    selected: List[T] = list()
+    for item, group in items:
+        size = remaining.get(group, 0)
+        if size <= 0:
+            continue
+        remaining[group] = size - 1
+
+        quota = wanted[group]
+        if quota > 0 and rng.random() * size < quota:
+            wanted[group] = quota - 1
+            selected.append(item)
+
+    rng.shuffle(selected)
+    return selected
@@ -6,7 +6,7 @@ from typing import Any, Callable, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
 import yaml
-from pydantic import Extra, Field
+from pydantic import Extra, Field, validator
 
 from ..utils.yaml import Dumper
 from . import SchemaModel, SystemState
@@ -34,6 +34,16 @@ class TestPlanSchema(SchemaModel):
         ..., description="The configuration that will be used to create chaos"
     )
 
+    @validator("verification")
+    def _validate_verification_dependencies(cls, v):
+        for index, verification_config in enumerate(v):
+            for dependency in verification_config.depends_on:
+                if not 0 <= dependency < index:
+                    raise ValueError(
+                        f"verification[{index}] can only depend on the preceding verification configurations"
+                    )
+        return v
+
     def filter_verification_by_state(
         self, system_state: SystemState
     ) -> List[VerificationConfig]:
@@ -1,14 +1,77 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Dict, Iterable, Optional, Union
 
 import yaml
+from pydantic import ValidationError
 
+from ..settings import ApplicationSettings
 from .schema import TestPlan
 
 
+def _validate_content(content: bytes) -> Optional[str]:
+    # Module level, so that it can be run in the worker processes
+    try:
+        TestPlanValidator.validate_data(yaml.safe_load(content))
+    except ValidationError as validation_error:
+        return str(validation_error)
+    except (yaml.YAMLError, UnicodeDecodeError) as parse_error:
+        # Reported as the result of the file, not to fail the other files
+        return f"Error while parsing the testplan: {parse_error}"
+    return None
+
+
+class TestPlanValidationCache:
+    """
+    Results of the testplan validation keyed by the SHA-256 digest of the content of the
+    testplan files, persisted as a JSON file. The cache is discarded when it was written by
+    another version of YChaos or from another working directory (relative to which
+    the paths in the testplans are resolved).
+
+    The testplans may refer to other files (e.g. `hostfiles`), of which the existence is
+    validated along with the testplan. A cached result is not invalidated when those files change.
+
+    The cache holds only the results of the testplans of the latest validation.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Path of the cache file. The cache is empty if the file does not exist
+        """
+        self.path = Path(path)
+        self.key = f"{ApplicationSettings.get_version()}:{os.getcwd()}"
+        self.results: Dict[str, Optional[str]] = dict()
+
+        try:
+            with open(self.path, "r") as fp:
+                data = json.load(fp)
+            if data.get("key") == self.key:
+                self.results = data["results"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    @classmethod
+    def digest(cls, content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def save(self) -> None:
+        """
+        Writes the cache file. The file is replaced atomically, so that a concurrent
+        validation reads either the previous or the new cache.
+        """
+        temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as fp:
+            json.dump(dict(key=self.key, results=self.results), fp)
+        os.replace(temp_path, self.path)
+
+
 class TestPlanValidator:
     """
     The Test plan validator class. Provides utility methods
@@ -54,3 +117,57 @@ class TestPlanValidator:
             None
         """
         TestPlan.validate(data)
+
+    @classmethod
+    def validate_files(
+        cls,
+        paths: Iterable[Path],
+        workers: int = 1,
+        cache: Optional[TestPlanValidationCache] = None,
+    ) -> Dict[Path, Optional[str]]:
+        """
+        Validate a number of files. The files with the same content are validated once and the
+        files of which the result is in the `cache` are not validated again. The rest of the
+        files are validated in `workers` processes.
+
+        Raises:
+            FileNotFoundError: If one of the paths does not exist
+
+        Args:
+            paths: Paths of the testplan files
+            workers: Number of processes validating the files
+            cache: Validation results of the files validated before. Replaced with the results of `paths`
+
+        Returns:
+            The validation error message of each file, None for the valid files
+        """
+        digests: Dict[Path, str] = dict()
+        pending: Dict[str, bytes] = dict()
+        results: Dict[str, Optional[str]] = dict(cache.results) if cache else dict()
+        for path in paths:
+            with open(path, "rb") as fp:
+                content = fp.read()
+            digest = TestPlanValidationCache.digest(content)
+            digests[path] = digest
+            if digest not in results:
+                pending[digest] = content
+
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                errors = pool.map(
+                    _validate_content,
+                    pending.values(),
+                    chunksize=max(1, len(pending) // (4 * workers)),
+                )
+                results.update(zip(pending, errors))
+        else:
+            results.update(
+                (digest, _validate_content(content))
+                for digest, content in pending.items()
+            )
+
+        if cache is not None:
+            # The results of the files no longer validated are dropped
+            cache.results = {digest: results[digest] for digest in digests.values()}
+
+        return {path: results[digest] for path, digest in digests.items()}
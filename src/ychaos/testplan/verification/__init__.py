@@ -105,6 +105,14 @@ class HTTPRequestVerification(HTTPRequestSchema):
 
     The user can also specify a `count` attribute requesting the tool to make
     `count` number of requests to the same endpoints.
+
+    The requests are sent one at a time by default. Setting `concurrency` allows
+    the tool to have up to `concurrency` requests in flight, reusing the connections to each of the hosts,
+    and `rate` limits the number of requests sent per second.
+
+    The latency of every request is recorded into a histogram. When `latency_percentiles` is
+    configured, the latency is verified on the percentiles (for example, `p99 <= 200ms`) instead of
+    verifying the latency of each of the requests against `latency`.
     """
 
     count: int = Field(
@@ -127,6 +135,34 @@ class HTTPRequestVerification(HTTPRequestSchema):
         default=list(), description="List of HTTP/s URLs to be requested"
     )
 
+    concurrency: int = Field(
+        default=1,
+        description="Maximum number of HTTP requests in flight at a time",
+        ge=1,
+    )
+
+    rate: Optional[float] = Field(
+        default=None,
+        description="Maximum number of HTTP requests to be sent per second. Not limited by default",
+        gt=0,
+    )
+
+    latency_percentiles: Dict[float, float] = Field(
+        default=dict(),
+        description=(
+            "Mapping of percentile to the expected latency (in ms) at that percentile. "
+            "When configured, this replaces the per request `latency` verification."
+        ),
+        examples=[{50: 20, 99: 200}, {99.9: 500}],
+    )
+
+    @validator("latency_percentiles")
+    def _validate_latency_percentiles(cls, v):
+        for percentile in v:
+            if not 0 < percentile <= 100:
+                raise ValueError(f"{percentile} is not a valid percentile")
+        return v
+
 
 class SDv4Verification(SchemaModel):
     """
@@ -166,6 +202,10 @@ class OpenTSDBVerification(HTTPRequestSchema):
     """
     The OpenTSDB Verification Plugin gets the metrics from an OpenTSDB server and compares it with the
     provided comparison parameters in the testplan. If the condition passes
+
+    The response from the server is parsed incrementally, one time series at a time. Only a summary
+    of each time series is recorded in the verification data. The raw response can be persisted to
+    a file by configuring `raw_data_file`.
     """
 
     url: AnyHttpUrl = Field(
@@ -195,6 +235,14 @@ class OpenTSDBVerification(HTTPRequestSchema):
         ),
     )
 
+    raw_data_file: Optional[Path] = Field(
+        default=None,
+        description=(
+            "File to which the raw response from the OpenTSDB server is written. "
+            "The response is not persisted when this is not configured."
+        ),
+    )
+
     @validator("state_bound_criteria", pre=True, always=True)
     def _criteria_validation(cls, v, values):
         # The input must contain at least one of "criteria" or "state_bound_criteria"
@@ -264,6 +312,16 @@ class VerificationConfig(SchemaModel):
         ..., description="The verification type configuration"
     )
 
+    depends_on: List[int] = Field(
+        default=list(),
+        description=(
+            "Indices of the verification configurations (in the testplan) that must complete before "
+            "this plugin is run. Used to preserve ordering when the plugins are executed concurrently. "
+            "Only the configurations preceding this one can be referred."
+        ),
+        examples=[[0], [0, 2]],
+    )
+
     def get_verification_config(self):
         return self.type.metadata.schema(**self.config)
 
@@ -5,17 +5,86 @@ import math
 import random
 from datetime import datetime
 from types import SimpleNamespace
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from pydantic import Field, validate_arguments, validator
 
 from ....utils.builtins import AEnum, BuiltinUtils
+from ....utils.dependency import DependencyUtils
 from ... import SchemaModel, SystemState
 
+# NumPy is optional. The aggregators fall back to pure Python when it is not installed.
+# It is imported on first use so that loading a testplan does not pay for importing NumPy
+_UNRESOLVED = object()
+numpy: Any = _UNRESOLVED
+
+
+def _numpy() -> Optional[Any]:
+    """
+    Returns the NumPy module, importing it on the first call, or None if it is not installed.
+    """
+    global numpy
+    if numpy is _UNRESOLVED:
+        numpy = DependencyUtils.import_module("numpy", raise_error=False, warn=False)
+    return numpy
+
+
+class TimeSeries:
+    """
+    Time series data converted once into timestamp and value arrays sorted by the
+    timestamp, with the NAN datapoints dropped. The arrays are NumPy arrays when NumPy
+    is installed and Python lists otherwise.
+
+    The timestamps are in seconds since epoch. The keys of the time series data can either be
+    `datetime` objects or epoch timestamps (as returned by OpenTSDB).
+    """
+
+    def __init__(self, data: Dict[Any, float]):
+        _timestamps = [self._to_timestamp(_k) for _k in data]
+
+        numpy = _numpy()
+        if numpy is not None:
+            timestamps = numpy.fromiter(_timestamps, dtype=float, count=len(data))
+            values = numpy.fromiter(data.values(), dtype=float, count=len(data))
+
+            _valid = ~numpy.isnan(values)
+            timestamps, values = timestamps[_valid], values[_valid]
+
+            _order = numpy.argsort(timestamps, kind="stable")
+            self.timestamps, self.values = timestamps[_order], values[_order]
+        else:
+            _datapoints = sorted(
+                (_t, float(_v))
+                for _t, _v in zip(_timestamps, data.values())
+                if not math.isnan(_v)
+            )
+            self.timestamps = [_t for _t, _ in _datapoints]
+            self.values = [_v for _, _v in _datapoints]
+
+    @classmethod
+    def _to_timestamp(cls, key: Any) -> float:
+        if isinstance(key, datetime):
+            return key.timestamp()
+        return float(key)
+
+    @classmethod
+    def of(cls, data: Union["TimeSeries", Dict[Any, float]]) -> "TimeSeries":
+        """
+        Returns the `data` as is if it is already a `TimeSeries`, otherwise converts it to one.
+        """
+        return data if isinstance(data, TimeSeries) else cls(data)
+
+    def __len__(self):
+        return len(self.values)
+
 
 class TimeSeriesDataAggregator:
     """
-    The class containing the implementations of different Time Series data Aggregator
+    The class containing the implementations of different Time Series data Aggregator.
+
+    Each of the aggregators accepts either the time series data or a `TimeSeries`. When
+    multiple aggregators are computed on the same data, use `aggregate()` which converts the data
+    into a `TimeSeries` only once.
     """
 
     @classmethod
@@ -31,7 +100,29 @@ class TimeSeriesDataAggregator:
         return dict([(_k, _v) for _k, _v in data.items() if not math.isnan(_v)])
 
     @classmethod
-    def avg(cls, data: Dict[datetime, float]) -> float:
+    def aggregate(
+        cls,
+        data: Union[TimeSeries, Dict[Any, float]],
+        aggregators: Iterable["MetricsAggregator"],
+    ) -> Dict["MetricsAggregator", float]:
+        """
+        Computes all the `aggregators` on the time series data
+
+        Args:
+            data: Time series data
+            aggregators: Metrics aggregators
+
+        Returns:
+            Mapping of the aggregator to the aggregated value
+        """
+        _series = TimeSeries.of(data)
+        return {
+            _aggregator: _aggregator.metadata.aggregate(_series)  # type: ignore
+            for _aggregator in aggregators
+        }
+
+    @classmethod
+    def avg(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the Average value of a time series data filtering out NAN
         Args:
@@ -40,15 +131,16 @@ class TimeSeriesDataAggregator:
         Returns:
             Average value over the time
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            sum(_filtered_data.values()) / len(_filtered_data),
-            _filtered_data,
-            BuiltinUtils.Float.NAN,
-        )
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        numpy = _numpy()
+        if numpy is not None:
+            return float(numpy.mean(_series.values))
+        return math.fsum(_series.values) / len(_series)
 
     @classmethod
-    def latest(cls, data: Dict[datetime, float]) -> float:
+    def latest(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the latest value of a time series data filtering out NAN
         Args:
@@ -57,13 +149,13 @@ class TimeSeriesDataAggregator:
         Returns:
             Latest value over the time
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            _filtered_data[max(_filtered_data)], _filtered_data, BuiltinUtils.Float.NAN
-        )
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        return float(_series.values[-1])
 
     @classmethod
-    def oldest(cls, data: Dict[datetime, float]) -> float:
+    def oldest(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the oldest value of a time series data filtering out NAN
         Args:
@@ -72,13 +164,13 @@ class TimeSeriesDataAggregator:
         Returns:
             Latest value over the time
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            _filtered_data[min(_filtered_data)], _filtered_data, BuiltinUtils.Float.NAN
-        )
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        return float(_series.values[0])
 
     @classmethod
-    def max(cls, data: Dict[datetime, float]) -> float:
+    def max(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the max value of a time series data filtering out NAN
         Args:
@@ -87,13 +179,16 @@ class TimeSeriesDataAggregator:
         Returns:
             Max value
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            max(_filtered_data.values()), _filtered_data, BuiltinUtils.Float.NAN
-        )
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        numpy = _numpy()
+        if numpy is not None:
+            return float(numpy.max(_series.values))
+        return max(_series.values)
 
     @classmethod
-    def min(cls, data: Dict[datetime, float]) -> float:
+    def min(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the min value of a time series data filtering out NAN
         Args:
@@ -102,13 +197,16 @@ class TimeSeriesDataAggregator:
         Returns:
             Min value
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            min(_filtered_data.values()), _filtered_data, BuiltinUtils.Float.NAN
-        )
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        numpy = _numpy()
+        if numpy is not None:
+            return float(numpy.min(_series.values))
+        return min(_series.values)
 
     @classmethod
-    def random(cls, data: Dict[datetime, float]) -> float:
+    def random(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
         """
         Returns the random value of a time series data filtering out NAN
         Args:
@@ -117,15 +215,76 @@ class TimeSeriesDataAggregator:
         Returns:
             Random value
         """
-        _filtered_data = cls.get_filtered_data(data)
-        return BuiltinUtils.return_if_true(
-            random.choice(  # nosec : Not using for Crypto purpose
-                list(_filtered_data.values())
-            ),
-            _filtered_data,
-            BuiltinUtils.Float.NAN,
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        return float(
+            _series.values[
+                random.randrange(len(_series))  # nosec : Not using for Crypto purpose
+            ]
         )
 
+    @classmethod
+    def slope(cls, data: Union[TimeSeries, Dict[Any, float]]) -> float:
+        """
+        Returns the slope (change in value per second) of the least squares line
+        fitting the time series data filtering out NAN
+        Args:
+            data: Time series data
+
+        Returns:
+            Slope of the datapoints, NAN if there are less than 2 datapoints
+        """
+        _series = TimeSeries.of(data)
+        if len(_series) < 2:
+            return BuiltinUtils.Float.NAN
+
+        numpy = _numpy()
+        if numpy is not None:
+            _dt = _series.timestamps - numpy.mean(_series.timestamps)
+            _dv = _series.values - numpy.mean(_series.values)
+            _variance = float(numpy.dot(_dt, _dt))
+            _covariance = float(numpy.dot(_dt, _dv))
+        else:
+            _mean_t = math.fsum(_series.timestamps) / len(_series)
+            _mean_v = math.fsum(_series.values) / len(_series)
+            _variance = math.fsum((_t - _mean_t) ** 2 for _t in _series.timestamps)
+            _covariance = math.fsum(
+                (_t - _mean_t) * (_v - _mean_v)
+                for _t, _v in zip(_series.timestamps, _series.values)
+            )
+
+        if not _variance:
+            return BuiltinUtils.Float.NAN
+        return _covariance / _variance
+
+    @classmethod
+    def percentile(
+        cls, data: Union[TimeSeries, Dict[Any, float]], percentile: float
+    ) -> float:
+        """
+        Returns the percentile of the values of a time series data filtering out NAN.
+        The percentile is linearly interpolated between the two closest datapoints.
+        Args:
+            data: Time series data
+            percentile: Percentile in the range [0, 100]
+
+        Returns:
+            Percentile value
+        """
+        _series = TimeSeries.of(data)
+        if not len(_series):
+            return BuiltinUtils.Float.NAN
+        numpy = _numpy()
+        if numpy is not None:
+            return float(numpy.percentile(_series.values, percentile))
+
+        _values = sorted(_series.values)
+        _rank = (len(_values) - 1) * percentile / 100
+        _lower = math.floor(_rank)
+        _upper = min(_lower + 1, len(_values) - 1)
+        return _values[_lower] + (_values[_upper] - _values[_lower]) * (_rank - _lower)
+
 
 class MetricsAggregator(AEnum):
     """
@@ -164,10 +323,28 @@ class MetricsAggregator(AEnum):
     )
 
     SLOPE = "slope", SimpleNamespace(
-        aggregate=lambda data: BuiltinUtils.raise_error(
-            NotImplementedError("This aggregator is not implemented")
-        ),
-        __desc__="Gets the slope of the datapoints",
+        aggregate=TimeSeriesDataAggregator.slope,
+        __desc__="Gets the slope (change per second) of the least squares line fitting the datapoints",
+    )
+
+    P50 = "p50", SimpleNamespace(
+        aggregate=lambda data: TimeSeriesDataAggregator.percentile(data, 50),
+        __desc__="Gets the median of the valid datapoints",
+    )
+
+    P90 = "p90", SimpleNamespace(
+        aggregate=lambda data: TimeSeriesDataAggregator.percentile(data, 90),
+        __desc__="Gets the 90th percentile of the valid datapoints",
+    )
+
+    P95 = "p95", SimpleNamespace(
+        aggregate=lambda data: TimeSeriesDataAggregator.percentile(data, 95),
+        __desc__="Gets the 95th percentile of the valid datapoints",
+    )
+
+    P99 = "p99", SimpleNamespace(
+        aggregate=lambda data: TimeSeriesDataAggregator.percentile(data, 99),
+        __desc__="Gets the 99th percentile of the valid datapoints",
     )
 
 
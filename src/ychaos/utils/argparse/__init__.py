@@ -1,6 +1,13 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
-from .subparsers import SubCommand, SubCommandParsersAction
+from .subparsers import LazySubCommand, SubCommand, SubCommandParsersAction
+from .types import positive_float, positive_int
 
-__all__ = ["SubCommandParsersAction", "SubCommand"]
+__all__ = [
+    "SubCommandParsersAction",
+    "SubCommand",
+    "LazySubCommand",
+    "positive_int",
+    "positive_float",
+]
@@ -9,9 +9,30 @@ from argparse import (
     Namespace,
     _SubParsersAction,
 )
-from typing import Any, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-__all__ = ["SubCommandParsersAction", "SubCommand"]
+from ..dependency import DependencyUtils
+
+__all__ = ["SubCommandParsersAction", "SubCommand", "LazySubCommand"]
+
+
+class LazySubCommand(NamedTuple):
+    """
+    Registration of a sub-command of which the class is imported only when the sub-command
+    is invoked. The name, help, aliases and epilog of the sub-command are registered with the
+    parser from this entry. The sub-command class refers to the same entry with its `__command__`
+    attribute, so that they are defined only once.
+
+    ```python3
+    BAR = LazySubCommand("bar", "package.bar:SubCommand2", help="Bar sub-command")
+    ```
+    """
+
+    name: str
+    path: str
+    help: Optional[str] = None
+    aliases: Tuple[str, ...] = ()
+    epilog: Optional[str] = None
 
 
 class SubCommandParsersAction(_SubParsersAction):
@@ -46,12 +67,28 @@ class SubCommandParsersAction(_SubParsersAction):
     In the above example, the two sub-commands `SubCommand1.name` and `SubCommand2.name` are
     handled by their respective classes.
 
+    The `cls` attribute can also be a [LazySubCommand][ychaos.utils.argparse.subparsers.LazySubCommand]
+    entry. The class is then imported, and its parser built, only when the sub-command is invoked,
+    so that the modules required by the sub-commands that are not invoked are not imported.
+
+    ```python3
+    subparsers.add_parser(cls=LazySubCommand("bar", "package.bar:SubCommand2", help="Bar sub-command"))
+    ```
+
     See [SubCommand][ychaos.utils.argparse.subparsers.SubCommand] for more details.
     """
 
+    def __init__(self, *args: Any, **kwargs: Any):
+        super(SubCommandParsersAction, self).__init__(*args, **kwargs)
+
+        # Parsers of the lazily loaded sub-commands to their entries
+        self._lazy_parsers: Dict[ArgumentParser, LazySubCommand] = dict()
+
     def add_parser(self, name=None, **kwargs: Any) -> ArgumentParser:
         try:
             cls = kwargs.pop("cls")
+            if isinstance(cls, LazySubCommand):
+                return self._add_lazy_parser(cls, **kwargs)
             if not issubclass(cls, SubCommand):
                 raise ArgumentError(
                     self, "cls attribute must implement SubCommand class"
@@ -81,6 +118,56 @@ class SubCommandParsersAction(_SubParsersAction):
 
         return cls.build_parser(parser)
 
+    def _add_lazy_parser(self, command: LazySubCommand, **kwargs: Any):
+        aliases = kwargs.get("aliases", list())
+        aliases.extend(command.aliases)
+        kwargs.update(dict(aliases=aliases))
+        kwargs.setdefault("help", command.help)
+        kwargs.setdefault("epilog", command.epilog)
+        kwargs.setdefault("formatter_class", ArgumentDefaultsHelpFormatter)
+
+        parser = super(SubCommandParsersAction, self).add_parser(command.name, **kwargs)
+        self._lazy_parsers[parser] = command
+        return parser
+
+    def load(self, name: str) -> ArgumentParser:
+        """
+        Imports the class of a lazily loaded sub-command and builds its parser. This is
+        called when the sub-command is invoked, and can be called to build the parser
+        of a sub-command that is not invoked (e.g. to print its help). Calling this for
+        the sub-commands that are already loaded has no effect.
+
+        Args:
+            name: Name (or alias) of the sub-command
+
+        Returns:
+            Parser of the sub-command
+        """
+        parser = self._name_parser_map[name]
+        command = self._lazy_parsers.pop(parser, None)
+        if command is not None:
+            cls = DependencyUtils.import_path(command.path)
+            if not (isinstance(cls, type) and issubclass(cls, SubCommand)):
+                raise ArgumentError(
+                    self, "cls attribute must implement SubCommand class"
+                )
+            if cls.name != command.name:
+                raise ArgumentError(
+                    self,
+                    f"{command.path} is registered with the command name {command.name}",
+                )
+
+            parser.set_defaults(cls=cls)
+            cls.build_parser(parser)
+        return parser
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if values and values[0] in self._name_parser_map:
+            self.load(values[0])
+        super(SubCommandParsersAction, self).__call__(
+            parser, namespace, values, option_string
+        )
+
 
 class SubCommand(ABC):
     """
@@ -92,13 +179,28 @@ class SubCommand(ABC):
     to build the sub parser and return the parser.
 
     On parsing the arguments, the parser's `cls` attribute can be used to run the `main` function.
+
+    The sub-commands loaded lazily set the `__command__` attribute to their
+    [LazySubCommand][ychaos.utils.argparse.subparsers.LazySubCommand] entry, from which the
+    name, help, aliases and epilog of the sub-command are set.
     """
 
+    __command__: Optional[LazySubCommand] = None
+
     name: Optional[str] = None
     help: Optional[str] = None
     aliases: List[str] = list()
     epilog: Optional[str] = None
 
+    def __init_subclass__(cls, **kwargs: Any):
+        super(SubCommand, cls).__init_subclass__(**kwargs)  # type: ignore
+        command = cls.__dict__.get("__command__")
+        if command is not None:
+            cls.name = command.name
+            cls.help = command.help
+            cls.aliases = list(command.aliases)
+            cls.epilog = command.epilog
+
     @classmethod
     def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
         """
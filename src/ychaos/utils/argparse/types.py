@@ -0,0 +1,42 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+
+from argparse import ArgumentTypeError
+
+__all__ = ["positive_int", "positive_float"]
+
+
+def positive_int(value: str) -> int:
+    """
+    Argument type of the arguments that accept only the positive integers.
+
+    ```python3
+    parser.add_argument("--workers", type=positive_int, default=1)
+    ```
+
+    Raises:
+        ArgumentTypeError: If the value is not a positive integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {value!r}")
+    if number <= 0:
+        raise ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """
+    Argument type of the arguments that accept only the positive numbers.
+
+    Raises:
+        ArgumentTypeError: If the value is not a positive number
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid float value: {value!r}")
+    if not number > 0:
+        raise ArgumentTypeError(f"{value} is not a positive number")
+    return number
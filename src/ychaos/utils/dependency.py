@@ -3,6 +3,7 @@
 
 import importlib
 import warnings
+from types import SimpleNamespace
 from typing import Any, Optional, Tuple
 
 from pydantic import validate_arguments
@@ -112,3 +113,77 @@ class DependencyUtils:
                     else:
                         _attr_list.append(None)
             return tuple(_attr_list)
+
+    @classmethod
+    def import_path(cls, path: str) -> Any:
+        """
+        Imports an attribute from its import path of the form `module:attribute`.
+
+        Examples:
+
+            ```python
+            TestPlan = DependencyUtils.import_path("ychaos.testplan.schema:TestPlan")
+            ```
+
+        Args:
+            path: Import path of the attribute
+
+        Raises:
+            ImportError: when the module or the attribute cannot be imported
+
+        Returns:
+            The attribute
+        """
+        module_name, _, attr = path.partition(":")
+        if not attr:
+            raise ImportError(f"{path} is not of the form module:attribute")
+        return cls.import_from(module_name, (attr,), warn=False)[0]
+
+
+class LazyNamespace(SimpleNamespace):
+    """
+    A SimpleNamespace of which the attributes are imported from a module on first access.
+    This can be used as the metadata of the enumerations that map to classes, so that the
+    modules defining the classes are imported only when the enumeration member is used.
+
+    ```python
+    LazyNamespace("ychaos.agents.system.cpu", schema="CPUBurnConfig", agent_defn="CPUBurn")
+    ```
+    """
+
+    def __init__(self, module: str, **attributes: str):
+        """
+        Args:
+            module: Module from which the attributes are imported
+            **attributes: Attribute of the namespace to the name of the attribute in the module
+        """
+        super(LazyNamespace, self).__init__()
+        self.__dict__["_module"] = module
+        self.__dict__["_attributes"] = attributes
+
+    def __getattr__(self, name: str) -> Any:
+        attributes = self.__dict__.get("_attributes", dict())
+        if name not in attributes:
+            raise AttributeError(name)
+
+        value = DependencyUtils.import_path(f"{self._module}:{attributes[name]}")
+        setattr(self, name, value)
+        return value
+
+
+class LazyImportDict(dict):
+    """
+    A dictionary of which the values can be import paths of the form `module:attribute`.
+    The attribute is imported when its key is first looked up (with `[]` or `get()`) and
+    replaces the import path in the dictionary.
+    """
+
+    def __getitem__(self, key: Any) -> Any:
+        value = super(LazyImportDict, self).__getitem__(key)
+        if isinstance(value, str):
+            value = DependencyUtils.import_path(value)
+            self[key] = value
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
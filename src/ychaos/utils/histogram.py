@@ -0,0 +1,137 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class LatencyHistogram:
+    """
+    A fixed memory histogram of latencies in the style of the HDR Histogram.
+
+    The latencies (in milliseconds) are recorded with a resolution of 1 microsecond into logarithmic
+    buckets (one per power of 2), each of which is split into linear sub-buckets. The relative error of
+    any of the percentiles is bounded by `2 / 2**SUB_BUCKET_BITS` (~1.6%), irrespective of the number of
+    values recorded. The memory used only depends on the range of the latencies recorded and never exceeds a
+    few thousand counters.
+
+    Examples:
+
+        ```python
+        histogram = LatencyHistogram()
+        for latency in (12.4, 15.1, 340.6):
+            histogram.record(latency)
+        histogram.percentile(99)  # ~340.6
+        ```
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    _sub_bucket_count = 1 << SUB_BUCKET_BITS
+    _sub_bucket_half_count = _sub_bucket_count >> 1
+
+    def __init__(self):
+        self._counts: Dict[int, int] = dict()
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @classmethod
+    def _index_of(cls, value: int) -> int:
+        if value < cls._sub_bucket_count:
+            return value
+
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS
+        return (
+            cls._sub_bucket_count
+            + (shift - 1) * cls._sub_bucket_half_count
+            + ((value >> shift) - cls._sub_bucket_half_count)
+        )
+
+    @classmethod
+    def _highest_equivalent_value(cls, index: int) -> int:
+        if index < cls._sub_bucket_count:
+            return index
+
+        offset = index - cls._sub_bucket_count
+        shift = offset // cls._sub_bucket_half_count + 1
+        sub_bucket = offset % cls._sub_bucket_half_count + cls._sub_bucket_half_count
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value: float) -> None:
+        """
+        Record a latency
+
+        Args:
+            value: Latency in milliseconds
+
+        Returns:
+            None
+        """
+        index = self._index_of(max(int(value * 1000), 0))
+        self._counts[index] = self._counts.get(index, 0) + 1
+
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the latency at a percentile. The value returned is the highest latency
+        equivalent to the recorded values in the bucket the percentile falls into.
+
+        Args:
+            percentile: Percentile in the range (0, 100]
+
+        Returns:
+            Latency in milliseconds, NaN if no latency has been recorded
+        """
+        if not self.count:
+            return math.nan
+
+        rank = max(math.ceil(percentile / 100 * self.count), 1)
+        cumulative = 0
+        for index in sorted(self._counts):
+            cumulative += self._counts[index]
+            if cumulative >= rank:
+                return min(self._highest_equivalent_value(index) / 1000, self.max)
+        return self.max  # pragma: no cover
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        Returns the non-empty buckets of the histogram
+
+        Returns:
+            List of (highest equivalent latency in milliseconds, count)
+        """
+        return [
+            (self._highest_equivalent_value(index) / 1000, self._counts[index])
+            for index in sorted(self._counts)
+        ]
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Any]:
+        """
+        Summarizes the histogram with count, min, max, mean and the requested percentiles.
+        The percentiles are keyed as `p<percentile>`, for example `p99` and `p99.9`.
+        All the values other than the count are None if no latency has been recorded, so that
+        the summary can be serialized to JSON.
+
+        Args:
+            percentiles: Percentiles to be included in the summary
+
+        Returns:
+            Summary dictionary
+        """
+        _summary: Dict[str, Any] = dict(
+            count=self.count,
+            min=self.min if self.count else None,
+            max=self.max if self.count else None,
+            mean=self.total / self.count if self.count else None,
+        )
+        for percentile in percentiles:
+            _summary[f"p{percentile:g}"] = (
+                self.percentile(percentile) if self.count else None
+            )
+        return _summary
@@ -0,0 +1,120 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import codecs
+import json
+from enum import Enum, auto
+from typing import Any, Iterable, Iterator, Union
+
+
+class _State(Enum):
+    START = auto()
+    ELEMENT_OR_END = auto()
+    ELEMENT = auto()
+    SEPARATOR_OR_END = auto()
+    END = auto()
+
+
+class JSONArrayStream:
+    """
+    Incrementally parses a JSON document containing a top level array and yields
+    the elements of the array one at a time. Only the element currently being parsed
+    is held in memory, so the memory used is bounded by the largest element in the array
+    and not by the size of the document.
+
+    Examples:
+
+        ```python
+        response = requests.post(url, json=query, stream=True)
+        for element in JSONArrayStream(response.iter_content(chunk_size=65536)):
+            ...
+        ```
+
+    Each element is decoded with the `json` module. When an element is not complete yet,
+    the decoding is attempted again only after the buffered data has doubled, so
+    that the time taken is linear in the size of the document.
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]], encoding: str = "utf-8"):
+        """
+        Args:
+            chunks: Chunks of the JSON document. The chunks of type `bytes` are decoded with `encoding`
+            encoding: Encoding of the JSON document
+        """
+        self._chunks = chunks
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._decoder = json.JSONDecoder()
+
+        self._buffer = ""
+        self._state = _State.START
+        self._next_attempt = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._text_decoder.decode(chunk)
+            yield from self._feed(chunk)
+
+        yield from self._feed(self._text_decoder.decode(b"", final=True), final=True)
+
+    def _feed(self, text: str, final: bool = False) -> Iterator[Any]:
+        self._buffer += text
+
+        while True:
+            self._buffer = self._buffer.lstrip(self.WHITESPACE)
+            if not self._buffer:
+                break
+
+            if self._state is _State.START:
+                if self._buffer[0] != "[":
+                    raise ValueError("Expected a JSON array")
+                self._buffer = self._buffer[1:]
+                self._state = _State.ELEMENT_OR_END
+                continue
+
+            if self._state is _State.END:
+                raise ValueError("Extra data after the JSON array")
+
+            if self._buffer[0] == "]" and self._state in (
+                _State.ELEMENT_OR_END,
+                _State.SEPARATOR_OR_END,
+            ):
+                self._buffer = self._buffer[1:]
+                self._state = _State.END
+                continue
+
+            if self._state is _State.SEPARATOR_OR_END:
+                if self._buffer[0] != ",":
+                    raise ValueError("Expected ',' or ']' between the array elements")
+                self._buffer = self._buffer[1:]
+                self._state = _State.ELEMENT
+                continue
+
+            if not final and len(self._buffer) < self._next_attempt:
+                break
+
+            try:
+                element, end = self._decoder.raw_decode(self._buffer)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                self._next_attempt = 2 * len(self._buffer)
+                break
+
+            if (
+                not final
+                and self._buffer[0] not in '{["'
+                and self._buffer[end : end + 1] not in tuple(self.WHITESPACE + ",]")
+            ):
+                # A number or a literal might continue in the next chunk
+                self._next_attempt = len(self._buffer) + 1
+                break
+
+            self._buffer = self._buffer[end:]
+            self._next_attempt = 0
+            self._state = _State.SEPARATOR_OR_END
+            yield element
+
+        if final and self._state is not _State.END:
+            raise ValueError("Incomplete JSON array")
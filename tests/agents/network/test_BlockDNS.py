@@ -4,14 +4,46 @@ import os
 import subprocess
 from unittest import TestCase
 
-from mockito import any, unstub, verify, when
+from mockito import unstub, verify, when
 
 from ychaos.agents.agent import AgentState
 from ychaos.agents.exceptions import AgentError
+from ychaos.agents.network import iptables
 from ychaos.agents.network.iptables import DNSBlock, DNSBlockConfig
 
 
 class TestBlockDNSConfig(TestCase):
+    IPTABLES_RESTORE = "sudo /sbin/iptables-restore --noflush -w 3".split()
+
+    RULES = (
+        "*filter\n"
+        ":YCHAOS_3F2A9C1E_OUTPUT - [0:0]\n"
+        "-A YCHAOS_3F2A9C1E_OUTPUT -p udp -j DROP --dport 53\n"
+        "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 53\n"
+        "-I OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+        "COMMIT\n"
+    )
+
+    DELETE_RULES = (
+        "*filter\n"
+        "-D OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+        "-F YCHAOS_3F2A9C1E_OUTPUT\n"
+        "-X YCHAOS_3F2A9C1E_OUTPUT\n"
+        "COMMIT\n"
+    )
+
+    def setUp(self) -> None:
+        when(iptables).ychaos_chain_id("dns_block").thenReturn("3F2A9C1E")
+
+    def mock_iptables_restore(self, rules, returncode=0):
+        when(subprocess).run(
+            self.IPTABLES_RESTORE,
+            input=rules,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=returncode))
+
     def test_block_dns_setup(self):
         config = DNSBlockConfig()
         agent = DNSBlock(config)
@@ -27,19 +59,13 @@ class TestBlockDNSConfig(TestCase):
 
         self.assertEqual(agent.current_state, AgentState.SETUP)
 
-        when(subprocess).run(
-            any,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
+        when(subprocess).run(...).thenReturn(
+            subprocess.CompletedProcess(args=[], returncode=0)
+        )
 
         agent.teardown()
 
-        verify(subprocess, times=0).run(
-            any,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        verify(subprocess, times=0).run(...)
 
     def test_block_dns_run(self):
         config = DNSBlockConfig()
@@ -50,21 +76,12 @@ class TestBlockDNSConfig(TestCase):
 
         when(os).geteuid().thenReturn(0)
 
-        when(subprocess).run(
-            "sudo /sbin/iptables -I OUTPUT -p udp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
-
-        when(subprocess).run(
-            f"sudo /sbin/iptables -I OUTPUT -p tcp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
+        self.mock_iptables_restore(self.RULES)
 
         agent.run()
 
         self.assertEqual(agent.current_state, AgentState.RUNNING)
+        verify(subprocess, times=1).run(...)
 
     def test_block_dns_run_raises_io_error(self):
         config = DNSBlockConfig()
@@ -75,17 +92,7 @@ class TestBlockDNSConfig(TestCase):
 
         when(os).geteuid().thenReturn(0)
 
-        when(subprocess).run(
-            "sudo /sbin/iptables -I OUTPUT -p udp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
-
-        when(subprocess).run(
-            f"sudo /sbin/iptables -I OUTPUT -p tcp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=1))
+        self.mock_iptables_restore(self.RULES, returncode=1)
 
         with self.assertRaises(IOError):
             agent.run()
@@ -99,25 +106,11 @@ class TestBlockDNSConfig(TestCase):
 
         agent.advance_state(AgentState.RUNNING)
 
-        when(subprocess).run(
-            "sudo /sbin/iptables -D OUTPUT -p udp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
-
-        when(subprocess).run(
-            "sudo /sbin/iptables -D OUTPUT -p tcp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
+        self.mock_iptables_restore(self.DELETE_RULES)
 
         agent.teardown()
 
-        verify(subprocess, times=2).run(
-            any,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        verify(subprocess, times=1).run(...)
 
     def test_block_dns_teardown_raises_error_when_failed(self):
         config = DNSBlockConfig()
@@ -128,26 +121,12 @@ class TestBlockDNSConfig(TestCase):
 
         agent.advance_state(AgentState.RUNNING)
 
-        when(subprocess).run(
-            "sudo /sbin/iptables -D OUTPUT -p udp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
-
-        when(subprocess).run(
-            "sudo /sbin/iptables -D OUTPUT -p tcp --dport 53 -j DROP -w 3".split(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=1))
+        self.mock_iptables_restore(self.DELETE_RULES, returncode=1)
 
         with self.assertRaises(AgentError):
             agent.teardown()
 
-        verify(subprocess, times=2).run(
-            any,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        verify(subprocess, times=1).run(...)
 
     def tearDown(self) -> None:
         unstub()
@@ -1,15 +1,18 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import errno
 import filecmp
 import os
 import shutil
+import subprocess
 from pathlib import Path
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 from unittest import TestCase
 
-from mockito import unstub, when
+from mockito import unstub, verify, when
 
+from ychaos.agents.network import traffic
 from ychaos.agents.network.traffic import TrafficBlock, TrafficBlockConfig
 
 
@@ -95,6 +98,129 @@ class TestTrafficBlock(TestCase):
         self.assertFalse(agent.config.backup_hostsfile.is_file())
         self.assertTrue(filecmp.cmp(self.test_hostsfile, backup_hostfile_copy.name))
 
+    def test_run_replaces_hosts_file_atomically(self):
+        Path(self.test_hostsfile).chmod(0o644)
+        inode = Path(self.test_hostsfile).stat().st_ino
+        agent = TrafficBlock(
+            TrafficBlockConfig(
+                hosts=["testredirect.com", "testredirect2.com"],
+                hostsfile=self.test_hostsfile,
+            )
+        )
+        agent.setup()
+        agent.run()
+
+        stat = Path(self.test_hostsfile).stat()
+        self.assertNotEqual(inode, stat.st_ino)
+        self.assertEqual(0o644, stat.st_mode & 0o777)
+        self.assertEqual(
+            "\n127.0.0.1	thissitedoesnotexist.com\n"
+            "127.0.0.1	thissitealsodoesnotexist.com\n"
+            "\n127.0.0.1	testredirect.com\n127.0.0.1	testredirect2.com\n",
+            Path(self.test_hostsfile).read_text(),
+        )
+        self.assertListEqual(
+            [Path(self.test_hostsfile).name],
+            [
+                path.name
+                for path in Path(self.test_hostsfile).parent.glob(
+                    f"*{Path(self.test_hostsfile).name}*"
+                )
+            ],
+        )
+
+        agent.teardown()
+        self.assertEqual(
+            "\n127.0.0.1	thissitedoesnotexist.com\n"
+            "127.0.0.1	thissitealsodoesnotexist.com\n",
+            Path(self.test_hostsfile).read_text(),
+        )
+
+    def test_run_writes_hosts_file_in_place_when_rename_fails(self):
+        inode = Path(self.test_hostsfile).stat().st_ino
+        agent = TrafficBlock(
+            TrafficBlockConfig(
+                hosts=["testredirect.com"], hostsfile=self.test_hostsfile
+            )
+        )
+        agent.setup()
+
+        when(os).replace(...).thenRaise(OSError(errno.EBUSY, "Device or resource busy"))
+        agent.run()
+
+        self.assertEqual(inode, Path(self.test_hostsfile).stat().st_ino)
+        self.assertTrue(
+            Path(self.test_hostsfile)
+            .read_text()
+            .endswith("\n127.0.0.1	testredirect.com\n")
+        )
+        self.assertListEqual(
+            [Path(self.test_hostsfile).name],
+            [
+                path.name
+                for path in Path(self.test_hostsfile).parent.glob(
+                    f"*{Path(self.test_hostsfile).name}*"
+                )
+            ],
+        )
+
+        agent.teardown()
+
+    def test_run_keeps_symlinked_hosts_file(self):
+        with TemporaryDirectory() as tempdir:
+            hostsfile = Path(tempdir) / "hosts"
+            hostsfile.symlink_to(self.test_hostsfile)
+            inode = Path(self.test_hostsfile).stat().st_ino
+
+            agent = TrafficBlock(
+                TrafficBlockConfig(hosts=["testredirect.com"], hostsfile=hostsfile)
+            )
+            agent.setup()
+            agent.run()
+
+            self.assertTrue(hostsfile.is_symlink())
+            self.assertEqual(Path(self.test_hostsfile), Path(os.readlink(hostsfile)))
+            self.assertNotEqual(inode, Path(self.test_hostsfile).stat().st_ino)
+            self.assertTrue(
+                Path(self.test_hostsfile)
+                .read_text()
+                .endswith("\n127.0.0.1	testredirect.com\n")
+            )
+
+            agent.teardown()
+            self.assertTrue(hostsfile.is_symlink())
+            self.assertEqual(
+                "\n127.0.0.1	thissitedoesnotexist.com\n"
+                "127.0.0.1	thissitealsodoesnotexist.com\n",
+                Path(self.test_hostsfile).read_text(),
+            )
+
+    def test_run_flushes_dns_cache(self):
+        agent = TrafficBlock(
+            TrafficBlockConfig(
+                hosts=["testredirect.com"],
+                hostsfile=self.test_hostsfile,
+                flush_dns_cache=True,
+            )
+        )
+        agent.setup()
+
+        when(traffic.shutil).which("nscd").thenReturn("/usr/sbin/nscd")
+        when(traffic.shutil).which("resolvectl").thenReturn(None)
+        when(subprocess).run(
+            ["/usr/sbin/nscd", "--invalidate", "hosts"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=1, stderr=""))
+
+        with self.assertWarns(RuntimeWarning):
+            agent.run()
+
+        verify(subprocess, times=1).run(...)
+
+        agent.teardown()
+
     def tearDown(self) -> None:
         Path(self.test_hostsfile).unlink()
         unstub()
@@ -6,37 +6,44 @@ from unittest import TestCase
 
 from mockito import ANY, unstub, verify, when
 
-from ychaos.agents.network.iptables import IPTablesBlock, IPTablesBlockConfig
+from ychaos.agents.exceptions import AgentError
+from ychaos.agents.network import iptables
+from ychaos.agents.network.iptables import (
+    IPTABLES_CHAIN_NAME_MAX_LENGTH,
+    IPTablesBlock,
+    IPTablesBlockConfig,
+    IptablesChain,
+    ychaos_chain_name,
+    ychaos_chains_delete_builder,
+    ychaos_chains_insert_builder,
+)
 
 
 class TestIPTablesBlock(TestCase):
-    def mock_subprocess_exits_normally(self, cmd):
-        if isinstance(cmd, str):
-            cmd = cmd.split()
-        when(subprocess).run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=0))
+    IPTABLES_RESTORE = "sudo /sbin/iptables-restore --noflush -w 1".split()
 
-    def mock_subprocess_exits_with_error(self, cmd):
-        if isinstance(cmd, str):
-            cmd = cmd.split()
+    def mock_iptables_restore(self, rules, returncode=0):
         when(subprocess).run(
-            cmd,
+            self.IPTABLES_RESTORE,
+            input=rules,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-        ).thenReturn(subprocess.CompletedProcess(args=[], returncode=1))
-
-    def verify_sub_process(self, cmd):
+            universal_newlines=True,
+        ).thenReturn(
+            subprocess.CompletedProcess(args=[], returncode=returncode, stderr="")
+        )
 
-        verify(subprocess).run(
-            cmd.split(),
+    def verify_iptables_restore(self, rules):
+        verify(subprocess, times=1).run(
+            self.IPTABLES_RESTORE,
+            input=rules,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            universal_newlines=True,
         )
 
     def setUp(self) -> None:
+        when(iptables).ychaos_chain_id("iptables_block").thenReturn("3F2A9C1E")
         self.iptables_block_agent_config = IPTablesBlockConfig(
             incoming_ports=[9000, 9001],
             destination_ports=[9002, 9003],
@@ -45,189 +52,239 @@ class TestIPTablesBlock(TestCase):
             outgoing_endpoints=["203.0.113.0", "https://yahoo.com:443"],
         )
 
-    def test_run_sets_ip_tables_rules(self):
-        when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        agent.setup()
-        agent.monitor()
-        self.mock_subprocess_exits_normally(ANY)
-        agent.run()
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
+    def test_ychaos_chains_insert_builder(self):
+        self.assertEqual(
+            ychaos_chains_insert_builder(
+                "3F2A9C1E", {IptablesChain.OUTPUT: ["-p udp -j DROP --dport 53"]}
+            ),
+            "*filter\n"
+            ":YCHAOS_3F2A9C1E_OUTPUT - [0:0]\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p udp -j DROP --dport 53\n"
+            "-I OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n",
         )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
-        )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
-        )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
+
+    def test_ychaos_chains_delete_builder(self):
+        self.assertEqual(
+            ychaos_chains_delete_builder("3F2A9C1E", [IptablesChain.OUTPUT]),
+            "*filter\n"
+            "-D OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "-F YCHAOS_3F2A9C1E_OUTPUT\n"
+            "-X YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n",
         )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
+
+    def test_chain_names_are_unique_per_agent(self):
+        unstub(iptables)
+        first = IPTablesBlock(self.iptables_block_agent_config)
+        second = IPTablesBlock(self.iptables_block_agent_config)
+        self.assertNotEqual(first.chain_id, second.chain_id)
+        self.assertNotEqual(
+            ychaos_chains_insert_builder(first.chain_id, first._rules()),
+            ychaos_chains_insert_builder(second.chain_id, second._rules()),
         )
-        self.verify_sub_process(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
+
+    def test_chain_names_of_agents_with_long_names_are_within_limit(self):
+        unstub(iptables)
+        agent = IPTablesBlock(
+            IPTablesBlockConfig(
+                name="iptables_block_of_the_payments_service_egress",
+                destination_ports=[80],
+                ipset=True,
+                outgoing_endpoints=["203.0.113.0/24"],
+            )
+        )
+        for chain in IptablesChain:
+            name = ychaos_chain_name(agent.chain_id, chain)
+            self.assertTrue(name.startswith("YCHAOS_"))
+            self.assertLessEqual(len(name), IPTABLES_CHAIN_NAME_MAX_LENGTH)
+
+        self.assertEqual(
+            "YCHAOS_0123456789ABCD_OUTPUT",
+            ychaos_chain_name("0123456789ABCDEF0123", IptablesChain.OUTPUT),
         )
 
-    def test_run_sets_ip_tables_rules_incoming_port_error(self):
+    def test_run_sets_ip_tables_rules_in_single_transaction(self):
         when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
+        agent = IPTablesBlock(self.iptables_block_agent_config)
         agent.setup()
-        with self.assertRaises(IOError):
-            agent.run()
+        agent.monitor()
 
-    def test_run_sets_ip_tables_rules_destination_port_error(self):
+        rules = (
+            "*filter\n"
+            ":YCHAOS_3F2A9C1E_INPUT - [0:0]\n"
+            ":YCHAOS_3F2A9C1E_OUTPUT - [0:0]\n"
+            "-A YCHAOS_3F2A9C1E_INPUT -p tcp -j DROP --dport 9000\n"
+            "-A YCHAOS_3F2A9C1E_INPUT -p tcp -j DROP --dport 9001\n"
+            "-A YCHAOS_3F2A9C1E_INPUT -p tcp -j DROP -d 203.0.113.0/32\n"
+            "-A YCHAOS_3F2A9C1E_INPUT -p tcp -j DROP --dport 443 -d yahoo.com\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 9002\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 9003\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP -d 203.0.113.0/32\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 443 -d yahoo.com\n"
+            "-I INPUT -j YCHAOS_3F2A9C1E_INPUT\n"
+            "-I OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n"
+        )
+        self.mock_iptables_restore(rules)
+        agent.run()
+        self.verify_iptables_restore(rules)
+
+    def test_run_sets_only_the_chains_with_rules(self):
         when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
+        agent = IPTablesBlock(
+            IPTablesBlockConfig(iptables_wait=1, destination_ports=[80])
         )
         agent.setup()
-        with self.assertRaises(IOError):
-            agent.run()
 
-    def test_run_sets_ip_tables_rules_incoming_endpoint_error(self):
-        when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
-        )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
-        )
+        rules = (
+            "*filter\n"
+            ":YCHAOS_3F2A9C1E_OUTPUT - [0:0]\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 80\n"
+            "-I OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n"
+        )
+        self.mock_iptables_restore(rules)
+        agent.run()
+        self.verify_iptables_restore(rules)
+
+    def test_run_without_rules_does_not_call_iptables(self):
+        agent = IPTablesBlock(IPTablesBlockConfig(iptables_wait=1))
         agent.setup()
-        with self.assertRaises(IOError):
-            agent.run()
+        when(subprocess).run(...)
 
-    def test_run_sets_ip_tables_rules_incoming_endpoint_url_error(self):
+        agent.run()
+        agent.teardown()
+        verify(subprocess, times=0).run(...)
+
+    def test_run_sets_ip_tables_rules_error(self):
         when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
-        )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
-        )
+        agent = IPTablesBlock(self.iptables_block_agent_config)
+        self.mock_iptables_restore(ANY, returncode=1)
         agent.setup()
         with self.assertRaises(IOError):
             agent.run()
 
-    def test_run_sets_ip_tables_rules_outgoing_endpoint_error(self):
+    def test_teardown_deletes_ychaos_chains(self):
+        agent = IPTablesBlock(self.iptables_block_agent_config)
+        input_rules = (
+            "*filter\n"
+            "-D INPUT -j YCHAOS_3F2A9C1E_INPUT\n"
+            "-F YCHAOS_3F2A9C1E_INPUT\n"
+            "-X YCHAOS_3F2A9C1E_INPUT\n"
+            "COMMIT\n"
+        )
+        output_rules = (
+            "*filter\n"
+            "-D OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "-F YCHAOS_3F2A9C1E_OUTPUT\n"
+            "-X YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n"
+        )
+        self.mock_iptables_restore(input_rules)
+        self.mock_iptables_restore(output_rules)
+        agent.teardown()
+        self.verify_iptables_restore(input_rules)
+        self.verify_iptables_restore(output_rules)
+
+    def test_teardown_deletes_remaining_chain_when_other_is_gone(self):
+        agent = IPTablesBlock(self.iptables_block_agent_config)
+        self.mock_iptables_restore(
+            ychaos_chains_delete_builder("3F2A9C1E", [IptablesChain.INPUT]),
+            returncode=1,
+        )
+        output_rules = ychaos_chains_delete_builder("3F2A9C1E", [IptablesChain.OUTPUT])
+        self.mock_iptables_restore(output_rules)
+        with self.assertRaises(AgentError):
+            agent.teardown()
+        self.verify_iptables_restore(output_rules)
+
+    def test_teardown_drops_ip_tables_rules_error(self):
         when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
-        )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
+        agent = IPTablesBlock(self.iptables_block_agent_config)
+        self.mock_iptables_restore(ANY, returncode=1)
+        with self.assertRaises(AgentError):
+            agent.teardown()
+
+    def mock_ipset_restore(self, sets, returncode=0):
+        when(subprocess).run(
+            "sudo /sbin/ipset -exist restore".split(),
+            input=sets,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        ).thenReturn(
+            subprocess.CompletedProcess(args=[], returncode=returncode, stderr="")
         )
-        agent.setup()
-        with self.assertRaises(IOError):
-            agent.run()
 
-    def test_run_sets_ip_tables_rules_outgoing_endpoint_url_error(self):
+    def test_run_matches_endpoints_with_ipset(self):
         when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9000"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 9001"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9002"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 9003"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
-        )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I INPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
+        agent = IPTablesBlock(
+            IPTablesBlockConfig(
+                iptables_wait=1,
+                ipset=True,
+                incoming_endpoints=["203.0.113.0/24", "198.51.100.7"],
+                outgoing_endpoints=["203.0.113.0/24", "https://yahoo.com:443"],
+            )
         )
-        self.mock_subprocess_exits_normally(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 -d 203.0.113.0/32"
+        agent.setup()
+
+        sets = (
+            "create YCHAOS_3F2A9C1E_INPUT hash:net family inet maxelem 65536\n"
+            "flush YCHAOS_3F2A9C1E_INPUT\n"
+            "add YCHAOS_3F2A9C1E_INPUT 203.0.113.0/24\n"
+            "add YCHAOS_3F2A9C1E_INPUT 198.51.100.7/32\n"
+            "create YCHAOS_3F2A9C1E_OUTPUT hash:net family inet maxelem 65536\n"
+            "flush YCHAOS_3F2A9C1E_OUTPUT\n"
+            "add YCHAOS_3F2A9C1E_OUTPUT 203.0.113.0/24\n"
+        )
+        rules = (
+            "*filter\n"
+            ":YCHAOS_3F2A9C1E_INPUT - [0:0]\n"
+            ":YCHAOS_3F2A9C1E_OUTPUT - [0:0]\n"
+            "-A YCHAOS_3F2A9C1E_INPUT -p tcp -j DROP -m set --match-set YCHAOS_3F2A9C1E_INPUT dst\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP -m set --match-set YCHAOS_3F2A9C1E_OUTPUT dst\n"
+            "-A YCHAOS_3F2A9C1E_OUTPUT -p tcp -j DROP --dport 443 -d yahoo.com\n"
+            "-I INPUT -j YCHAOS_3F2A9C1E_INPUT\n"
+            "-I OUTPUT -j YCHAOS_3F2A9C1E_OUTPUT\n"
+            "COMMIT\n"
+        )
+        self.mock_ipset_restore(sets)
+        self.mock_iptables_restore(rules)
+        agent.run()
+        self.verify_iptables_restore(rules)
+
+        self.mock_iptables_restore(ANY)
+        self.mock_ipset_restore(
+            "destroy YCHAOS_3F2A9C1E_INPUT\n" "destroy YCHAOS_3F2A9C1E_OUTPUT\n"
         )
-        self.mock_subprocess_exits_with_error(
-            "sudo /sbin/iptables -I OUTPUT -p tcp -j DROP -w 1 --dport 443 -d yahoo.com"
+        agent.teardown()
+        # ipset and iptables on run, iptables for each of the chains and ipset on teardown
+        verify(subprocess, times=5).run(...)
+
+    def test_run_ipset_error_does_not_add_rules(self):
+        when(os).geteuid().thenReturn(0)
+        agent = IPTablesBlock(
+            IPTablesBlockConfig(
+                iptables_wait=1, ipset=True, outgoing_endpoints=["203.0.113.0/24"]
+            )
         )
         agent.setup()
+
+        self.mock_ipset_restore(ANY, returncode=1)
         with self.assertRaises(IOError):
             agent.run()
+        verify(subprocess, times=1).run(...)
 
-    def test_teardown_drops_ip_tables_rules_error(self):
-        when(os).geteuid().thenReturn(0)
-        iptables_block_agent_config = self.iptables_block_agent_config
-        agent = IPTablesBlock(iptables_block_agent_config)
-        self.mock_subprocess_exits_with_error(ANY)
-        with self.assertRaises(Exception):
+    def test_teardown_ipset_error(self):
+        agent = IPTablesBlock(
+            IPTablesBlockConfig(
+                iptables_wait=1, ipset=True, outgoing_endpoints=["203.0.113.0/24"]
+            )
+        )
+        self.mock_iptables_restore(ANY)
+        self.mock_ipset_restore(ANY, returncode=1)
+        with self.assertRaises(AgentError):
             agent.teardown()
 
     def tearDown(self) -> None:
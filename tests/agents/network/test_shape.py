@@ -0,0 +1,224 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+import socket
+import subprocess
+from threading import Event
+from unittest import TestCase
+
+from mockito import ANY, mock, unstub, verify, when
+from pydantic import ValidationError
+
+from ychaos.agents.agent import AgentState
+from ychaos.agents.exceptions import AgentError
+from ychaos.agents.network.shape import (
+    NetworkShape,
+    NetworkShapeConfig,
+    tc_command,
+)
+
+DEFAULT_QDISC = "qdisc pfifo_fast 0: root refcnt 2 bands 3 priomap 1 2 2 2 1 2 0 0 1 1 1 1 1 1 1 1\n"
+SHAPED_QDISC = (
+    "qdisc netem ca05: root refcnt 2 limit 1000 delay 100ms\n"
+    "qdisc tbf ca07: parent ca05:1 rate 1Mbit burst 1600b lat 50ms\n"
+)
+
+
+class TestNetworkShape(TestCase):
+    def mock_tc(self, args, stdout="", returncode=0, batch=None):
+        when(subprocess).run(
+            ["sudo", tc_command, *args],
+            input=batch,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        ).thenReturn(
+            subprocess.CompletedProcess(
+                args=[], returncode=returncode, stdout=stdout, stderr=""
+            )
+        )
+
+    def mock_qdisc_show(self, stdout):
+        self.mock_tc(["qdisc", "show", "dev", "eth0"], stdout=stdout)
+
+    def test_network_shape_config_validation(self):
+        with self.assertRaises(ValidationError):
+            NetworkShapeConfig(reorder_pct=10)
+        with self.assertRaises(ValidationError):
+            NetworkShapeConfig(jitter_ms=10)
+        with self.assertRaises(ValidationError):
+            NetworkShapeConfig(interface="eth0; reboot")
+
+    def test_network_shape_tc_batch_without_filters(self):
+        agent = NetworkShape(
+            NetworkShapeConfig(
+                delay_ms=100,
+                jitter_ms=10,
+                correlation_pct=25,
+                loss_pct=1.5,
+                bandwidth_kbit=1000,
+            )
+        )
+        self.assertEqual(
+            agent.tc_batch(),
+            "qdisc add dev eth0 root handle ca05: netem delay 100ms 10ms 25% loss 1.5%\n"
+            "qdisc add dev eth0 parent ca05:1 handle ca07: tbf rate 1000kbit burst 1600b latency 50ms\n",
+        )
+
+    def test_network_shape_tc_batch_with_filters(self):
+        agent = NetworkShape(
+            NetworkShapeConfig(
+                delay_ms=100,
+                duplicate_pct=2,
+                reorder_pct=25,
+                destination_ports=[443],
+                destinations=["203.0.113.0/24", "198.51.100.7"],
+            )
+        )
+        self.assertEqual(
+            agent.tc_batch(),
+            "qdisc add dev eth0 root handle ca05: prio bands 4\n"
+            "qdisc add dev eth0 parent ca05:4 handle ca06: netem delay 100ms duplicate 2% reorder 25%\n"
+            "filter add dev eth0 parent ca05: protocol ip prio 1 u32 "
+            "match ip dst 203.0.113.0/24 match ip dport 443 0xffff flowid ca05:4\n"
+            "filter add dev eth0 parent ca05: protocol ip prio 1 u32 "
+            "match ip dst 198.51.100.7/32 match ip dport 443 0xffff flowid ca05:4\n",
+        )
+
+    def test_network_shape_tc_batch_with_port_filters(self):
+        agent = NetworkShape(
+            NetworkShapeConfig(loss_pct=10, destination_ports=[80, 443])
+        )
+        self.assertEqual(
+            agent.tc_batch(),
+            "qdisc add dev eth0 root handle ca05: prio bands 4\n"
+            "qdisc add dev eth0 parent ca05:4 handle ca06: netem delay 0ms loss 10%\n"
+            "filter add dev eth0 parent ca05: protocol ip prio 1 u32 match ip dport 80 0xffff flowid ca05:4\n"
+            "filter add dev eth0 parent ca05: protocol ip prio 1 u32 match ip dport 443 0xffff flowid ca05:4\n",
+        )
+
+    def test_network_shape_run_and_teardown(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100, bandwidth_kbit=1000))
+
+        self.mock_qdisc_show(DEFAULT_QDISC)
+        agent.setup()
+        self.assertEqual(agent.current_state, AgentState.SETUP)
+        self.assertEqual(agent.original_qdisc, DEFAULT_QDISC.strip())
+
+        self.mock_tc(["-batch", "-"], batch=agent.tc_batch())
+        agent.run()
+        self.assertEqual(agent.current_state, AgentState.RUNNING)
+
+        self.mock_qdisc_show(SHAPED_QDISC)
+        self.mock_tc(["qdisc", "del", "dev", "eth0", "root"])
+        agent.teardown()
+        self.assertEqual(agent.current_state, AgentState.TEARDOWN)
+        verify(subprocess, times=1).run(
+            ["sudo", tc_command, "qdisc", "del", "dev", "eth0", "root"],
+            input=None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def test_network_shape_setup_fails_with_configured_root_qdisc(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100))
+
+        self.mock_qdisc_show("qdisc fq 8001: root refcnt 2 limit 10000p\n")
+        with self.assertRaises(AgentError):
+            agent.setup()
+
+    def test_network_shape_run_failure_restores_qdisc(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100))
+        self.mock_qdisc_show(DEFAULT_QDISC)
+        agent.setup()
+
+        self.mock_tc(["-batch", "-"], batch=ANY, returncode=1)
+        self.mock_qdisc_show(SHAPED_QDISC)
+        self.mock_tc(["qdisc", "del", "dev", "eth0", "root"])
+        with self.assertRaises(IOError):
+            agent.run()
+        verify(subprocess, times=1).run(
+            ["sudo", tc_command, "qdisc", "del", "dev", "eth0", "root"],
+            input=None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def test_network_shape_teardown_does_not_delete_qdisc_not_added_by_agent(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100))
+
+        self.mock_qdisc_show(DEFAULT_QDISC)
+        agent.teardown()
+        verify(subprocess, times=1).run(...)
+
+    def test_network_shape_teardown_raises_error_when_failed(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100))
+
+        self.mock_qdisc_show(SHAPED_QDISC)
+        self.mock_tc(["qdisc", "del", "dev", "eth0", "root"], returncode=2)
+        with self.assertRaises(AgentError):
+            agent.teardown()
+
+    def test_network_shape_monitor_measures_rtt(self):
+        agent = NetworkShape(
+            NetworkShapeConfig(delay_ms=100, probe_host="203.0.113.7", probe_port=80)
+        )
+
+        connection = mock()
+        when(connection).__enter__().thenReturn(connection)
+        when(connection).__exit__(...).thenReturn(None)
+        when(socket).create_connection(("203.0.113.7", 80), timeout=5).thenReturn(
+            connection
+        )
+
+        # The first probe is started by the first call to monitor
+        status = agent.monitor().get()
+        self.assertEqual(status.data["interface"], "eth0")
+
+        agent._prober.join()
+        status = agent.monitor().get()
+        self.assertGreaterEqual(status.data["rtt_ms"], 0)
+
+        agent._prober.join()
+        when(socket).create_connection(("203.0.113.7", 80), timeout=5).thenRaise(
+            socket.timeout()
+        )
+        agent.monitor()
+        agent._prober.join()
+        status = agent.monitor().get()
+        self.assertTrue(math.isnan(status.data["rtt_ms"]))
+
+    def test_network_shape_monitor_does_not_wait_for_probe(self):
+        agent = NetworkShape(
+            NetworkShapeConfig(delay_ms=100, probe_host="203.0.113.7", probe_port=80)
+        )
+
+        probing = Event()
+
+        def create_connection(*args, **kwargs):
+            probing.wait(5)
+            raise socket.timeout()
+
+        when(socket).create_connection(...).thenAnswer(create_connection)
+        try:
+            status = agent.monitor().get()
+            self.assertTrue(math.isnan(status.data["rtt_ms"]))
+
+            # A probe is in progress. monitor neither waits for it nor starts another
+            prober = agent._prober
+            agent.monitor().get()
+            self.assertIs(prober, agent._prober)
+            self.assertTrue(prober.is_alive())
+        finally:
+            probing.set()
+        agent._prober.join()
+
+    def test_network_shape_monitor_without_probe_host(self):
+        agent = NetworkShape(NetworkShapeConfig(delay_ms=100))
+        status = agent.monitor().get()
+        self.assertTrue(math.isnan(status.data["rtt_ms"]))
+
+    def tearDown(self) -> None:
+        unstub()
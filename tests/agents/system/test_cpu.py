@@ -2,13 +2,16 @@
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 import math
 import multiprocessing
+import os
+import time
 from datetime import datetime, timedelta
 from unittest import TestCase
 
 from mockito import unstub, when
 
 from ychaos.agents.agent import AgentState
-from ychaos.agents.system.cpu import CPUBurn, CPUBurnConfig, _burn
+from ychaos.agents.system import cpu
+from ychaos.agents.system.cpu import CPUBurn, CPUBurnConfig, LoadProfile, _burn
 from ychaos.utils.dependency import DependencyUtils
 
 
@@ -88,5 +91,84 @@ class TestCpuBurn(TestCase):
         self.assertTrue(math.isnan(status.data["cpu_usage"]))
         self.assertEqual(status.data["cpu_count"], 0)
 
+    def test_burn_with_duty_cycle(self):
+        start = time.process_time()
+        _burn(
+            end=datetime.now() + timedelta(milliseconds=500),
+            duty_cycle=[0.3],
+            slice_seconds=0.05,
+        )
+        self.assertAlmostEqual((time.process_time() - start) / 0.5, 0.3, delta=0.15)
+
+    def test_effective_cpus_within_affinity(self):
+        when(os).sched_getaffinity(0).thenReturn({2, 5, 7, 9})
+        when(cpu)._get_cgroup_cpu_limit().thenReturn(None)
+
+        self.assertListEqual(CPUBurnConfig(cores_pct=50).effective_cpus(), [2, 5])
+        self.assertEqual(CPUBurnConfig(cores_pct=100).effective_cpu_count(), 4)
+
+    def test_effective_cpus_within_cgroup_cpu_limit(self):
+        when(os).sched_getaffinity(0).thenReturn({0, 1, 2, 3})
+        when(cpu)._get_cgroup_cpu_limit().thenReturn(1.5)
+
+        self.assertListEqual(CPUBurnConfig().effective_cpus(), [0, 1])
+
+    def test_target_cpu_pct_for_constant_profile(self):
+        config = CPUBurnConfig(duration=100, cpu_pct=70)
+        for elapsed in (0, 50, 100):
+            self.assertEqual(config.target_cpu_pct(elapsed), 70)
+
+    def test_target_cpu_pct_for_linear_profile(self):
+        config = CPUBurnConfig(
+            duration=100, cpu_pct=80, profile="linear", ramp_duration=20
+        )
+        self.assertEqual(config.target_cpu_pct(0), 0)
+        self.assertEqual(config.target_cpu_pct(10), 40)
+        self.assertEqual(config.target_cpu_pct(50), 80)
+        self.assertEqual(config.target_cpu_pct(90), 40)
+        self.assertEqual(config.target_cpu_pct(100), 0)
+
+        # Ramps up till the half of the duration by default
+        config = CPUBurnConfig(duration=100, cpu_pct=80, profile="linear")
+        self.assertEqual(config.target_cpu_pct(25), 40)
+
+    def test_target_cpu_pct_for_step_profile(self):
+        config = CPUBurnConfig(
+            duration=100, cpu_pct=80, profile=LoadProfile.STEP, ramp_duration=40
+        )
+        self.assertEqual(config.target_cpu_pct(5), 20)
+        self.assertEqual(config.target_cpu_pct(15), 40)
+        self.assertEqual(config.target_cpu_pct(50), 80)
+        self.assertEqual(config.target_cpu_pct(95), 20)
+
+    def test_target_cpu_pct_for_sine_profile(self):
+        config = CPUBurnConfig(duration=100, cpu_pct=90, profile="sine", period=20)
+        self.assertAlmostEqual(config.target_cpu_pct(0), 0)
+        self.assertAlmostEqual(config.target_cpu_pct(5), 45)
+        self.assertAlmostEqual(config.target_cpu_pct(10), 90)
+
+    def test_adjust_duty_cycle(self):
+        self.assertAlmostEqual(CPUBurn._adjust_duty_cycle(0.5, 40, 60), 0.6)
+        self.assertAlmostEqual(CPUBurn._adjust_duty_cycle(0.5, 80, 60), 0.4)
+        self.assertEqual(CPUBurn._adjust_duty_cycle(0.95, 0, 100), 1)
+        self.assertEqual(CPUBurn._adjust_duty_cycle(0.05, 100, 0), 0)
+
+    def test_cpu_burn_holds_duty_cycle_and_stops_workers(self):
+        when(os).sched_getaffinity(0).thenReturn({0})
+        cpu_burn_agent = CPUBurn(CPUBurnConfig(duration=1, cpu_pct=50))
+
+        cpu_burn_agent.setup()
+        cpu_burn_agent.start()
+        self.assertEqual(cpu_burn_agent.current_state, AgentState.COMPLETED)
+        self.assertEqual(len(cpu_burn_agent._workers), 1)
+        self.assertFalse(cpu_burn_agent._workers[0].is_alive())
+
+        status = cpu_burn_agent.monitor().get()
+        self.assertEqual(status.data["target_cpu_pct"], 50)
+        self.assertEqual(len(status.data["duty_cycle"]), 1)
+
+        cpu_burn_agent.teardown()
+        self.assertEqual(cpu_burn_agent.current_state, AgentState.TEARDOWN)
+
     def tearDown(self) -> None:
         unstub()
@@ -1,14 +1,21 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 import collections
+import errno
+import os
 import shutil
 from pathlib import Path
 from unittest import TestCase
 
-from mockito import unstub, when
+from mockito import mock, unstub, when
+from pydantic import ValidationError
 
 from ychaos.agents.agent import AgentState
-from ychaos.agents.system.disk import DiskFill, DiskFillConfig
+from ychaos.agents.system.disk import (
+    DiskFill,
+    DiskFillConfig,
+    DiskFillStrategy,
+)
 
 
 class TestDiskFill(TestCase):
@@ -151,3 +158,94 @@ class TestDiskFill(TestCase):
 
     def tearDown(self) -> None:
         unstub()
+
+    def test_disk_fill_strategies(self):
+        stats = self.usage(8 * 1024 * 1024, 0, 8 * 1024 * 1024)
+        when(shutil).disk_usage(Path(".")).thenReturn(stats)
+        disk_file = Path().resolve() / "ychaos_diskfill/filler0.txt"
+
+        for strategy in DiskFillStrategy:
+            disk_fill_agent = DiskFill(
+                DiskFillConfig(
+                    duration=0.1,
+                    partition="./",
+                    partition_pct=25,
+                    strategy=strategy,
+                    write_chunk_size="256KiB",
+                )
+            )
+            disk_fill_agent.setup()
+            disk_fill_agent.run()
+
+            self.assertEqual(2 * 1024 * 1024, disk_file.stat().st_size)
+            self.assertEqual(2 * 1024 * 1024, disk_fill_agent.disk_space_filled)
+            allocated = disk_file.stat().st_blocks * 512
+            if strategy == DiskFillStrategy.SPARSE:
+                self.assertLess(allocated, 1024 * 1024)
+            else:
+                self.assertGreaterEqual(allocated, 2 * 1024 * 1024)
+
+            disk_fill_agent.teardown()
+            self.assertEqual(0, disk_fill_agent.disk_space_filled)
+
+    def test_disk_fill_write_strategy_when_fallocate_not_supported(self):
+        when(os).posix_fallocate(...).thenRaise(
+            OSError(errno.EOPNOTSUPP, "Operation not supported")
+        )
+        disk_fill_agent = DiskFill(self.disk_fill_config_100)
+
+        disk_fill_agent.setup()
+        disk_fill_agent.run()
+
+        disk_file = Path().resolve() / "ychaos_diskfill/filler0.txt"
+        self.assertEqual(bytes(1024), disk_file.read_bytes())
+        self.assertEqual(1024, disk_fill_agent.disk_space_filled)
+
+        disk_fill_agent.teardown()
+
+    def test_disk_fill_write_chunk_size_lower_bound(self):
+        for write_chunk_size in (0, "1KiB"):
+            with self.assertRaises(ValidationError):
+                DiskFillConfig(partition="./", write_chunk_size=write_chunk_size)
+
+    def test_disk_fill_write_raises_error_when_nothing_is_written(self):
+        disk_fill_agent = DiskFill(self.disk_fill_config_100)
+        disk_fill_agent._zeros = bytes(4096)
+        f = mock(dict(name="filler0.txt"))
+        when(f).write(...).thenReturn(0)
+
+        with self.assertRaises(IOError):
+            disk_fill_agent._write(f, 1024)
+        self.assertEqual(0, disk_fill_agent.disk_space_filled)
+
+    def test_disk_fill_with_multiple_writer_threads(self):
+        stats = self.usage(4096, 0, 4096)
+        when(shutil).disk_usage(Path(".")).thenReturn(stats)
+        disk_fill_agent = DiskFill(
+            DiskFillConfig(
+                duration=0.1,
+                partition="./",
+                partition_pct=100,
+                max_file_size=1025,
+                writer_threads=3,
+            )
+        )
+
+        disk_fill_agent.setup()
+        disk_fill_agent.run()
+
+        disk_fill_dir = Path().resolve() / "ychaos_diskfill"
+        self.assertListEqual(
+            [1025, 1025, 1025, 1021],
+            [
+                (disk_fill_dir / f"filler{index}.txt").stat().st_size
+                for index in range(4)
+            ],
+        )
+        self.assertEqual(4096, disk_fill_agent.disk_space_filled)
+
+        status = disk_fill_agent.monitor().get()
+        self.assertEqual(4096, status.data["disk_space_filled"])
+
+        disk_fill_agent.teardown()
+        self.assertFalse(disk_fill_dir.exists())
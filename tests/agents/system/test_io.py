@@ -0,0 +1,151 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import errno
+import fcntl
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from mockito import unstub, when
+from pydantic import ValidationError
+
+from ychaos.agents.agent import AgentState
+from ychaos.agents.system.io import IOStress, IOStressConfig
+
+
+class TestIOStress(TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+
+    def _config(self, **kwargs) -> IOStressConfig:
+        return IOStressConfig(
+            **{
+                "duration": 1,
+                "directory": self.directory.name,
+                "file_size": "1MiB",
+                **kwargs,
+            }
+        )
+
+    def test_io_stress_config_block_size_not_multiple_of_512(self):
+        with self.assertRaises(ValidationError):
+            self._config(block_size=1000)
+
+    def test_io_stress_config_file_size_smaller_than_block_size(self):
+        with self.assertRaises(ValidationError):
+            self._config(block_size="1MiB", file_size="512KiB")
+
+    def test_io_stress_config_effective_iops(self):
+        self.assertIsNone(self._config().effective_iops())
+        self.assertEqual(self._config(iops=100).effective_iops(), 100)
+        self.assertEqual(
+            self._config(iops=100, bandwidth="200KiB").effective_iops(), 50
+        )
+
+    def test_io_stress_reads_and_writes(self):
+        io_stress_agent = IOStress(self._config(workers=2))
+
+        io_stress_agent.setup()
+        self.assertEqual(AgentState.SETUP, io_stress_agent.current_state)
+
+        # The file is written at the start of the run, not during setup
+        self.assertListEqual(list(io_stress_agent._io_stress_dir.iterdir()), list())
+
+        io_stress_agent.start()
+        self.assertEqual(AgentState.COMPLETED, io_stress_agent.current_state)
+        self.assertGreater(io_stress_agent.bytes_read, 0)
+        self.assertGreater(io_stress_agent.bytes_written, 0)
+
+        files = list(io_stress_agent._io_stress_dir.iterdir())
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0].stat().st_size, 1024 * 1024)
+
+        status = io_stress_agent.monitor().get()
+        self.assertAlmostEqual(status.data["elapsed"], 1, delta=0.2)
+        self.assertGreater(status.data["read_mbps"], 0)
+        self.assertGreater(status.data["write_mbps"], 0)
+        self.assertGreater(status.data["iops"], 0)
+        self.assertGreater(status.data["read_latency"]["count"], 0)
+        self.assertIn("p99", status.data["write_latency"])
+
+        io_stress_agent.teardown()
+        self.assertEqual(AgentState.TEARDOWN, io_stress_agent.current_state)
+        self.assertListEqual(list(Path(self.directory.name).iterdir()), list())
+
+    def test_io_stress_only_reads_sequentially(self):
+        io_stress_agent = IOStress(self._config(read_pct=100, random_pct=0))
+
+        io_stress_agent.setup()
+        io_stress_agent.start()
+        self.assertGreater(io_stress_agent.bytes_read, 0)
+        self.assertEqual(io_stress_agent.bytes_written, 0)
+
+        io_stress_agent.teardown()
+
+    def test_io_stress_direct_writes_with_fsync(self):
+        io_stress_agent = IOStress(self._config(read_pct=0, direct=True, fsync_every=4))
+
+        io_stress_agent.setup()
+        io_stress_agent.start()
+        self.assertEqual(io_stress_agent.bytes_read, 0)
+        self.assertGreater(io_stress_agent.bytes_written, 0)
+
+        io_stress_agent.teardown()
+
+    def test_io_stress_direct_falls_back_when_block_size_is_not_aligned(self):
+        io_stress_agent = IOStress(self._config(block_size=1536, direct=True))
+        path = Path(self.directory.name) / "iostress"
+        path.touch()
+
+        with self.assertWarns(RuntimeWarning):
+            fd = io_stress_agent._open(path)
+        try:
+            self.assertFalse(
+                fcntl.fcntl(fd, fcntl.F_GETFL) & getattr(os, "O_DIRECT", 0)
+            )
+        finally:
+            os.close(fd)
+
+    def test_io_stress_at_target_iops(self):
+        io_stress_agent = IOStress(self._config(iops=20, workers=2))
+
+        io_stress_agent.setup()
+        io_stress_agent.start()
+
+        status = io_stress_agent.monitor().get()
+        operations = (
+            status.data["read_latency"]["count"] + status.data["write_latency"]["count"]
+        )
+        self.assertGreaterEqual(operations, 15)
+        self.assertLessEqual(operations, 24)
+
+        io_stress_agent.teardown()
+
+    def test_io_stress_worker_error_moves_agent_to_error(self):
+        io_stress_agent = IOStress(self._config(read_pct=0, workers=2))
+        when(os).pwrite(...).thenRaise(OSError(errno.ENOSPC, "No space left on device"))
+
+        io_stress_agent.setup()
+        io_stress_agent.start()
+        self.assertEqual(AgentState.ERROR, io_stress_agent.current_state)
+        self.assertFalse(io_stress_agent.exception.empty())
+        error = io_stress_agent.exception.get()
+        self.assertIsInstance(error, OSError)
+        self.assertEqual(errno.ENOSPC, error.errno)
+        self.assertEqual(io_stress_agent.bytes_written, 0)
+
+        io_stress_agent.teardown()
+        self.assertListEqual(list(Path(self.directory.name).iterdir()), list())
+
+    def test_io_stress_monitor_before_run(self):
+        io_stress_agent = IOStress(self._config())
+
+        status = io_stress_agent.monitor().get()
+        self.assertEqual(status.data["elapsed"], 0)
+        self.assertEqual(status.data["iops"], 0)
+        self.assertEqual(status.data["read_latency"]["count"], 0)
+
+    def tearDown(self) -> None:
+        unstub()
+        self.directory.cleanup()
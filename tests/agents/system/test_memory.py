@@ -0,0 +1,146 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+import os
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from mockito import unstub, when
+
+from ychaos.agents.agent import AgentState
+from ychaos.agents.system.memory import MemoryFill, MemoryFillConfig
+from ychaos.utils.dependency import DependencyUtils
+
+
+class TestMemoryFill(TestCase):
+    def setUp(self) -> None:
+        self.memory_fill_config = MemoryFillConfig(
+            duration=0, memory_size="8MiB", chunk_size="3MiB"
+        )
+
+    def test_effective_memory_to_fill_for_memory_size(self):
+        self.assertEqual(
+            self.memory_fill_config.effective_memory_to_fill(), 8 * 1024 * 1024
+        )
+
+    def test_effective_memory_to_fill_for_memory_pct(self):
+        when(os).sysconf("SC_PAGE_SIZE").thenReturn(4096)
+        when(os).sysconf("SC_PHYS_PAGES").thenReturn(1000)
+        self.assertEqual(
+            MemoryFillConfig(memory_pct=50).effective_memory_to_fill(), 2048000
+        )
+
+    def test_memory_fill_allocates_and_releases_memory(self):
+        memory_fill_agent = MemoryFill(self.memory_fill_config)
+
+        memory_fill_agent.setup()
+        self.assertEqual(AgentState.SETUP, memory_fill_agent.current_state)
+
+        memory_fill_agent.run()
+        self.assertEqual(AgentState.RUNNING, memory_fill_agent.current_state)
+        self.assertEqual(memory_fill_agent.memory_filled, 8 * 1024 * 1024)
+        self.assertListEqual(
+            [len(buffer) for buffer in memory_fill_agent._buffers],
+            [3 * 1024 * 1024, 3 * 1024 * 1024, 2 * 1024 * 1024],
+        )
+        self.assertEqual(memory_fill_agent._buffers[-1][-1:], b"\0")
+        self.assertEqual(memory_fill_agent._buffers[-1][:1], b"\x01")
+
+        status = memory_fill_agent.monitor().get()
+        self.assertEqual(status.data["memory_filled"], 8 * 1024 * 1024)
+        self.assertGreater(status.data["rss"], 8 * 1024 * 1024)
+        self.assertGreater(status.data["available_memory"], 0)
+
+        memory_fill_agent.teardown()
+        self.assertEqual(AgentState.TEARDOWN, memory_fill_agent.current_state)
+        self.assertListEqual(memory_fill_agent._buffers, list())
+        self.assertEqual(memory_fill_agent.memory_filled, 0)
+
+    def test_memory_fill_at_rate(self):
+        memory_fill_agent = MemoryFill(
+            MemoryFillConfig(
+                duration=0, memory_size="8MiB", chunk_size="3MiB", rate="32MiB"
+            )
+        )
+
+        memory_fill_agent.setup()
+        start = time.monotonic()
+        memory_fill_agent.run()
+        self.assertGreaterEqual(time.monotonic() - start, 0.24)
+
+        memory_fill_agent.teardown()
+
+    def test_memory_fill_holds_memory_for_duration(self):
+        self.memory_fill_config.duration = 1
+        memory_fill_agent = MemoryFill(self.memory_fill_config)
+
+        memory_fill_agent.setup()
+        start = time.monotonic()
+        memory_fill_agent.start()
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+        self.assertEqual(AgentState.COMPLETED, memory_fill_agent.current_state)
+
+        memory_fill_agent.teardown()
+
+    def test_memory_fill_stop_run(self):
+        memory_fill_agent = MemoryFill(self.memory_fill_config)
+        memory_fill_agent.setup()
+        memory_fill_agent.stop_async_run = True
+
+        memory_fill_agent.run()
+        self.assertEqual(memory_fill_agent.memory_filled, 0)
+
+        memory_fill_agent.teardown()
+
+    def test_memory_fill_page_cache_mode(self):
+        with TemporaryDirectory() as page_cache_dir:
+            memory_fill_agent = MemoryFill(
+                MemoryFillConfig(
+                    duration=0,
+                    memory_size="8MiB",
+                    chunk_size="3MiB",
+                    mode="page_cache",
+                    page_cache_dir=page_cache_dir,
+                )
+            )
+
+            memory_fill_agent.setup()
+            memory_fill_agent.run()
+
+            files = list(memory_fill_agent._page_cache_dir.iterdir())
+            self.assertEqual(len(files), 3)
+            self.assertEqual(
+                sum(file.stat().st_size for file in files), 8 * 1024 * 1024
+            )
+
+            memory_fill_agent.teardown()
+            self.assertListEqual(list(Path(page_cache_dir).iterdir()), list())
+
+    def test_memory_fill_hugepages_mode(self):
+        memory_fill_agent = MemoryFill(
+            MemoryFillConfig(
+                duration=0, memory_size="8MiB", chunk_size="3MiB", mode="hugepages"
+            )
+        )
+
+        memory_fill_agent.setup()
+        memory_fill_agent.run()
+        self.assertEqual(memory_fill_agent.memory_filled, 8 * 1024 * 1024)
+
+        memory_fill_agent.teardown()
+
+    def test_memory_fill_monitor_when_psutil_package_not_installed(self):
+        when(DependencyUtils).import_module("psutil", raise_error=False).thenReturn(
+            None
+        )
+        memory_fill_agent = MemoryFill(self.memory_fill_config)
+
+        status = memory_fill_agent.monitor().get()
+        self.assertTrue(math.isnan(status.data["rss"]))
+        self.assertTrue(math.isnan(status.data["available_memory"]))
+        self.assertEqual(status.data["memory_to_fill"], 8 * 1024 * 1024)
+
+    def tearDown(self) -> None:
+        unstub()
@@ -1,6 +1,7 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import heapq
 import time
 from datetime import datetime, timezone
 from pathlib import Path
@@ -10,7 +11,7 @@ from mockito import ANY, unstub, when
 
 from ychaos.agents.agent import AgentMonitoringDataPoint, AgentState
 from ychaos.agents.coordinator import Coordinator
-from ychaos.testplan.attack import AttackMode
+from ychaos.testplan.attack import AgentExecutionConfig, AttackMode
 from ychaos.testplan.schema import TestPlan
 
 
@@ -74,44 +75,38 @@ class TestCoordinator(TestCase):
             ].append(configured_agents[i])
         self.assertFalse(coordinator.get_exit_status())
 
-    def test_get_next_agent_for_attack(self):
+    def test_schedule_is_ordered_by_start_time(self):
         test_plan = self.test_plan.copy()
         test_plan.attack.mode = AttackMode.CONCURRENT
         coordinator = Coordinator(test_plan)
         configured_agents = coordinator.configure_agent_in_test_plan()
-        for configured_agent in configured_agents:
-            while datetime.now(timezone.utc) <= coordinator.attack_end_time:
-                agent = coordinator.get_next_agent_for_runnable()
-                if agent:
-                    self.assertEqual(id(configured_agent), id(agent))
-                    break
-            else:
-                self.fail(
-                    f"Failed to get Agent:{configured_agent.agent.config.name} for attack"
-                )
-
-    def test_get_next_agent_for_attack_agent_setup_step_failed(self):
+
+        schedule = coordinator._build_schedule()
+        started = [heapq.heappop(schedule)[-1] for _ in range(len(configured_agents))]
+        self.assertListEqual(
+            [configured_agent.start_time for configured_agent in started],
+            sorted(configured_agent.start_time for configured_agent in started),
+        )
+        self.assertEqual(
+            {id(configured_agent) for configured_agent in configured_agents},
+            {id(configured_agent) for configured_agent in started},
+        )
+
+    def test_start_agent_setup_step_failed(self):
         test_plan = self.test_plan.copy()
         test_plan.attack.mode = AttackMode.CONCURRENT
         coordinator = Coordinator(test_plan)
         configured_agents = coordinator.configure_agent_in_test_plan()
+
+        # Agents that are not in INIT state are not started
         configured_agents[0].agent.advance_state(AgentState.SETUP)
+        self.assertFalse(coordinator._start_agent(configured_agents[0]))
+        self.assertFalse(coordinator.get_exit_status())
+
         when(configured_agents[1].agent).setup().thenRaise(IOError())
-        self.assertEqual(configured_agents[1].agent.current_state, AgentState.INIT)
-        coordinator.configured_agents = coordinator.configured_agents[:2]
-        for index, configured_agent in enumerate(configured_agents):
-            while datetime.now(timezone.utc) <= coordinator.attack_end_time:
-                if index == 0 or index == 1:
-                    if coordinator.get_next_agent_for_runnable():
-                        self.fail(msg="Test Failed")
-                        break
-                else:
-                    break
-
-        if not configured_agents[1].agent.exception.empty():
-            self.assertIsInstance(configured_agents[1].agent.exception.get(), IOError)
-        else:
-            self.fail(msg="Missing Error in Agent")
+        self.assertFalse(coordinator._start_agent(configured_agents[1]))
+        self.assertEqual(configured_agents[1].agent.current_state, AgentState.ERROR)
+        self.assertIsInstance(configured_agents[1].agent.exception.get(), IOError)
         self.assertTrue(coordinator.get_exit_status())
 
     def test_check_for_failed_agents(self):
@@ -120,8 +115,7 @@ class TestCoordinator(TestCase):
         configured_agents = coordinator.configure_agent_in_test_plan()
         when(configured_agents[0].agent).setup().thenRaise(IOError())
         self.assertFalse(coordinator.check_for_failed_agents())
-        while datetime.now(timezone.utc) <= configured_agents[0].end_time:
-            coordinator.get_next_agent_for_runnable()
+        coordinator._start_agent(configured_agents[0])
 
         self.assertTrue(coordinator.check_for_failed_agents())
         self.assertTrue(coordinator.check_for_failed_agents(configured_agents[0].agent))
@@ -131,20 +125,24 @@ class TestCoordinator(TestCase):
         coordinator.configured_agents = []
         self.assertFalse(coordinator.check_for_failed_agents())
 
-    def test_get_next_agent_for_teardown(self):
+    def test_teardown_agent_only_tears_down_running_agents(self):
         test_plan = self.test_plan.copy()
         coordinator = Coordinator(test_plan)
-        coordinator.configure_agent_in_test_plan()
-        coordinator.configured_agents = coordinator.configured_agents[:2]
-        self.assertFalse(coordinator.get_next_agent_for_teardown())
-        coordinator.configured_agents[1].agent.advance_state(AgentState.RUNNING)
-        while datetime.now(timezone.utc) <= coordinator.configured_agents[1].end_time:
-            pass
+        configured_agent = coordinator.configure_agent_in_test_plan()[0]
 
-        self.assertEqual(
-            id(coordinator.get_next_agent_for_teardown()),
-            id(coordinator.configured_agents[1]),
-        )
+        coordinator._teardown_agent(configured_agent)
+        self.assertIsNone(configured_agent.agent_teardown_thread)
+
+        configured_agent.agent.advance_state(AgentState.RUNNING)
+        coordinator._teardown_agent(configured_agent)
+        teardown_thread = configured_agent.agent_teardown_thread
+        self.assertIsNotNone(teardown_thread)
+        teardown_thread.join()
+
+        # The agent is not torn down again
+        configured_agent.agent.advance_state(AgentState.RUNNING)
+        coordinator._teardown_agent(configured_agent)
+        self.assertIs(teardown_thread, configured_agent.agent_teardown_thread)
 
     def test_stop_all_running_agents_in_sync(self):
         test_plan = self.test_plan.copy()
@@ -235,9 +233,6 @@ class TestCoordinator(TestCase):
         test_plan.attack.agents = test_plan.attack.agents[-1:]
         coordinator = Coordinator(test_plan)
         coordinator.configure_agent_in_test_plan()
-        when(coordinator).get_next_agent_for_teardown().thenReturn(
-            coordinator.configured_agents[0]
-        ).thenReturn(None)
         coordinator.start_attack()
         self.assertFalse(coordinator.get_exit_status())
         report = coordinator.generate_attack_report()
@@ -258,3 +253,69 @@ class TestCoordinator(TestCase):
 
         self.assertEqual(len(coordinator.get_all_exceptions()), 1)
         self.assertIsInstance(coordinator.get_all_exceptions()[0], Exception)
+
+    def test_start_attack_wakes_up_on_agent_failure(self):
+        test_plan = self.test_plan.copy()
+        test_plan.attack.mode = AttackMode.CONCURRENT
+        test_plan.attack.agents = [
+            AgentExecutionConfig(
+                type="no_op_timed", config=dict(start_delay=0, duration=60)
+            )
+        ]
+        coordinator = Coordinator(test_plan)
+        coordinator.configure_agent_in_test_plan()
+        when(coordinator.configured_agents[0].agent).run().thenRaise(IOError())
+
+        start = time.monotonic()
+        coordinator.start_attack()
+        self.assertLess(time.monotonic() - start, 2)
+
+        self.assertTrue(coordinator.get_exit_status())
+        report = coordinator.generate_attack_report()
+        self.assertEqual(report["agents"][0]["status"], AgentState.ERROR.name)
+
+    def test_start_attack_scheduling_jitter_with_many_agents(self):
+        # Benchmark: Every agent should start & teardown close to its configured time
+        agent_count = 200
+        test_plan = self.test_plan.copy()
+        test_plan.attack.mode = AttackMode.CONCURRENT
+        test_plan.attack.agents = [
+            AgentExecutionConfig(
+                type="no_op_timed",
+                config=dict(name=f"no_op_timed_{i}", start_delay=i % 2, duration=1),
+            )
+            for i in range(agent_count)
+        ]
+        coordinator = Coordinator(test_plan)
+        configured_agents = coordinator.configure_agent_in_test_plan()
+
+        start_jitter = dict()
+        teardown_jitter = dict()
+        expected = {
+            configured_agent.agent.config.name: configured_agent
+            for configured_agent in configured_agents
+        }
+
+        def record(jitter, attr):
+            def _hook(name):
+                jitter[name] = (
+                    datetime.now(timezone.utc) - getattr(expected[name], attr)
+                ).total_seconds()
+
+            return _hook
+
+        coordinator.register_hook(
+            "on_each_agent_start", record(start_jitter, "start_time")
+        )
+        coordinator.register_hook(
+            "on_each_agent_teardown", record(teardown_jitter, "end_time")
+        )
+
+        coordinator.start_attack()
+        self.assertFalse(coordinator.get_exit_status())
+
+        self.assertEqual(len(start_jitter), agent_count)
+        self.assertEqual(len(teardown_jitter), agent_count)
+        for jitter in (start_jitter, teardown_jitter):
+            self.assertGreaterEqual(min(jitter.values()), 0)
+            self.assertLess(max(jitter.values()), 0.5)
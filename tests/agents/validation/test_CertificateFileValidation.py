@@ -1,9 +1,13 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import json
+import os
 from datetime import datetime, timedelta, timezone
-from tempfile import NamedTemporaryFile
+from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 from unittest import TestCase
 
+from pydantic import ValidationError
 from urllib3.contrib import pyopenssl
 
 from ychaos.agents.validation.certificate import (
@@ -77,6 +81,155 @@ class TestCertificateFileValidation(TestCase):
         self.assertFalse(datapoint3.data["is_expired"])
         self.assertFalse(datapoint3.data["is_critical"])
 
+    def test_cert_file_validation_config_requires_paths_or_directories(self):
+        with self.assertRaises(ValidationError):
+            CertificateFileValidationConfig()
+
+
+class TestCertificateDirectoryValidation(TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.cache_directory = TemporaryDirectory()
+        self.cache_file = (
+            Path(self.cache_directory.name) / "cache" / "certificates.json"
+        )
+        root = Path(self.directory.name)
+        (root / "nested").mkdir()
+
+        valid, _ = generate_selfsigned_cert("test.principal.valid")
+        expired, _ = generate_selfsigned_cert(
+            "test.principal.expired", not_after=datetime.now(tz=timezone.utc)
+        )
+
+        # A bundle of 2 certificates
+        (root / "bundle.pem").write_bytes(valid + b"\n" + expired)
+        (root / "nested" / "expired.crt").write_bytes(expired)
+        (root / "nested" / "expired.der").write_bytes(
+            pyopenssl.OpenSSL.crypto.dump_certificate(
+                pyopenssl.OpenSSL.crypto.FILETYPE_ASN1,
+                pyopenssl.OpenSSL.crypto.load_certificate(
+                    pyopenssl.OpenSSL.crypto.FILETYPE_PEM, expired
+                ),
+            )
+        )
+        (root / "nested" / "invalid.pem").write_bytes(b"not a certificate")
+        (root / "README.txt").write_bytes(b"Not matched by the patterns")
+
+        # Links to the files already scanned are skipped
+        os.symlink(root / "bundle.pem", root / "nested" / "link.pem")
+
+    def _run(self, config):
+        agent = CertificateFileValidation(config)
+        agent.setup()
+        agent.run()
+
+        data = list()
+        while not agent._status.empty():
+            data.append(agent._status.get().data)
+        return agent, data[::-1]
+
+    def test_cert_directory_validation(self):
+        agent, data = self._run(
+            CertificateFileValidationConfig(directories=[self.directory.name])
+        )
+        root = self.directory.name
+        self.assertListEqual(
+            [
+                (f"{root}/bundle.pem", "pem", 0, False),
+                (f"{root}/bundle.pem", "pem", 1, True),
+                (f"{root}/nested/expired.crt", "pem", 0, True),
+                (f"{root}/nested/expired.der", "asn1", 0, True),
+            ],
+            [
+                (d["path"], d["type"], d["index"], d["is_expired"])
+                for d in data
+                if d["error"] is None
+            ],
+        )
+        self.assertListEqual(
+            [(f"{root}/nested/invalid.pem", "decoding_error")],
+            [(d["path"], d["error"]) for d in data if d["error"] is not None],
+        )
+        self.assertEqual(4, agent.cache_misses)
+        self.assertEqual(0, agent.cache_hits)
+
+    def test_cert_directory_validation_with_patterns_and_not_recursive(self):
+        _, data = self._run(
+            CertificateFileValidationConfig(
+                directories=[
+                    {
+                        "path": self.directory.name,
+                        "patterns": ["*.pem", "*.der"],
+                        "recursive": False,
+                    }
+                ]
+            )
+        )
+        self.assertListEqual(
+            [f"{self.directory.name}/bundle.pem"] * 2, [d["path"] for d in data]
+        )
+
+    def test_cert_directory_validation_skips_unchanged_files(self):
+        config = CertificateFileValidationConfig(
+            directories=[self.directory.name], workers=2, cache_file=self.cache_file
+        )
+        _, data = self._run(config)
+        self.assertTrue(self.cache_file.exists())
+
+        agent, cached_data = self._run(config)
+        self.assertEqual(4, agent.cache_hits)
+        self.assertEqual(0, agent.cache_misses)
+        self.assertListEqual(
+            [(d["path"], d.get("index")) for d in data],
+            [(d["path"], d.get("index")) for d in cached_data],
+        )
+
+        # Replacing a file with a different certificate is detected
+        valid, _ = generate_selfsigned_cert("test.principal.valid")
+        (Path(self.directory.name) / "nested" / "expired.crt").write_bytes(valid)
+
+        agent, data = self._run(config)
+        self.assertEqual(3, agent.cache_hits)
+        self.assertEqual(1, agent.cache_misses)
+        self.assertFalse(
+            [d for d in data if d["path"].endswith("expired.crt")][0]["is_expired"]
+        )
+
+    def test_cert_directory_validation_without_cache_file(self):
+        config = CertificateFileValidationConfig(directories=[self.directory.name])
+        self._run(config)
+
+        agent, _ = self._run(config)
+        self.assertEqual(0, agent.cache_hits)
+        self.assertEqual(4, agent.cache_misses)
+
+    def test_cert_directory_validation_with_invalid_cache_file(self):
+        self.cache_file.parent.mkdir()
+        self.cache_file.write_text("{")
+        config = CertificateFileValidationConfig(
+            directories=[self.directory.name], cache_file=self.cache_file
+        )
+
+        agent, data = self._run(config)
+        self.assertEqual(4, agent.cache_misses)
+        self.assertEqual(5, len(data))
+
+        # Only the files of the last run are cached
+        config = CertificateFileValidationConfig(
+            directories=[{"path": self.directory.name, "patterns": ["*.crt"]}],
+            cache_file=self.cache_file,
+        )
+        agent, _ = self._run(config)
+        self.assertEqual(1, agent.cache_hits)
+        self.assertListEqual(
+            [f"{self.directory.name}/nested/expired.crt"],
+            list(json.loads(self.cache_file.read_text())["files"]),
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        self.cache_directory.cleanup()
+
 
 # Copyright 2018 Simon Davy
 #
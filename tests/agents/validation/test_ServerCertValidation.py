@@ -1,13 +1,23 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import os
+import socket
+import ssl
+from tempfile import NamedTemporaryFile
+from threading import Event, Thread
 from unittest import TestCase
 
+from mockito import unstub, when
+from OpenSSL import crypto
+
 from ychaos.agents.agent import AgentMonitoringDataPoint
 from ychaos.agents.validation.certificate import (
     ServerCertValidation,
     ServerCertValidationConfig,
 )
 
+from .test_CertificateFileValidation import generate_selfsigned_cert
+
 
 class TestServerCertValidation(TestCase):
     def test_server_cert_validation_never_fails_for_yahoo(self):
@@ -42,3 +52,138 @@ class TestServerCertValidation(TestCase):
         # Coverage
         agent.teardown()
         agent.monitor()
+
+
+class TestServerCertValidationWithLocalServer(TestCase):
+    def setUp(self) -> None:
+        self.cert_file = NamedTemporaryFile("wb", delete=False)
+        self.key_file = NamedTemporaryFile("wb", delete=False)
+        generate_selfsigned_cert(
+            "localhost", cert_fp=self.cert_file, key_fp=self.key_file
+        )
+        self.cert_file.close()
+        self.key_file.close()
+
+        self.server_names = list()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file.name, self.key_file.name)
+        context.sni_callback = (
+            lambda tls, server_name, _context: self.server_names.append(server_name)
+        )
+
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.server.settimeout(0.1)
+        self.stopped = Event()
+        self.port = self.server.getsockname()[1]
+        self.server_thread = Thread(target=self._serve, args=(context,), daemon=True)
+        self.server_thread.start()
+
+    def _serve(self, context):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                with context.wrap_socket(connection, server_side=True):
+                    pass
+            except (OSError, ssl.SSLError):
+                pass
+
+    def test_server_cert_validation_fetches_each_server_once_with_sni(self):
+        config = ServerCertValidationConfig(
+            urls=[
+                f"https://localhost:{self.port}/a",
+                f"https://127.0.0.1:{self.port}",
+                f"https://localhost:{self.port}/b",
+            ],
+            timeout=2,
+        )
+
+        agent = ServerCertValidation(config)
+        agent.setup()
+        agent.run()
+
+        datapoints = [agent._status.get().data for _ in range(3)][::-1]
+        self.assertListEqual(
+            [
+                ("localhost", self.port),
+                ("127.0.0.1", self.port),
+                ("localhost", self.port),
+            ],
+            [(data["host"], data["port"]) for data in datapoints],
+        )
+        for data in datapoints:
+            self.assertIsNone(data["error"])
+            self.assertFalse(data["is_expired"])
+            self.assertFalse(data["is_critical"])
+
+        # One handshake per server. SNI is sent only for the hostname
+        self.assertListEqual(
+            ["localhost"], [name for name in self.server_names if name]
+        )
+        self.assertEqual(2, len(self.server_names))
+
+    def test_server_cert_validation_records_connection_errors(self):
+        self.server.close()
+        config = ServerCertValidationConfig(
+            urls=[f"https://127.0.0.1:{self.port}"], timeout=2
+        )
+
+        agent = ServerCertValidation(config)
+        agent.setup()
+        agent.run()
+
+        data = agent._status.get().data
+        self.assertEqual("ConnectionRefusedError", data["error"])
+        self.assertEqual(self.port, data["port"])
+
+    def test_server_cert_validation_records_certificate_load_errors(self):
+        when(crypto).load_certificate(...).thenRaise(
+            crypto.Error([("asn1 encoding routines", "", "wrong tag")])
+        )
+        config = ServerCertValidationConfig(
+            urls=[f"https://localhost:{self.port}"], timeout=2
+        )
+
+        agent = ServerCertValidation(config)
+        agent.setup()
+        agent.run()
+
+        data = agent._status.get().data
+        self.assertEqual("Error", data["error"])
+        self.assertEqual(self.port, data["port"])
+
+    def test_server_cert_validation_records_missing_certificate(self):
+        when(ssl.SSLSocket).getpeercert(binary_form=True).thenReturn(None)
+        config = ServerCertValidationConfig(
+            urls=[f"https://localhost:{self.port}"], timeout=2
+        )
+
+        agent = ServerCertValidation(config)
+        agent.setup()
+        agent.run()
+
+        data = agent._status.get().data
+        self.assertEqual("SSLError", data["error"])
+        self.assertEqual(self.port, data["port"])
+
+    def test_server_cert_validation_does_not_modify_default_timeout(self):
+        config = ServerCertValidationConfig(
+            urls=[f"https://localhost:{self.port}"], timeout=2
+        )
+        agent = ServerCertValidation(config)
+        agent.setup()
+        agent.run()
+
+        self.assertIsNone(socket.getdefaulttimeout())
+
+    def tearDown(self) -> None:
+        unstub()
+        self.stopped.set()
+        self.server_thread.join(5)
+        self.server.close()
+        os.unlink(self.cert_file.name)
+        os.unlink(self.key_file.name)
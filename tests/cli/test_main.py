@@ -1,7 +1,9 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import subprocess  # nosec
 import sys
 from argparse import Namespace
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from unittest import TestCase
 
@@ -126,3 +128,92 @@ class TestYChaosCLISubcommand(TestCase):
 
     def tearDown(self) -> None:
         unstub()
+
+
+class TestYChaosCLIImportTime(TestCase):
+    # Budget of the cumulative import time (in microseconds) of the CLI
+    IMPORT_TIME_BUDGET = 1000000
+
+    # Prints the modules imported by the CLI after the CLI exits
+    SCRIPT = (
+        "import sys\n"
+        "from ychaos.cli.main import main\n"
+        "sys.argv = ['ychaos', *sys.argv[1:]]\n"
+        "try:\n"
+        "    main()\n"
+        "finally:\n"
+        "    print('--modules--', *sys.modules, sep='\\n')\n"
+    )
+
+    # Loads a testplan as `ychaos agent attack` does, without attacking
+    ATTACK_SCRIPT = (
+        "import sys\n"
+        "from argparse import Namespace\n"
+        "from pathlib import Path\n"
+        "from ychaos.cli.agent.attack import Attack\n"
+        "from ychaos.cli.mock import MockApp\n"
+        "args = Namespace(cls=Attack, testplan=Path(sys.argv[1]), attack_report_yaml=None)\n"
+        "args.app = MockApp(args)\n"
+        "assert Attack(**vars(args)).validate_and_load_test_plan() == 0\n"
+        "print('--modules--', *sys.modules, sep='\\n')\n"
+    )
+
+    def _run_cli(self, *program_arguments: str, script: str = SCRIPT):
+        proc = subprocess.run(  # nosec
+            [sys.executable, "-X", "importtime", "-c", script, *program_arguments],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertEqual(0, proc.returncode)
+
+        # import time: self [us] | cumulative | imported package
+        import_times = dict()
+        for line in proc.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, module = line.split("|")
+                if cumulative.strip().isdigit():
+                    import_times[module.strip()] = int(cumulative)
+
+        modules = proc.stdout.split("--modules--\n")[-1].splitlines()
+        return import_times, modules
+
+    def test_ychaos_help_imports_only_the_cli(self):
+        import_times, modules = self._run_cli("--help")
+
+        self.assertLess(import_times["ychaos.cli.main"], self.IMPORT_TIME_BUDGET)
+        for module in modules:
+            self.assertFalse(
+                module.startswith(("ychaos.agents", "ychaos.core", "ychaos.testplan")),
+                f"{module} is imported by ychaos --help",
+            )
+
+    def test_ychaos_agent_attack_imports_only_the_attack_subcommand(self):
+        _, modules = self._run_cli("agent", "attack", "--help")
+
+        self.assertIn("ychaos.cli.agent.attack", modules)
+        for module in modules:
+            self.assertFalse(
+                module.startswith(
+                    (
+                        "ychaos.agents.system",
+                        "ychaos.agents.network",
+                        "ychaos.agents.validation",
+                        "ychaos.core",
+                        "ychaos.cli.verify",
+                        "ychaos.cli.execute",
+                    )
+                ),
+                f"{module} is imported by ychaos agent attack",
+            )
+
+    def test_ychaos_agent_attack_loads_testplan_without_numpy(self):
+        testplan = (
+            Path(__file__)
+            .joinpath("../../resources/testplans/valid/testplan7.yaml")
+            .resolve()
+        )
+        _, modules = self._run_cli(str(testplan), script=self.ATTACK_SCRIPT)
+
+        self.assertIn("ychaos.testplan.schema", modules)
+        self.assertNotIn("numpy", modules)
@@ -9,9 +9,11 @@ from unittest import TestCase
 
 from mockito import unstub, when
 
+from ychaos.cli.main import YChaos
 from ychaos.cli.mock import MockApp
 from ychaos.cli.verify import Verify
 from ychaos.core.verification.controller import VerificationController
+from ychaos.core.verification.report import JSONLinesReport
 from ychaos.testplan import SystemState
 from ychaos.testplan.schema import TestPlan
 
@@ -110,6 +112,138 @@ class TestVerificationCommand(TestCase):
             "The system is verified to be in steady state" in app.get_console_output()
         )
 
+    def test_verification_rejects_non_positive_concurrency(self):
+        for concurrency in ("0", "-2"):
+            with self.assertRaises(SystemExit) as _exit:
+                YChaos.main(
+                    [
+                        "verify",
+                        "-t",
+                        str(self.testplans_directory / "valid/testplan1.yaml"),
+                        "-s",
+                        "steady",
+                        "--concurrency",
+                        concurrency,
+                    ]
+                )
+            self.assertEqual(2, _exit.exception.code)
+
+    def test_continuous_verification_rejects_non_positive_interval(self):
+        with self.assertRaises(SystemExit) as _exit:
+            YChaos.main(
+                [
+                    "verify",
+                    "-t",
+                    str(self.testplans_directory / "valid/testplan1.yaml"),
+                    "-s",
+                    "steady",
+                    "--continuous",
+                    "--interval",
+                    "0",
+                ]
+            )
+        self.assertEqual(2, _exit.exception.code)
+
+    def test_continuous_verification_for_testplan_with_valid_plugin_path(self):
+        temp_testplan_file = NamedTemporaryFile("w+")
+        temp_py_file = NamedTemporaryFile("w+", suffix="py")
+
+        args = Namespace()
+        args.cls = self.cls
+
+        testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan1.yaml")
+        )
+        testplan.verification[0].config["path"] = temp_py_file.name
+        testplan.export_to_file(temp_testplan_file.name)
+
+        args.testplan = temp_testplan_file.name
+        args.state = "steady"
+        args.continuous = True
+        args.interval = 0.1
+        args.duration = 0.15
+
+        temp_report_directory = TemporaryDirectory()
+        args.dump_json = Path(temp_report_directory.name) / "report.json"
+
+        app = MockApp(args)
+        args.app = app
+
+        self.assertEqual(0, args.cls.main(args))
+
+        console_output = app.get_console_output()
+        self.assertIn("Completed round 1", console_output)
+        self.assertNotIn("Completed round 2", console_output)
+        self.assertListEqual(
+            [path.name for path in Path(temp_report_directory.name).iterdir()],
+            ["report.json"],
+        )
+        state_data = json.loads(Path(args.dump_json).read_text())
+        self.assertIsNotNone(state_data[0]["STEADY"])
+
+    def test_continuous_verification_appends_each_round_to_jsonl_report_once(self):
+        temp_testplan_file = NamedTemporaryFile("w+")
+        temp_py_file = NamedTemporaryFile("w+", suffix="py")
+
+        args = Namespace()
+        args.cls = self.cls
+
+        testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan1.yaml")
+        )
+        testplan.verification[0].config["path"] = temp_py_file.name
+        testplan.export_to_file(temp_testplan_file.name)
+
+        args.testplan = temp_testplan_file.name
+        args.state = "steady"
+        args.continuous = True
+        args.interval = 0.1
+        args.duration = 0.15
+
+        temp_report_directory = TemporaryDirectory()
+        args.dump_jsonl = Path(temp_report_directory.name) / "report.jsonl"
+
+        app = MockApp(args)
+        args.app = app
+
+        self.assertEqual(0, args.cls.main(args))
+
+        # Rounds 0 and 1, each appended once
+        self.assertEqual(2, len(args.dump_jsonl.read_text().splitlines()))
+
+    def test_verification_appends_to_jsonl_report_and_reuses_it_as_state_data(self):
+        temp_testplan_file = NamedTemporaryFile("w+")
+        temp_py_file = NamedTemporaryFile("w+", suffix="py")
+
+        testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan1.yaml")
+        )
+        testplan.verification[0].config["path"] = temp_py_file.name
+        testplan.verification[0].states = [SystemState.STEADY, SystemState.CHAOS]
+        testplan.export_to_file(temp_testplan_file.name)
+
+        temp_report_directory = TemporaryDirectory()
+        report_path = Path(temp_report_directory.name) / "report.jsonl"
+
+        for state in ("steady", "chaos"):
+            args = Namespace()
+            args.cls = self.cls
+            args.testplan = temp_testplan_file.name
+            args.state = state
+            args.dump_jsonl = report_path
+            if report_path.exists():
+                args.state_data = report_path
+
+            app = MockApp(args)
+            args.app = app
+            self.assertEqual(0, args.cls.main(args))
+
+        self.assertEqual(len(report_path.read_text().splitlines()), 2)
+        state_data = JSONLinesReport(report_path).load()
+        self.assertIsNotNone(state_data[0][SystemState.STEADY])
+        self.assertIsNotNone(state_data[0][SystemState.CHAOS])
+        self.assertIsNone(state_data[0][SystemState.RECOVERED])
+
     def test_verification_for_testplan_with_valid_plugin_path_with_invalid_state_data_path_directory(
         self,
     ):
@@ -278,7 +412,12 @@ class TestVerificationCommand(TestCase):
         temp_state_data_file_json = NamedTemporaryFile("w+")
         args.dump_json = temp_state_data_file_json.name
 
-        with when(builtins).open(Path(temp_state_data_file_json.name), "w").thenRaise(
+        # The report is written to a temporary file before being renamed to the report file
+        temp_report_file_path = Path(temp_state_data_file_json.name)
+        temp_report_file_path = temp_report_file_path.with_name(
+            f".{temp_report_file_path.name}.tmp"
+        )
+        with when(builtins).open(temp_report_file_path, "w").thenRaise(
             PermissionError()
         ):
 
@@ -8,6 +8,7 @@ from unittest import TestCase
 
 from rich.emoji import Emoji
 
+from ychaos.cli.main import YChaos
 from ychaos.cli.mock import MockApp
 from ychaos.cli.testplan.validate import TestPlanValidatorCommand
 
@@ -132,5 +133,79 @@ class TestTestPlanValidatorCommand(TestCase):
             in console_output
         )
 
+    def test_validate_testplans_in_parallel_with_cache(self):
+        args = Namespace()
+        args.cls = self.cls
+
+        with TemporaryDirectory() as cache_directory:
+            # Required Arguments for TestPlanValidatorCommand
+            args.paths = [
+                self.testplans_directory.joinpath("valid/"),
+                self.testplans_directory.joinpath("invalid/testplan1.yaml"),
+            ]
+            args.workers = 2
+            args.cache = Path(cache_directory) / "cache.json"
+
+            for _ in range(2):
+                # Create a Mocked CLI App
+                app = MockApp(args)
+
+                args.app = app
+                self.assertEqual(1, args.cls.main(args))
+
+                console_output = app.get_console_output()
+                self.assertTrue(
+                    f"{Emoji.replace(':white_check_mark:')} {self.testplans_directory}/valid/testplan1.yaml"
+                    in console_output
+                )
+                self.assertTrue(
+                    f"{Emoji.replace(':exclamation:')} {self.testplans_directory}/invalid/testplan1.yaml"
+                    in console_output
+                )
+                self.assertTrue(args.cache.is_file())
+
+    def test_validate_malformed_testplan_with_cache(self):
+        args = Namespace()
+        args.cls = self.cls
+
+        with TemporaryDirectory() as directory:
+            malformed = Path(directory) / "malformed.yaml"
+            malformed.write_text("a: [")
+
+            args.paths = [
+                malformed,
+                self.testplans_directory.joinpath("valid/testplan1.yaml"),
+            ]
+            args.workers = 2
+            args.cache = Path(directory) / "cache.json"
+
+            app = MockApp(args)
+            args.app = app
+            self.assertEqual(1, args.cls.main(args))
+
+            console_output = app.get_console_output()
+            self.assertTrue(
+                f"{Emoji.replace(':exclamation:')} {malformed}" in console_output
+            )
+            self.assertTrue(
+                f"{Emoji.replace(':white_check_mark:')} {self.testplans_directory}/valid/testplan1.yaml"
+                in console_output
+            )
+            self.assertTrue(args.cache.is_file())
+
+    def test_validate_rejects_non_positive_workers(self):
+        for workers in ("0", "-2"):
+            with self.assertRaises(SystemExit) as _exit:
+                YChaos.main(
+                    [
+                        "testplan",
+                        "validate",
+                        str(self.testplans_directory.joinpath("valid")),
+                        "--workers",
+                        workers,
+                    ]
+                )
+            self.assertEqual(2, _exit.exception.code)
+
     def get_mock_namespace(self):
         pass
@@ -7,12 +7,13 @@ from pathlib import Path
 from unittest import TestCase
 
 import yaml
-from mockito import ANY, mock, unstub, when, expect, verify
+from mockito import ANY, expect, mock, unstub, verify, when
 
 from ychaos.core.exceptions.executor_errors import (
     YChaosTargetConfigConditionFailedError,
 )
 from ychaos.core.executor.MachineTargetExecutor import (
+    AgentBundle,
     MachineTargetExecutor,
     YChaosAnsibleResultCallback,
 )
@@ -48,9 +49,14 @@ class TestMachineTargetExecutor(TestCase):
         executor = MachineTargetExecutor(mock_valid_testplan)
         executor.prepare()
 
+        # Only the target hosts (50% of the effective hosts) are in the inventory
+        self.assertEqual(1, len(executor.target_hosts))
         self.assertListEqual(
-            sorted(executor.ansible_context.inventory.hosts),
-            ["mockhost01.ychaos.yahoo.com", "mockhost02.ychaos.yahoo.com"],
+            sorted(executor.ansible_context.inventory.hosts), executor.target_hosts
+        )
+        self.assertTrue(
+            executor.target_hosts[0]
+            in ["mockhost01.ychaos.yahoo.com", "mockhost02.ychaos.yahoo.com"]
         )
         self.assertEqual(executor.ansible_context.play_source["connection"], "ssh")
         self.assertEqual(executor.ansible_context.play_source["strategy"], "free")
@@ -208,6 +214,102 @@ class TestMachineTargetExecutor(TestCase):
             ]
         )
 
+    def test_machine_executor_target_hosts_are_replayed_with_seed(self):
+        mock_valid_testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan2.yaml")
+        )
+        mock_valid_testplan.attack.target_config.update(
+            hostpatterns=["mockhost[001-100].ychaos.yahoo.com"]
+        )
+        executor = MachineTargetExecutor(mock_valid_testplan)
+        self.assertIsNotNone(executor.seed)
+
+        mock_valid_testplan.attack.target_config.update(seed=executor.seed)
+        replay = MachineTargetExecutor(mock_valid_testplan)
+        self.assertEqual(executor.seed, replay.seed)
+        self.assertListEqual(executor.target_hosts, replay.target_hosts)
+
+    def test_machine_executor_prepare_in_rolling_wave_mode(self):
+        mock_valid_testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan2.yaml")
+        )
+        mock_valid_testplan.attack.target_config.update(
+            serial=10, max_fail_percentage=20
+        )
+        executor = MachineTargetExecutor(mock_valid_testplan)
+        executor.prepare()
+
+        self.assertEqual(executor.ansible_context.play_source["serial"], 10)
+        self.assertEqual(
+            executor.ansible_context.play_source["max_fail_percentage"], 20
+        )
+        # All the hosts in a wave are attacked in parallel
+        self.assertEqual(executor.ansible_context.tqm._forks, 10)
+
+    def test_machine_executor_prepare_with_forks(self):
+        mock_valid_testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan2.yaml")
+        )
+        executor = MachineTargetExecutor(mock_valid_testplan)
+        executor.prepare()
+        self.assertNotIn("serial", executor.ansible_context.play_source)
+        self.assertNotIn("max_fail_percentage", executor.ansible_context.play_source)
+
+        mock_valid_testplan.attack.target_config.update(forks=50, serial=10)
+        executor = MachineTargetExecutor(mock_valid_testplan)
+        executor.prepare()
+        self.assertEqual(executor.ansible_context.play_source["serial"], 10)
+        self.assertEqual(executor.ansible_context.tqm._forks, 50)
+
+    def test_machine_executor_prepare_with_agent_bundle(self):
+        mock_valid_testplan = TestPlan.load_file(
+            self.testplans_directory.joinpath("valid/testplan2.yaml")
+        )
+        mock_valid_testplan.attack.target_config.update(agent_bundle=dict())
+
+        def _mock_build(*args):
+            executor.agent_bundle.digest = "0123456789abcdef"
+            executor.agent_bundle.path = Path("/tmp/ychaos_bundle_0123456789abcdef")
+
+        when(AgentBundle).build().thenAnswer(_mock_build)
+        executor = MachineTargetExecutor(mock_valid_testplan)
+        executor.prepare()
+
+        bundle_directory = "{{result_pwd.stdout}}/.ychaos_cache/0123456789abcdef"
+        playbook_tasks = executor.ansible_context.play_source["tasks"]
+        playbook_task_names = list(map(lambda x: x["name"], playbook_tasks))
+
+        self.assertNotIn("Install ychaos[agents]", playbook_task_names)
+        self.assertNotIn("Delete Virtual environment", playbook_task_names)
+
+        cache_check_task = playbook_tasks[
+            playbook_task_names.index("Check cached agent bundle")
+        ]
+        self.assertEqual(
+            cache_check_task["action"]["path"], bundle_directory + "/.installed"
+        )
+        for name in (
+            "Copy agent bundle to remote",
+            "Install agent bundle",
+            "Mark agent bundle as installed",
+        ):
+            self.assertEqual(
+                playbook_tasks[playbook_task_names.index(name)]["when"],
+                "not result_agent_bundle_cache.stat.exists",
+            )
+
+        run_task = playbook_tasks[playbook_task_names.index("Run YChaos Agent")]
+        self.assertTrue(
+            run_task["action"]["cmd"].startswith(
+                f"source {bundle_directory}/ychaos_env/bin/activate"
+            )
+        )
+
+        executor.debug_mode = True
+        self.assertTrue(
+            executor.get_virtualenv().endswith("0123456789abcdef-debug/ychaos_env")
+        )
+
     def test_ychaos_ansible_callback(self):
         callback = YChaosAnsibleResultCallback(
             hooks=dict(
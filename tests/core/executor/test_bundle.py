@@ -0,0 +1,106 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import subprocess  # nosec
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from mockito import ANY, unstub, verify, when
+
+from ychaos.core.executor.bundle import AgentBundle
+
+
+def mock_wheelhouse(wheelhouse: Path):
+    wheelhouse.mkdir(parents=True)
+    wheelhouse.joinpath("ychaos-0.5.0-py3-none-any.whl").write_bytes(b"ychaos")
+    wheelhouse.joinpath("psutil-5.9.0-cp39-cp39-manylinux2010_x86_64.whl").write_bytes(
+        b"psutil"
+    )
+
+
+class TestAgentBundle(TestCase):
+    def setUp(self) -> None:
+        self.build_dir = Path(tempfile.mkdtemp())
+        when(AgentBundle)._build_wheelhouse(ANY).thenAnswer(mock_wheelhouse)
+
+    def test_agent_bundle_build(self):
+        bundle = AgentBundle(build_dir=self.build_dir)
+        path = bundle.build()
+
+        self.assertEqual(len(bundle.digest), 16)
+        self.assertEqual(path.name, f"ychaos_bundle_{bundle.digest}.tar.gz")
+
+        with tarfile.open(path) as tar:
+            self.assertListEqual(
+                sorted(tar.getnames()),
+                [
+                    "requirements.txt",
+                    "wheelhouse",
+                    "wheelhouse/psutil-5.9.0-cp39-cp39-manylinux2010_x86_64.whl",
+                    "wheelhouse/ychaos-0.5.0-py3-none-any.whl",
+                ],
+            )
+
+        self.assertEqual(
+            self.build_dir.joinpath("requirements.txt").read_text(),
+            "psutil==5.9.0\nychaos==0.5.0\n",
+        )
+
+        bundle.cleanup()
+        self.assertFalse(self.build_dir.exists())
+
+    def test_agent_bundle_digest_depends_only_on_wheel_content(self):
+        bundle1 = AgentBundle()
+        bundle1.build()
+        bundle2 = AgentBundle()
+        bundle2.build()
+        self.assertEqual(bundle1.digest, bundle2.digest)
+
+        unstub()
+
+        def _mock_modified_wheelhouse(wheelhouse: Path):
+            mock_wheelhouse(wheelhouse)
+            wheelhouse.joinpath("ychaos-0.5.0-py3-none-any.whl").write_bytes(b"new")
+
+        when(AgentBundle)._build_wheelhouse(ANY).thenAnswer(_mock_modified_wheelhouse)
+        bundle3 = AgentBundle()
+        bundle3.build()
+        self.assertNotEqual(bundle1.digest, bundle3.digest)
+
+        for bundle in (bundle1, bundle2, bundle3):
+            bundle.cleanup()
+
+    def test_agent_bundle_builds_wheelhouse_with_pip(self):
+        unstub()
+        when(subprocess).run(ANY, check=True).thenAnswer(
+            lambda *args, **kwargs: mock_wheelhouse(self.build_dir / "wheelhouse")
+        )
+        bundle = AgentBundle(
+            requirement="ychaos[agents]==0.5.0",
+            pip_args=["--index-url", "https://pypi.example.com/simple"],
+            build_dir=self.build_dir,
+        )
+        bundle.build()
+
+        verify(subprocess, times=1).run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "wheel",
+                "--quiet",
+                "--wheel-dir",
+                str(self.build_dir.joinpath("wheelhouse")),
+                "pip",
+                "ychaos[agents]==0.5.0",
+                "--index-url",
+                "https://pypi.example.com/simple",
+            ],
+            check=True,
+        )
+        bundle.cleanup()
+
+    def tearDown(self) -> None:
+        unstub()
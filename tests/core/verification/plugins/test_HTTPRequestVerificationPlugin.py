@@ -1,5 +1,8 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import json
+import time
+from datetime import timedelta
 from unittest import TestCase
 
 import requests
@@ -9,6 +12,7 @@ from requests import Response
 
 from ychaos.core.verification.plugins.HTTPRequestVerificationPlugin import (
     HTTPRequestVerificationPlugin,
+    RateLimiter,
 )
 from ychaos.testplan.verification import HTTPRequestVerification
 
@@ -42,7 +46,7 @@ class TestHTTPVerificationPlugin(TestCase):
         verification_plugin = HTTPRequestVerificationPlugin(self.verification_config)
 
         mock_response = mock(
-            dict(status_code=200, elapsed=mock(dict(microseconds=34000)), spec=Response)
+            dict(status_code=200, elapsed=timedelta(microseconds=34000), spec=Response)
         )
         when(verification_plugin._session).request(
             "GET",
@@ -53,8 +57,10 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 0)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
-        self.assertListEqual(state_data.data[0], list())
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
+        self.assertListEqual(state_data.data["failures"][0], list())
 
     def test_plugin_run_verification_for_failure_response(self):
         verification_plugin = HTTPRequestVerificationPlugin(self.verification_config)
@@ -62,7 +68,7 @@ class TestHTTPVerificationPlugin(TestCase):
         mock_response = mock(
             dict(
                 status_code=500,
-                elapsed=mock(dict(microseconds=23000)),
+                elapsed=timedelta(microseconds=23000),
                 url="https://ychaos.yahoo.com",
             ),
             spec=Response,
@@ -76,9 +82,11 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 1)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
         self.assertDictEqual(
-            state_data.data[0][0],
+            state_data.data["failures"][0][0],
             dict(
                 latency=23.0,
                 status_code=500,
@@ -94,7 +102,7 @@ class TestHTTPVerificationPlugin(TestCase):
         mock_response = mock(
             dict(
                 status_code=200,
-                elapsed=mock(dict(microseconds=52000)),
+                elapsed=timedelta(microseconds=52000),
                 url="https://ychaos.yahoo.com",
             ),
             spec=Response,
@@ -108,9 +116,11 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 1)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
         self.assertDictEqual(
-            state_data.data[0][0],
+            state_data.data["failures"][0][0],
             dict(
                 latency=52.0,
                 status_code=200,
@@ -120,6 +130,119 @@ class TestHTTPVerificationPlugin(TestCase):
             ),
         )
 
+    def test_plugin_run_verification_for_latency_above_a_second(self):
+        verification_plugin = HTTPRequestVerificationPlugin(self.verification_config)
+        when(verification_plugin._session).request(
+            "GET",
+            url="https://ychaos.yahoo.com",
+            timeout=self.verification_config.timeout / 1000,
+        ).thenReturn(
+            mock(
+                dict(
+                    status_code=200,
+                    elapsed=timedelta(seconds=1, microseconds=20000),
+                    url="https://ychaos.yahoo.com",
+                ),
+                spec=Response,
+            )
+        )
+
+        state_data = verification_plugin.run_verification()
+
+        self.assertEqual(state_data.rc, 1)
+        self.assertEqual(state_data.data["failures"][0][0]["latency"], 1020.0)
+
+    def _mock_latencies(self, verification_plugin, latencies_ms):
+        when(verification_plugin._session).request(
+            "GET",
+            url="https://ychaos.yahoo.com",
+            timeout=verification_plugin.config.timeout / 1000,
+        ).thenReturn(
+            *[
+                mock(
+                    dict(
+                        status_code=200,
+                        elapsed=timedelta(milliseconds=latency),
+                        url="https://ychaos.yahoo.com",
+                    ),
+                    spec=Response,
+                )
+                for latency in latencies_ms
+            ]
+        )
+
+    def test_plugin_run_verification_reports_latency_summary(self):
+        verification_config = HTTPRequestVerification(
+            urls=["https://ychaos.yahoo.com"], count=100, latency=200
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        self._mock_latencies(verification_plugin, range(1, 101))
+
+        state_data = verification_plugin.run_verification()
+
+        self.assertEqual(state_data.rc, 0)
+        latency = state_data.data["latency"]
+        self.assertEqual(latency["count"], 100)
+        self.assertEqual(latency["min"], 1)
+        self.assertEqual(latency["max"], 100)
+        self.assertAlmostEqual(latency["p50"], 50, delta=1)
+        self.assertAlmostEqual(latency["p99"], 99, delta=1.6)
+        self.assertEqual(
+            sum(count for _, count in state_data.data["latency_histogram"]), 100
+        )
+        self.assertDictEqual(state_data.data["latency_breaches"], dict())
+
+    def test_plugin_run_verification_with_latency_percentiles(self):
+        verification_config = HTTPRequestVerification(
+            urls=["https://ychaos.yahoo.com"],
+            count=100,
+            latency=10,
+            latency_percentiles={50: 60, 99.9: 150},
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        self._mock_latencies(verification_plugin, range(1, 101))
+
+        state_data = verification_plugin.run_verification()
+
+        # Per request latency is not verified when percentiles are configured
+        self.assertEqual(state_data.rc, 0)
+        self.assertFalse(any(state_data.data["failures"]))
+        self.assertIn("p99.9", state_data.data["latency"])
+
+    def test_plugin_run_verification_for_latency_percentile_breach(self):
+        verification_config = HTTPRequestVerification(
+            urls=["https://ychaos.yahoo.com"],
+            count=100,
+            latency_percentiles={50: 60, 99: 90},
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        self._mock_latencies(verification_plugin, range(1, 101))
+
+        state_data = verification_plugin.run_verification()
+
+        self.assertEqual(state_data.rc, 1)
+        self.assertListEqual(list(state_data.data["latency_breaches"]), ["p99"])
+
+    def test_plugin_run_verification_with_latency_percentiles_for_no_response(self):
+        verification_config = HTTPRequestVerification(
+            urls=["https://ychaos.yahoo.com"], latency_percentiles={99: 100}
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        when(verification_plugin._session).request(
+            "GET",
+            url="https://ychaos.yahoo.com",
+            timeout=verification_config.timeout / 1000,
+        ).thenRaise(requests.exceptions.ConnectionError("Connection refused"))
+
+        state_data = verification_plugin.run_verification()
+
+        self.assertEqual(state_data.rc, 1)
+        self.assertDictEqual(state_data.data["latency_breaches"], dict(p99=None))
+        self.assertIsNone(state_data.data["latency"]["p99"])
+
+        # The state data is valid JSON, without NaN
+        json.loads(state_data.json(), parse_constant=self.fail)
+
     def test_plugin_run_verification_for_request_raises_timeout(self):
         verification_plugin = HTTPRequestVerificationPlugin(self.verification_config)
 
@@ -132,9 +255,11 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 1)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
         self.assertDictEqual(
-            state_data.data[0][0],
+            state_data.data["failures"][0][0],
             dict(
                 latency=None,
                 status_code=None,
@@ -151,7 +276,7 @@ class TestHTTPVerificationPlugin(TestCase):
         self.assertEqual(verification_plugin._session.verify, False)
 
         mock_response = mock(
-            dict(status_code=200, elapsed=mock(dict(microseconds=34000)), spec=Response)
+            dict(status_code=200, elapsed=timedelta(microseconds=34000), spec=Response)
         )
         when(verification_plugin._session).request(
             "GET",
@@ -162,8 +287,10 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 0)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
-        self.assertListEqual(state_data.data[0], list())
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
+        self.assertListEqual(state_data.data["failures"][0], list())
 
     def test_plugin_run_verification_with_basic_auth(self):
         self.verification_config.basic_auth = "mock_username", SecretStr(
@@ -175,7 +302,7 @@ class TestHTTPVerificationPlugin(TestCase):
         )
 
         mock_response = mock(
-            dict(status_code=200, elapsed=mock(dict(microseconds=34000)), spec=Response)
+            dict(status_code=200, elapsed=timedelta(microseconds=34000), spec=Response)
         )
         when(verification_plugin._session).request(
             "GET",
@@ -186,8 +313,10 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 0)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
-        self.assertListEqual(state_data.data[0], list())
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
+        self.assertListEqual(state_data.data["failures"][0], list())
 
     def test_plugin_run_verification_with_bearer_token(self):
         self.verification_config.bearer_token = SecretStr("mock_token")
@@ -198,7 +327,7 @@ class TestHTTPVerificationPlugin(TestCase):
         )
 
         mock_response = mock(
-            dict(status_code=200, elapsed=mock(dict(microseconds=34000)), spec=Response)
+            dict(status_code=200, elapsed=timedelta(microseconds=34000), spec=Response)
         )
         when(verification_plugin._session).request(
             "GET",
@@ -209,8 +338,70 @@ class TestHTTPVerificationPlugin(TestCase):
         state_data = verification_plugin.run_verification()
 
         self.assertEqual(state_data.rc, 0)
-        self.assertEqual(len(state_data.data), self.verification_config.count)
-        self.assertListEqual(state_data.data[0], list())
+        self.assertEqual(
+            len(state_data.data["failures"]), self.verification_config.count
+        )
+        self.assertListEqual(state_data.data["failures"][0], list())
+
+    def test_plugin_run_verification_concurrently(self):
+        urls = [f"https://ychaos{i}.yahoo.com" for i in range(10)]
+        verification_config = HTTPRequestVerification(
+            urls=urls, count=2, concurrency=10
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        self.assertEqual(
+            verification_plugin._session.get_adapter(urls[0])._pool_maxsize, 10
+        )
+
+        def _mock_request(method, url, timeout):
+            time.sleep(0.1)
+            return mock(
+                dict(
+                    status_code=500 if url in urls[1::2] else 200,
+                    elapsed=timedelta(microseconds=34000),
+                    url=url,
+                ),
+                spec=Response,
+            )
+
+        verification_plugin._session.request = _mock_request
+
+        start = time.monotonic()
+        state_data = verification_plugin.run_verification()
+        self.assertLess(time.monotonic() - start, 1)
+
+        self.assertEqual(state_data.rc, 1)
+        self.assertEqual(len(state_data.data["failures"]), 2)
+        for counter_data in state_data.data["failures"]:
+            self.assertListEqual([data["url"] for data in counter_data], urls[1::2])
+
+    def test_plugin_run_verification_with_rate_limit(self):
+        verification_config = HTTPRequestVerification(
+            urls=["https://ychaos.yahoo.com"], count=5, concurrency=5, rate=20
+        )
+        verification_plugin = HTTPRequestVerificationPlugin(verification_config)
+        when(verification_plugin._session).request(
+            "GET",
+            url="https://ychaos.yahoo.com",
+            timeout=verification_config.timeout / 1000,
+        ).thenReturn(
+            mock(
+                dict(status_code=200, elapsed=timedelta(microseconds=34000)),
+                spec=Response,
+            )
+        )
+
+        start = time.monotonic()
+        state_data = verification_plugin.run_verification()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        self.assertEqual(state_data.rc, 0)
+
+    def test_rate_limiter(self):
+        rate_limiter = RateLimiter(rate=100)
+        start = time.monotonic()
+        for _ in range(11):
+            rate_limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
 
     def tearDown(self) -> None:
         unstub()
@@ -1,6 +1,8 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
-from tempfile import NamedTemporaryFile
+import json
+from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 from unittest import TestCase
 
 from mockito import mock, unstub, when
@@ -68,6 +70,21 @@ class TestOpenTSDBVerificationPlugin(TestCase):
             )
         ]
 
+    @staticmethod
+    def _mock_stream_response(response_data, chunk_size=7):
+        content = json.dumps(response_data).encode()
+        return mock(
+            dict(
+                status_code=200,
+                # Small chunks irrespective of the chunk size requested
+                iter_content=lambda **kwargs: (
+                    content[i : i + chunk_size]
+                    for i in range(0, len(content), chunk_size)
+                ),
+            ),
+            spec=Response,
+        )
+
     def test_plugin_init(self):
         verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
         self.assertDictEqual(verification_plugin._session.headers, dict())
@@ -77,14 +94,13 @@ class TestOpenTSDBVerificationPlugin(TestCase):
     def test_plugin_run_verification_for_success_response_from_tsdb(self):
         verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
 
-        mock_response = mock(
-            dict(status_code=200, json=lambda: self.mock_tsdb_response, spec=Response)
-        )
+        mock_response = self._mock_stream_response(self.mock_tsdb_response)
         when(verification_plugin._session).request(
             "POST",
             url="https://tsdb.ychaos.yahoo.com",
             timeout=self.verification_config.timeout / 1000,
             json=dict(),
+            stream=True,
         ).thenReturn(mock_response)
 
         state_data = verification_plugin.run_verification()
@@ -96,14 +112,13 @@ class TestOpenTSDBVerificationPlugin(TestCase):
         self.verification_config.criteria[0].conditionals[0].value = 0
         verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
 
-        mock_response = mock(
-            dict(status_code=200, json=lambda: self.mock_tsdb_response, spec=Response)
-        )
+        mock_response = self._mock_stream_response(self.mock_tsdb_response)
         when(verification_plugin._session).request(
             "POST",
             url="https://tsdb.ychaos.yahoo.com",
             timeout=self.verification_config.timeout / 1000,
             json=dict(),
+            stream=True,
         ).thenReturn(mock_response)
 
         state_data = verification_plugin.run_verification()
@@ -121,6 +136,7 @@ class TestOpenTSDBVerificationPlugin(TestCase):
             url="https://tsdb.ychaos.yahoo.com",
             timeout=self.verification_config.timeout / 1000,
             json=dict(),
+            stream=True,
         ).thenReturn(mock_response)
 
         state_data = verification_plugin.run_verification()
@@ -133,19 +149,81 @@ class TestOpenTSDBVerificationPlugin(TestCase):
         self.verification_config.criteria.pop()
         verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
 
-        mock_response = mock(
-            dict(status_code=200, json=lambda: self.mock_tsdb_response, spec=Response)
-        )
+        mock_response = self._mock_stream_response(self.mock_tsdb_response)
         when(verification_plugin._session).request(
             "POST",
             url="https://tsdb.ychaos.yahoo.com",
             timeout=self.verification_config.timeout / 1000,
             json=dict(),
+            stream=True,
         ).thenReturn(mock_response)
 
         state_data = verification_plugin.run_verification()
         self.assertEqual(state_data.rc, 0)
 
+    def test_plugin_run_verification_records_series_summary(self):
+        verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
+        when(verification_plugin._session).request(
+            "POST",
+            url="https://tsdb.ychaos.yahoo.com",
+            timeout=self.verification_config.timeout / 1000,
+            json=dict(),
+            stream=True,
+        ).thenReturn(
+            self._mock_stream_response(
+                self.mock_tsdb_response + self.mock_tsdb_response
+            )
+        )
+
+        state_data = verification_plugin.run_verification()
+        self.assertEqual(state_data.rc, 0)
+        self.assertIsNone(state_data.data["raw_data_file"])
+        self.assertEqual(len(state_data.data["series"]), 2)
+        self.assertDictEqual(
+            state_data.data["series"][0],
+            dict(
+                metric="tsd.hbase.puts",
+                tags=dict(),
+                aggregatedTags=["host"],
+                datapoints=4,
+                aggregated=dict(avg=25625991360),
+            ),
+        )
+
+    def test_plugin_run_verification_writes_raw_data_file(self):
+        with TemporaryDirectory() as tmpdir:
+            self.verification_config.raw_data_file = Path(tmpdir) / "tsdb.json"
+            verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
+            when(verification_plugin._session).request(
+                "POST",
+                url="https://tsdb.ychaos.yahoo.com",
+                timeout=self.verification_config.timeout / 1000,
+                json=dict(),
+                stream=True,
+            ).thenReturn(self._mock_stream_response(self.mock_tsdb_response))
+
+            state_data = verification_plugin.run_verification()
+            self.assertEqual(state_data.rc, 0)
+            self.assertEqual(
+                state_data.data["raw_data_file"],
+                str(self.verification_config.raw_data_file),
+            )
+            self.assertListEqual(
+                json.loads(self.verification_config.raw_data_file.read_text()),
+                self.mock_tsdb_response,
+            )
+
+    def test_validate_criteria(self):
+        verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
+        self.assertEqual(
+            verification_plugin.validate_criteria(self.mock_tsdb_response), 0
+        )
+
+        self.verification_config.criteria[0].conditionals[0].value = 0
+        self.assertEqual(
+            verification_plugin.validate_criteria(self.mock_tsdb_response), 1
+        )
+
     def test_range_criteria_config(self):
         file = NamedTemporaryFile()
         self.verification_config = OpenTSDBVerification(
@@ -164,14 +242,13 @@ class TestOpenTSDBVerificationPlugin(TestCase):
             ],
         )
         verification_plugin = OpenTSDBVerificationPlugin(self.verification_config)
-        mock_response = mock(
-            dict(status_code=200, json=lambda: self.mock_tsdb_response, spec=Response)
-        )
+        mock_response = self._mock_stream_response(self.mock_tsdb_response)
         when(verification_plugin._session).request(
             "POST",
             url="https://tsdb.ychaos.yahoo.com",
             timeout=self.verification_config.timeout / 1000,
             json=dict(),
+            stream=True,
         ).thenReturn(mock_response)
 
         state_data = verification_plugin.run_verification()
@@ -1,6 +1,7 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 import json
+import threading
 import time
 from pathlib import Path
 from tempfile import NamedTemporaryFile
@@ -9,12 +10,48 @@ from unittest import TestCase
 import yaml
 from mockito import unstub, verify, when
 
-from ychaos.core.verification.controller import VerificationController
+from ychaos.core.verification.controller import (
+    VERIFICATION_PLUGIN_MAP,
+    VerificationController,
+)
+from ychaos.core.verification.data import VerificationStateData
+from ychaos.core.verification.plugins.BaseVerificationPlugin import (
+    BaseVerificationPlugin,
+)
+from ychaos.core.verification.report import JSONLinesReport
 from ychaos.testplan import SystemState
 from ychaos.testplan.schema import TestPlan
 from ychaos.testplan.verification import VerificationConfig, VerificationType
 
 
+class MockSleepVerificationPlugin(BaseVerificationPlugin):
+    __verification_type__ = "noop"
+
+    events = list()
+    lock = threading.Lock()
+
+    def run_verification(self) -> VerificationStateData:
+        with self.lock:
+            self.events.append(("start", id(self.state_data)))
+        time.sleep(0.2)
+        with self.lock:
+            self.events.append(("end", id(self.state_data)))
+        return VerificationStateData(rc=0, type=self.__verification_type__)
+
+
+class MockCountingVerificationPlugin(BaseVerificationPlugin):
+    __verification_type__ = "noop"
+
+    runs = 0
+    fail_on_run = None
+
+    def run_verification(self) -> VerificationStateData:
+        MockCountingVerificationPlugin.runs += 1
+        return VerificationStateData(
+            rc=int(self.runs == self.fail_on_run), type=self.__verification_type__
+        )
+
+
 class TestVerificationController(TestCase):
     def setUp(self) -> None:
         self.testplans_directory = (
@@ -95,6 +132,27 @@ class TestVerificationController(TestCase):
             verification_data, verification_controller.get_encoded_verification_data()
         )
 
+    def test_verfication_controller_dump_jsonl_data(self):
+        mock_data_file = NamedTemporaryFile("w+", suffix=".jsonl")
+        verification_controller = VerificationController(
+            self.mock_testplan, SystemState.STEADY, list()
+        )
+        verification_controller.testplan.verification[0].config["path"] = __file__
+        self.assertTrue(verification_controller.execute())
+
+        verification_controller.dump_verification(mock_data_file, output_format="jsonl")
+        mock_data_file.flush()
+
+        verification_data = VerificationController(
+            self.mock_testplan,
+            SystemState.CHAOS,
+            JSONLinesReport(mock_data_file.name).load(),
+        )
+        self.assertListEqual(
+            verification_data.get_encoded_verification_data(),
+            verification_controller.get_encoded_verification_data(),
+        )
+
     def test_verfication_controller_dump_yaml_data(self):
         mock_data_file = NamedTemporaryFile("w+")
         verification_controller = VerificationController(
@@ -164,5 +222,155 @@ class TestVerificationController(TestCase):
         verification_controller.execute()
         verify(time, times=2).sleep(0)
 
+    def _get_noop_testplan(self, *depends_on):
+        return TestPlan(
+            attack=self.mock_testplan.attack,
+            verification=[
+                dict(
+                    states=["STEADY"],
+                    type="noop",
+                    config=dict(),
+                    depends_on=dependencies,
+                )
+                for dependencies in depends_on
+            ],
+        )
+
+    def test_verification_controller_execute_concurrently(self):
+        VERIFICATION_PLUGIN_MAP["noop"] = MockSleepVerificationPlugin
+        MockSleepVerificationPlugin.events = list()
+
+        testplan = self._get_noop_testplan(list(), list(), list(), list())
+        verification_controller = VerificationController(
+            testplan, SystemState.STEADY, list(), concurrency=4
+        )
+
+        hook_calls = list()
+        verification_controller.register_hook(
+            "on_each_plugin_start", lambda index, config: hook_calls.append(index)
+        )
+        verification_controller.register_hook(
+            "on_each_plugin_end",
+            lambda index, config, state_data: hook_calls.append(index),
+        )
+
+        start = time.monotonic()
+        self.assertTrue(verification_controller.execute())
+        self.assertLess(time.monotonic() - start, 0.6)
+
+        self.assertListEqual(hook_calls, [0, 1, 2, 3, 0, 1, 2, 3])
+        for data in verification_controller.verification_data:
+            self.assertEqual(data.get_data(SystemState.STEADY).rc, 0)
+
+    def test_verification_controller_execute_concurrently_with_dependencies(self):
+        VERIFICATION_PLUGIN_MAP["noop"] = MockSleepVerificationPlugin
+        MockSleepVerificationPlugin.events = list()
+
+        testplan = self._get_noop_testplan(list(), [0], list())
+        verification_controller = VerificationController(
+            testplan, SystemState.STEADY, list(), concurrency=3
+        )
+        self.assertTrue(verification_controller.execute())
+
+        events = MockSleepVerificationPlugin.events
+        data_ids = [id(data) for data in verification_controller.verification_data]
+        self.assertLess(
+            events.index(("end", data_ids[0])), events.index(("start", data_ids[1]))
+        )
+        self.assertLess(
+            events.index(("start", data_ids[2])), events.index(("end", data_ids[0]))
+        )
+
+    def test_verification_controller_depends_on_only_preceding_configurations(self):
+        with self.assertRaises(ValueError):
+            self._get_noop_testplan([1], list())
+
+        with self.assertRaises(ValueError):
+            self._get_noop_testplan(list(), [1])
+
+    def test_verification_controller_raises_error_on_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            VerificationController(
+                self.mock_testplan, SystemState.STEADY, list(), concurrency=0
+            )
+
+    def _get_continuous_controller(self, fail_on_run=None, strict=True):
+        VERIFICATION_PLUGIN_MAP["noop"] = MockCountingVerificationPlugin
+        MockCountingVerificationPlugin.runs = 0
+        MockCountingVerificationPlugin.fail_on_run = fail_on_run
+
+        testplan = self._get_noop_testplan(list())
+        testplan.verification[0].strict = strict
+        verification_controller = VerificationController(
+            testplan, SystemState.STEADY, list()
+        )
+
+        rounds = list()
+        verification_controller.register_hook(
+            "on_each_round_end",
+            lambda round_number, verify_list: rounds.append(round_number),
+        )
+        return verification_controller, rounds
+
+    def test_verification_controller_execute_continuously_for_duration(self):
+        verification_controller, rounds = self._get_continuous_controller()
+
+        start = time.monotonic()
+        self.assertTrue(
+            verification_controller.execute_continuously(interval=0.1, duration=0.35)
+        )
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertListEqual(rounds, [0, 1, 2, 3])
+        self.assertEqual(
+            verification_controller.verification_data[0]
+            .get_data(SystemState.STEADY)
+            .rc,
+            0,
+        )
+
+    def test_verification_controller_execute_continuously_stops_on_strict_failure(
+        self,
+    ):
+        verification_controller, rounds = self._get_continuous_controller(fail_on_run=3)
+
+        self.assertFalse(verification_controller.execute_continuously(interval=0.01))
+        self.assertListEqual(rounds, [0, 1, 2])
+        self.assertEqual(
+            verification_controller.verification_data[0]
+            .get_data(SystemState.STEADY)
+            .rc,
+            1,
+        )
+
+    def test_verification_controller_execute_continuously_does_not_stop_when_not_strict(
+        self,
+    ):
+        verification_controller, rounds = self._get_continuous_controller(
+            fail_on_run=1, strict=False
+        )
+
+        self.assertTrue(
+            verification_controller.execute_continuously(interval=0.05, duration=0.12)
+        )
+        self.assertListEqual(rounds, [0, 1, 2])
+
+    def test_verification_controller_execute_continuously_until_stopped(self):
+        verification_controller, rounds = self._get_continuous_controller()
+
+        timer = threading.Timer(0.15, verification_controller.stop)
+        timer.start()
+        start = time.monotonic()
+        self.assertTrue(verification_controller.execute_continuously(interval=0.1))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertListEqual(rounds, [0, 1])
+
+    def test_verification_controller_execute_continuously_raises_error_on_invalid_interval(
+        self,
+    ):
+        verification_controller, _ = self._get_continuous_controller()
+        with self.assertRaises(ValueError):
+            verification_controller.execute_continuously(interval=0)
+
     def tearDown(self) -> None:
+        VERIFICATION_PLUGIN_MAP.pop("noop", None)
         unstub()
@@ -0,0 +1,79 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ychaos.core.verification.data import (
+    VerificationData,
+    VerificationStateData,
+)
+from ychaos.core.verification.report import JSONLinesReport
+from ychaos.testplan import SystemState
+
+
+class TestJSONLinesReport(TestCase):
+    def setUp(self) -> None:
+        self.temp_directory = TemporaryDirectory()
+        self.report_path = Path(self.temp_directory.name) / "report.jsonl"
+
+    def _append(self, verification_data, states=tuple(SystemState)):
+        with open(self.report_path, "a") as fp:
+            JSONLinesReport.dump(fp, verification_data, states)
+
+    @staticmethod
+    def _verification_data(rc, state=SystemState.STEADY):
+        data = VerificationData.parse_obj(dict())
+        data.replace_data(
+            state,
+            VerificationStateData(rc=rc, type="http_request", data=dict(rc=rc)),
+        )
+        return data
+
+    def test_dump_and_load(self):
+        self._append([self._verification_data(0), self._verification_data(1)])
+
+        report = JSONLinesReport(self.report_path)
+        self.assertEqual(len(report), 2)
+
+        state_data = report.load()
+        self.assertEqual(len(state_data), 2)
+        self.assertEqual(state_data[1][SystemState.STEADY].rc, 1)
+        self.assertDictEqual(state_data[1][SystemState.STEADY].data, dict(rc=1))
+        self.assertIsNone(state_data[1][SystemState.CHAOS])
+
+    def test_latest_record_wins(self):
+        self._append([self._verification_data(0), self._verification_data(0)])
+        self._append([self._verification_data(1, SystemState.CHAOS)])
+        self._append(
+            [self._verification_data(2), self._verification_data(2)],
+            states=[SystemState.STEADY],
+        )
+
+        state_data = JSONLinesReport(self.report_path).get(0)
+        self.assertEqual(state_data[SystemState.STEADY].rc, 2)
+        self.assertEqual(state_data[SystemState.CHAOS].rc, 1)
+        self.assertIsNone(state_data[SystemState.RECOVERED])
+
+    def test_load_with_size(self):
+        self._append([self._verification_data(0)])
+
+        state_data = JSONLinesReport(self.report_path).load(size=3)
+        self.assertEqual(len(state_data), 3)
+        self.assertEqual(state_data[0][SystemState.STEADY].rc, 0)
+        self.assertDictEqual(state_data[2], dict.fromkeys(SystemState, None))
+
+    def test_incomplete_record_is_ignored(self):
+        self._append([self._verification_data(0)])
+        with open(self.report_path, "a") as fp:
+            fp.write('{"index": 0, "state": "STEADY", "data": {"rc": 1, ')
+
+        state_data = JSONLinesReport(self.report_path).get(0)
+        self.assertEqual(state_data[SystemState.STEADY].rc, 0)
+
+    def test_empty_report(self):
+        self.report_path.touch()
+        self.assertListEqual(JSONLinesReport(self.report_path).load(), list())
+
+    def tearDown(self) -> None:
+        self.temp_directory.cleanup()
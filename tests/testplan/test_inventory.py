@@ -0,0 +1,422 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import gzip
+import os
+import random
+from collections import Counter
+from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import TestCase, skipIf
+
+from pydantic import ValidationError
+
+from ychaos.testplan.attack import (
+    MachineTargetDefinition,
+    StratificationConfig,
+)
+from ychaos.testplan.inventory import (
+    HostFile,
+    HostPattern,
+    allocate_quotas,
+    reservoir_sample,
+    stratified_sample,
+)
+from ychaos.utils.dependency import DependencyUtils
+
+zstandard = DependencyUtils.import_module("zstandard", raise_error=False, warn=False)
+
+HOSTFILE_CONTENT = """
+# Web hosts
+web01.yahoo.com
+  web02.yahoo.com  # rack 2
+
+web03.yahoo.com
+"""
+HOSTS = ["web01.yahoo.com", "web02.yahoo.com", "web03.yahoo.com"]
+
+
+class TestHostPattern(TestCase):
+    def test_host_pattern_without_range(self):
+        self.assertListEqual(
+            ["mockhost.yahoo.com"], list(HostPattern("mockhost.yahoo.com."))
+        )
+        self.assertEqual(1, len(HostPattern("mockhost.yahoo.com")))
+
+    def test_host_pattern_with_multiple_ranges(self):
+        pattern = HostPattern("web[8-10].rack[01-02].yahoo.com")
+        self.assertEqual(6, len(pattern))
+        self.assertListEqual(
+            [
+                "web8.rack01.yahoo.com",
+                "web8.rack02.yahoo.com",
+                "web9.rack01.yahoo.com",
+                "web9.rack02.yahoo.com",
+                "web10.rack01.yahoo.com",
+                "web10.rack02.yahoo.com",
+            ],
+            list(pattern),
+        )
+
+    def test_host_pattern_with_reversed_range(self):
+        pattern = HostPattern("web[10-1].yahoo.com")
+        self.assertEqual(0, len(pattern))
+        self.assertListEqual([], list(pattern))
+        pattern.validate()
+
+    def test_host_pattern_is_counted_and_validated_without_expansion(self):
+        pattern = HostPattern("web[0000-99999].rack[1-1000].yahoo.com")
+        self.assertEqual(100000 * 1000, len(pattern))
+        pattern.validate()
+
+    def test_host_pattern_validates_longest_host(self):
+        # The label is 63 characters long for the numbers below 10
+        HostPattern("a" * 62 + "[1-9].yahoo.com").validate()
+        with self.assertRaises(ValueError):
+            HostPattern("a" * 62 + "[1-10].yahoo.com").validate()
+        with self.assertRaises(ValueError):
+            HostPattern("web_[1-2].yahoo.com").validate()
+
+
+class TestHostFile(TestCase):
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.path = Path(self.tempdir.name) / "hosts.txt"
+        self.path.write_text(HOSTFILE_CONTENT)
+        self.cache_dir = Path(self.tempdir.name) / "cache"
+
+    def test_host_file_skips_comments_and_blank_lines(self):
+        self.assertListEqual(HOSTS, list(HostFile(self.path)))
+
+    def test_host_file_with_labels(self):
+        self.path.write_text(
+            "web01.yahoo.com zone=us-east rack=r1  # Labelled\nweb02.yahoo.com\n"
+        )
+        records = [
+            ("web01.yahoo.com", dict(zone="us-east", rack="r1")),
+            ("web02.yahoo.com", dict()),
+        ]
+        self.assertListEqual(records, list(HostFile(self.path).records()))
+        self.assertListEqual(
+            ["web01.yahoo.com", "web02.yahoo.com"], list(HostFile(self.path))
+        )
+
+        # The labels are cached along with the hosts
+        self.assertListEqual(
+            records, list(HostFile(self.path, self.cache_dir).records())
+        )
+        self.assertListEqual(
+            records, list(HostFile(self.path, self.cache_dir).records())
+        )
+
+        self.path.write_text("web01.yahoo.com us-east\n")
+        with self.assertRaises(ValueError):
+            list(HostFile(self.path))
+
+    def test_host_file_with_invalid_host(self):
+        self.path.write_text("web01.yahoo.com\nweb_02.yahoo.com\n")
+        with self.assertRaises(ValueError):
+            list(HostFile(self.path))
+
+    def test_gzip_compressed_host_file(self):
+        path = self.path.with_suffix(".gz")
+        with gzip.open(path, "wt") as fp:
+            fp.write(HOSTFILE_CONTENT)
+        self.assertListEqual(HOSTS, list(HostFile(path)))
+
+    @skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_compressed_host_file(self):
+        path = self.path.with_suffix(".zst")
+        path.write_bytes(zstandard.ZstdCompressor().compress(HOSTFILE_CONTENT.encode()))
+        self.assertListEqual(HOSTS, list(HostFile(path)))
+
+    def test_host_file_cache(self):
+        self.assertListEqual(HOSTS, list(HostFile(self.path, self.cache_dir)))
+        cached = list(self.cache_dir.glob("*.hosts"))
+        self.assertEqual(1, len(cached))
+        self.assertListEqual(HOSTS, cached[0].read_text().splitlines())
+
+        # The cached hosts are read without parsing the file again
+        cached[0].write_text("cached.yahoo.com\n")
+        self.assertListEqual(
+            ["cached.yahoo.com"], list(HostFile(self.path, self.cache_dir))
+        )
+
+        # The file is hashed again when modified, but the digest is unchanged
+        os.utime(self.path, ns=(0, 0))
+        self.assertListEqual(
+            ["cached.yahoo.com"], list(HostFile(self.path, self.cache_dir))
+        )
+
+        self.path.write_text("web04.yahoo.com\n")
+        self.assertListEqual(
+            ["web04.yahoo.com"], list(HostFile(self.path, self.cache_dir))
+        )
+        self.assertEqual(2, len(list(self.cache_dir.glob("*.hosts"))))
+
+    def test_host_file_is_cached_only_when_read_completely(self):
+        iterator = iter(HostFile(self.path, self.cache_dir))
+        self.assertEqual(HOSTS[0], next(iterator))
+        iterator.close()
+        self.assertListEqual([], list(self.cache_dir.glob("*.hosts")))
+        self.assertListEqual([], list(self.cache_dir.glob(".*.tmp")))
+
+        self.path.write_text("web01.yahoo.com\nweb_02.yahoo.com\n")
+        with self.assertRaises(ValueError):
+            list(HostFile(self.path, self.cache_dir))
+        self.assertListEqual([], list(self.cache_dir.glob("*.hosts")))
+        self.assertListEqual([], list(self.cache_dir.glob(".*.tmp")))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+
+class TestReservoirSample(TestCase):
+    def test_reservoir_sample_size(self):
+        rng = random.Random(7)
+        self.assertListEqual([], reservoir_sample(range(10), 0, rng))
+        self.assertListEqual(
+            list(range(10)), sorted(reservoir_sample(range(10), 20, rng))
+        )
+
+        sample = reservoir_sample(range(100000), 100, rng)
+        self.assertEqual(100, len(sample))
+        self.assertEqual(100, len(set(sample)))
+        self.assertTrue(all(0 <= item < 100000 for item in sample))
+
+    def test_reservoir_sample_is_uniform(self):
+        rng = random.Random(7)
+        counts = Counter()
+        for _ in range(2000):
+            counts.update(reservoir_sample(range(20), 5, rng))
+
+        # Each item is selected with the probability 1/4, i.e. 500 times on average
+        self.assertEqual(20, len(counts))
+        for item, count in counts.items():
+            self.assertTrue(400 < count < 600, f"{item} selected {count} times")
+
+    def test_reservoir_sample_is_deterministic_for_seed(self):
+        self.assertListEqual(
+            reservoir_sample(range(1000), 10, random.Random(3)),
+            reservoir_sample(range(1000), 10, random.Random(3)),
+        )
+
+
+class TestStratifiedSample(TestCase):
+    def test_allocate_quotas_in_proportion_to_group_size(self):
+        sizes = {"us-east": 60, "us-west": 30, "eu": 10}
+        self.assertDictEqual(
+            {"us-east": 9, "us-west": 5, "eu": 1}, allocate_quotas(sizes, 15)
+        )
+        self.assertDictEqual(sizes, allocate_quotas(sizes, 100))
+        self.assertDictEqual(
+            {"us-east": 0, "us-west": 0, "eu": 0}, allocate_quotas(sizes, 0)
+        )
+
+    def test_allocate_quotas_with_limits(self):
+        sizes = {"us-east": 60, "us-west": 30, "eu": 1}
+        self.assertDictEqual(
+            {"us-east": 6, "us-west": 3, "eu": 1}, allocate_quotas(sizes, 10, 2)
+        )
+        self.assertDictEqual(
+            {"us-east": 4, "us-west": 3, "eu": 0},
+            allocate_quotas(sizes, 10, maximum=4),
+        )
+        self.assertDictEqual(
+            {"us-east": 4, "us-west": 4, "eu": 1},
+            allocate_quotas(sizes, 10, minimum=4, maximum=4),
+        )
+
+    def test_stratified_sample(self):
+        rng = random.Random(5)
+        items = [(i, i % 3) for i in range(300)]
+        sizes = {0: 100, 1: 100, 2: 100}
+        quotas = {0: 10, 1: 0, 2: 100}
+
+        sample = stratified_sample(items, quotas, sizes, rng)
+        self.assertEqual(110, len(sample))
+        self.assertDictEqual({0: 10, 2: 100}, dict(Counter(i % 3 for i in sample)))
+
+        # The groups and the items not counted are skipped
+        self.assertListEqual(
+            [0],
+            stratified_sample([(0, "a"), (1, "a"), (2, "b")], {"a": 5}, {"a": 1}, rng),
+        )
+
+    def test_stratified_sample_is_uniform(self):
+        rng = random.Random(7)
+        items = [(i, i % 2) for i in range(40)]
+        counts = Counter()
+        for _ in range(2000):
+            counts.update(stratified_sample(items, {0: 5, 1: 10}, {0: 20, 1: 20}, rng))
+
+        # The items of each group are selected with the probability 1/4 and 1/2 respectively
+        self.assertEqual(40, len(counts))
+        for item, count in counts.items():
+            expected = 500 if item % 2 == 0 else 1000
+            self.assertTrue(
+                0.8 * expected < count < 1.2 * expected,
+                f"{item} selected {count} times",
+            )
+
+
+class TestMachineTargetDefinitionInventory(TestCase):
+    def test_effective_hosts_are_deduplicated_and_excluded(self):
+        hostfile = NamedTemporaryFile("w+")
+        hostfile.write("web02.yahoo.com\nmockhost1.yahoo.com\n")
+        hostfile.seek(0)
+
+        definition = MachineTargetDefinition(
+            blast_radius=100,
+            hostnames=["mockhost1.yahoo.com", "mockhost2.yahoo.com"],
+            hostpatterns=["web[01-03].yahoo.com", "web[02-04].yahoo.com"],
+            hostfiles=[hostfile.name],
+            exclude=["web03.yahoo.com", "mockhost2.yahoo.com"],
+        )
+        effective_hosts = [
+            "web01.yahoo.com",
+            "web02.yahoo.com",
+            "web04.yahoo.com",
+            "mockhost1.yahoo.com",
+        ]
+        self.assertListEqual(
+            effective_hosts, list(definition.iterate_effective_hosts())
+        )
+        self.assertListEqual(effective_hosts, definition.get_effective_hosts())
+        self.assertEqual(4, definition.count_effective_hosts())
+        self.assertListEqual(
+            effective_hosts,
+            sorted(definition.sample_effective_hosts(), key=effective_hosts.index),
+        )
+
+    def test_effective_hosts_are_memoized(self):
+        definition = MachineTargetDefinition(
+            blast_radius=100, hostpatterns=["web[01-03].yahoo.com"]
+        )
+        self.assertIs(
+            definition.get_effective_hosts(), definition.get_effective_hosts()
+        )
+
+    def test_effective_hosts_are_computed_again_when_reassigned(self):
+        definition = MachineTargetDefinition(
+            blast_radius=100, hostpatterns=["web[01-03].yahoo.com"]
+        )
+        self.assertEqual(3, len(definition.get_effective_hosts()))
+
+        definition.exclude = ["web02.yahoo.com"]
+        self.assertListEqual(
+            ["web01.yahoo.com", "web03.yahoo.com"], definition.get_effective_hosts()
+        )
+
+        definition.hostpatterns = ["web[01-05].yahoo.com"]
+        self.assertEqual(4, definition.count_effective_hosts())
+
+        definition.hostnames = ["mockhost1.yahoo.com"]
+        self.assertIn("mockhost1.yahoo.com", definition.get_effective_hosts())
+
+        # The effective hosts do not depend on the other fields
+        effective_hosts = definition.get_effective_hosts()
+        definition.blast_radius = 50
+        self.assertIs(effective_hosts, definition.get_effective_hosts())
+
+    def test_sample_of_memoized_effective_hosts(self):
+        hostfile = NamedTemporaryFile("w+")
+        hostfile.write(HOSTFILE_CONTENT)
+        hostfile.seek(0)
+
+        definition = MachineTargetDefinition(
+            blast_radius=50, hostfiles=[hostfile.name], seed=7
+        )
+        sample = definition.sample_effective_hosts()
+
+        # The memoized hosts are sampled without reading the hostfile again
+        definition.get_effective_hosts()
+        hostfile.close()
+        self.assertListEqual(sample, definition.sample_effective_hosts())
+
+    def test_sample_effective_hosts(self):
+        definition = MachineTargetDefinition(
+            blast_radius=1, hostpatterns=["web[00000-99999].yahoo.com"]
+        )
+        sample = definition.sample_effective_hosts(random.Random(11))
+        self.assertEqual(1000, len(sample))
+        self.assertEqual(1000, len(set(sample)))
+        self.assertListEqual(
+            sample, definition.sample_effective_hosts(random.Random(11))
+        )
+
+        definition = MachineTargetDefinition(
+            blast_radius=0, hostpatterns=["web[00000-99999].yahoo.com"]
+        )
+        self.assertListEqual([], definition.sample_effective_hosts())
+
+    def test_effective_hosts_from_cached_hostfiles(self):
+        with TemporaryDirectory() as tempdir:
+            path = Path(tempdir) / "hosts.txt.gz"
+            with gzip.open(path, "wt") as fp:
+                fp.write(HOSTFILE_CONTENT)
+
+            definition = MachineTargetDefinition(
+                blast_radius=100,
+                hostfiles=[path],
+                hostfile_cache_dir=Path(tempdir) / "cache",
+            )
+            self.assertListEqual(HOSTS, definition.get_effective_hosts())
+            self.assertEqual(1, len(list(Path(tempdir).glob("cache/*.hosts"))))
+
+    def test_stratified_sample_of_effective_hosts(self):
+        hostfile = NamedTemporaryFile("w+")
+        hostfile.write(
+            "".join(f"db{i:02}.yahoo.com zone=us-east\n" for i in range(10))
+            + "db99.yahoo.com zone=eu\n"
+        )
+        hostfile.seek(0)
+
+        definition = MachineTargetDefinition(
+            blast_radius=10,
+            hostpatterns=["web[001-100].r[1-4].yahoo.com"],
+            hostfiles=[hostfile.name],
+            stratify=dict(
+                group_by=["zone", "rack"],
+                pattern=r"\.(?P<rack>r\d)\.",
+                min_hosts_per_group=1,
+            ),
+            seed=3,
+        )
+        sample = definition.sample_effective_hosts()
+        self.assertEqual(411, definition.count_effective_hosts())
+        self.assertListEqual(sample, definition.sample_effective_hosts())
+
+        groups = Counter(definition.stratify.get_group(host, dict()) for host in sample)
+        self.assertDictEqual(
+            {
+                ("", "r1"): 10,
+                ("", "r2"): 10,
+                ("", "r3"): 10,
+                ("", "r4"): 10,
+                ("", ""): 2,
+            },
+            dict(groups),
+        )
+        self.assertEqual(1, sum(host.startswith("db99") for host in sample))
+
+    def test_stratification_group(self):
+        config = StratificationConfig(
+            group_by=["service", "zone"],
+            pattern=r"^(?P<service>[a-z]+)(?P<zone>-eu)?\d",
+        )
+        self.assertTupleEqual(("web", ""), config.get_group("web01.yahoo.com", dict()))
+        self.assertTupleEqual(
+            ("web", "eu"), config.get_group("web01.yahoo.com", dict(zone="eu"))
+        )
+        self.assertTupleEqual(("", ""), config.get_group("01.yahoo.com", dict()))
+
+        with self.assertRaises(ValidationError):
+            StratificationConfig(group_by=["zone"], pattern="(?P<zone")
+        with self.assertRaises(ValidationError):
+            StratificationConfig(group_by=[])
+
+    def test_invalid_hostpattern(self):
+        with self.assertRaises(ValidationError):
+            MachineTargetDefinition(
+                blast_radius=100, hostpatterns=["web[01-03].rack_[1-2].yahoo.com"]
+            )
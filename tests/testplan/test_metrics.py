@@ -1,5 +1,9 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+import subprocess  # nosec
+import sys
+import unittest
 from datetime import datetime, timedelta
 from pathlib import Path
 from unittest import TestCase
@@ -10,9 +14,11 @@ from pydantic import ValidationError
 from ychaos.testplan import SystemState
 from ychaos.testplan.schema import TestPlan
 from ychaos.testplan.verification import OpenTSDBVerification
+from ychaos.testplan.verification.plugins import metrics
 from ychaos.testplan.verification.plugins.metrics import (
     MetricsAggregator,
     MetricsComparator,
+    TimeSeriesDataAggregator,
 )
 
 
@@ -44,8 +50,71 @@ class TestMetricsAggregator(TestCase):
         )
 
     def test_aggregator_slope(self):
-        with self.assertRaises(NotImplementedError):
-            MetricsAggregator.SLOPE.metadata.aggregate(self.metrics_fixture)
+        self.assertAlmostEqual(
+            MetricsAggregator.SLOPE.metadata.aggregate(self.metrics_fixture), 0.7
+        )
+
+    def test_aggregator_slope_for_single_datapoint(self):
+        self.assertTrue(math.isnan(MetricsAggregator.SLOPE.metadata.aggregate({1: 1})))
+
+    @parameterized.expand(
+        [
+            (MetricsAggregator.P50.value, MetricsAggregator.P50, 4),
+            (MetricsAggregator.P90.value, MetricsAggregator.P90, 8.6),
+            (MetricsAggregator.P95.value, MetricsAggregator.P95, 8.8),
+            (MetricsAggregator.P99.value, MetricsAggregator.P99, 8.96),
+        ]
+    )
+    def test_aggregator_percentile(
+        self, _, aggregator: MetricsAggregator, expected_data: float
+    ):
+        self.assertAlmostEqual(
+            aggregator.metadata.aggregate(self.metrics_fixture), expected_data
+        )
+
+    @parameterized.expand(
+        [(aggregator.value, aggregator) for aggregator in MetricsAggregator]
+    )
+    def test_aggregator_for_only_nan_data(self, _, aggregator: MetricsAggregator):
+        self.assertTrue(
+            math.isnan(aggregator.metadata.aggregate({1: math.nan, 2: math.nan}))
+        )
+
+    def test_aggregator_with_epoch_timestamps(self):
+        # OpenTSDB returns the datapoints keyed with epoch timestamps
+        data = {"1365966061": 3, "1365966001": 1, "1365966062": math.nan}
+        self.assertEqual(MetricsAggregator.OLDEST.metadata.aggregate(data), 1)
+        self.assertEqual(MetricsAggregator.LATEST.metadata.aggregate(data), 3)
+        self.assertAlmostEqual(MetricsAggregator.SLOPE.metadata.aggregate(data), 1 / 30)
+
+    def test_aggregate_multiple_aggregators(self):
+        aggregated = TimeSeriesDataAggregator.aggregate(
+            self.metrics_fixture,
+            [MetricsAggregator.AVG, MetricsAggregator.MAX, MetricsAggregator.SLOPE],
+        )
+        self.assertEqual(aggregated[MetricsAggregator.AVG], 4.8)
+        self.assertEqual(aggregated[MetricsAggregator.MAX], 9)
+        self.assertAlmostEqual(aggregated[MetricsAggregator.SLOPE], 0.7)
+
+    @unittest.skipIf(metrics._numpy() is None, "NumPy is not installed")
+    def test_aggregators_without_numpy_match_numpy(self):
+        aggregators = [
+            aggregator
+            for aggregator in MetricsAggregator
+            if aggregator != MetricsAggregator.RANDOM
+        ]
+        expected = TimeSeriesDataAggregator.aggregate(self.metrics_fixture, aggregators)
+
+        _numpy, metrics.numpy = metrics._numpy(), None
+        try:
+            aggregated = TimeSeriesDataAggregator.aggregate(
+                self.metrics_fixture, aggregators
+            )
+        finally:
+            metrics.numpy = _numpy
+
+        for aggregator in aggregators:
+            self.assertAlmostEqual(aggregated[aggregator], expected[aggregator])
 
 
 class TestMetricsComparator(TestCase):
@@ -108,6 +177,28 @@ class TestStateBoundMetricsVerificationCriteria(TestCase):
         self.assertEqual("<=", comparator.comparator_raw)
         self.assertEqual(300, comparator.value)
 
+    def test_loading_testplan_does_not_import_numpy(self):
+        script = (
+            "import sys\n"
+            "from ychaos.testplan.schema import TestPlan\n"
+            "testplan = TestPlan.load_file(sys.argv[1])\n"
+            "testplan.verification[0].get_verification_config()\n"
+            "print('numpy' in sys.modules)\n"
+        )
+        proc = subprocess.run(  # nosec
+            [
+                sys.executable,
+                "-c",
+                script,
+                str(self.testplans_directory.joinpath("valid/testplan7.yaml")),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertEqual(0, proc.returncode, proc.stderr)
+        self.assertEqual("False", proc.stdout.strip())
+
     def test_metrics_when_no_criteria_is_defined(self):
         with self.assertRaises(ValidationError):
             OpenTSDBVerification(url="https://mock.metrics.reslience.yahoo.com")
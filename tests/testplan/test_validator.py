@@ -1,13 +1,19 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+import json
+import os
 from os import scandir
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from pydantic import ValidationError
 
-from ychaos.testplan.validator import TestPlanValidator
+from ychaos.testplan.validator import (
+    TestPlanValidationCache,
+    TestPlanValidator,
+)
 
 
 class TestTestPlanValidator(TestCase):
@@ -27,3 +33,89 @@ class TestTestPlanValidator(TestCase):
         for path in scandir(self.testplans_directory.joinpath("invalid")):
             with self.assertRaises(ValidationError):
                 TestPlanValidator.validate_file(path)
+
+    def test_validate_files(self):
+        valid = sorted(self.testplans_directory.joinpath("valid").iterdir())
+        invalid = sorted(self.testplans_directory.joinpath("invalid").iterdir())
+
+        for workers in (1, 2):
+            results = TestPlanValidator.validate_files(valid + invalid, workers=workers)
+
+            self.assertListEqual(list(results), valid + invalid)
+            for path in valid:
+                self.assertIsNone(results[path])
+            for path in invalid:
+                self.assertIn("validation error", results[path])
+
+    def test_validate_files_reports_malformed_files(self):
+        valid = self.testplans_directory.joinpath("valid/testplan1.yaml")
+        with TemporaryDirectory() as directory:
+            malformed = Path(directory) / "malformed.yaml"
+            malformed.write_text("a: [")
+            undecodable = Path(directory) / "undecodable.yaml"
+            undecodable.write_bytes(b"a: \xff\xfe")
+
+            for workers in (1, 2):
+                results = TestPlanValidator.validate_files(
+                    [malformed, undecodable, valid], workers=workers
+                )
+                self.assertIn("Error while parsing the testplan", results[malformed])
+                self.assertIn("Error while parsing the testplan", results[undecodable])
+                self.assertIsNone(results[valid])
+
+    def test_validate_files_raises_error_for_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            TestPlanValidator.validate_files(
+                [self.testplans_directory.joinpath("valid/unknown_testplan.yaml")]
+            )
+
+    def test_validate_files_with_cache(self):
+        path = self.testplans_directory.joinpath("valid/testplan1.yaml")
+        with TemporaryDirectory() as cache_directory:
+            cache_path = Path(cache_directory) / "cache.json"
+
+            cache = TestPlanValidationCache(cache_path)
+            self.assertDictEqual(dict(), cache.results)
+            self.assertIsNone(
+                TestPlanValidator.validate_files([path], cache=cache)[path]
+            )
+            cache.save()
+
+            digest = TestPlanValidationCache.digest(path.read_bytes())
+            cache = TestPlanValidationCache(cache_path)
+            self.assertDictEqual({digest: None}, cache.results)
+
+            # The cached result is used without validating the file again
+            cache.results[digest] = "cached error"
+            self.assertEqual(
+                "cached error",
+                TestPlanValidator.validate_files([path], cache=cache)[path],
+            )
+
+            # Only the results of the files of the latest validation are kept
+            cache.results["stale"] = None
+            other = self.testplans_directory.joinpath("valid/testplan2.yaml")
+            TestPlanValidator.validate_files([other], cache=cache)
+            self.assertListEqual(
+                [TestPlanValidationCache.digest(other.read_bytes())],
+                list(cache.results),
+            )
+
+    def test_validation_cache_is_discarded_for_another_key(self):
+        with TemporaryDirectory() as cache_directory:
+            cache_path = Path(cache_directory) / "cache.json"
+            cache_path.write_text(
+                json.dumps(dict(key="0.0.0:/", results=dict(digest=None)))
+            )
+            self.assertDictEqual(dict(), TestPlanValidationCache(cache_path).results)
+
+            cache_path.write_text("{")
+            self.assertDictEqual(dict(), TestPlanValidationCache(cache_path).results)
+
+            cache = TestPlanValidationCache(cache_path)
+            cache.results["digest"] = None
+            cache.save()
+            self.assertListEqual(["cache.json"], os.listdir(cache_directory))
+            self.assertDictEqual(
+                dict(digest=None), TestPlanValidationCache(cache_path).results
+            )
@@ -6,7 +6,11 @@ from argparse import ArgumentParser, Namespace
 from typing import Any
 from unittest import TestCase
 
-from ychaos.utils.argparse import SubCommand, SubCommandParsersAction
+from ychaos.utils.argparse import (
+    LazySubCommand,
+    SubCommand,
+    SubCommandParsersAction,
+)
 
 
 class SubCommandMock(SubCommand):
@@ -55,3 +59,85 @@ class TestSubCommand(TestCase):
 
         with self.assertRaises(argparse.ArgumentError):
             self.subparsers.add_parser(cls=InvalidSubCommand)
+
+
+LAZY = LazySubCommand(
+    "lazy",
+    f"{__name__}:LazySubCommandMock",
+    help="Lazy sub-command",
+    aliases=("lz",),
+    epilog="lazy epilog",
+)
+
+
+class LazySubCommandMock(SubCommand):
+    __command__ = LAZY
+
+    @classmethod
+    def build_parser(cls, parser: ArgumentParser) -> ArgumentParser:
+        parser.add_argument("-y", type=int, default=10)
+        return parser
+
+    @classmethod
+    def main(cls, args: Namespace) -> Any:
+        return args
+
+
+class TestLazySubCommand(TestCase):
+    def setUp(self):
+        self.main_parser = argparse.ArgumentParser()
+        self.subparsers = self.main_parser.add_subparsers(
+            action=SubCommandParsersAction, dest="subcommand_name"
+        )
+
+    def test_lazy_subcommand_attributes_are_set_from_its_entry(self):
+        self.assertEqual(LazySubCommandMock.name, "lazy")
+        self.assertEqual(LazySubCommandMock.help, "Lazy sub-command")
+        self.assertListEqual(LazySubCommandMock.aliases, ["lz"])
+        self.assertEqual(LazySubCommandMock.epilog, "lazy epilog")
+
+    def test_lazy_subcommand_is_built_when_invoked(self):
+        parser = self.subparsers.add_parser(cls=LAZY)
+        self.assertIsNone(parser.get_default("cls"))
+        self.assertEqual(parser.epilog, "lazy epilog")
+
+        args = self.main_parser.parse_args("lazy -y 50".split())
+
+        self.assertEqual(args.y, 50)
+        self.assertEqual(args.cls, LazySubCommandMock)
+        self.assertEqual(args.subcommand_name, "lazy")
+
+    def test_lazy_subcommand_is_invoked_with_alias(self):
+        self.subparsers.add_parser(cls=LAZY)
+
+        args = self.main_parser.parse_args("lz -y 50".split())
+
+        self.assertEqual(args.y, 50)
+        self.assertEqual(args.cls, LazySubCommandMock)
+
+    def test_lazy_subcommand_is_listed_in_help(self):
+        self.subparsers.add_parser(cls=LAZY)
+        self.assertIn("Lazy sub-command", self.main_parser.format_help())
+        self.assertIn("lz", self.main_parser.format_help())
+
+    def test_lazy_subcommand_load(self):
+        parser = self.subparsers.add_parser(cls=LAZY)
+
+        self.assertIs(self.subparsers.load("lazy"), parser)
+        self.assertEqual(parser.get_default("cls"), LazySubCommandMock)
+        self.assertIn("-y", parser.format_help())
+
+        # Loading again does not build the parser again
+        self.assertIs(self.subparsers.load("lz"), parser)
+
+    def test_lazy_subcommand_with_a_different_name(self):
+        self.subparsers.add_parser(cls=LAZY._replace(name="eager", aliases=()))
+        with self.assertRaises(argparse.ArgumentError):
+            self.subparsers.load("eager")
+
+    def test_lazy_subcommand_with_cls_not_inherited_from_subcommand_class(self):
+        self.subparsers.add_parser(
+            cls=LAZY._replace(path=f"{__name__}:TestLazySubCommand")
+        )
+        with self.assertRaises(argparse.ArgumentError):
+            self.subparsers.load("lazy")
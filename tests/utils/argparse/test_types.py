@@ -0,0 +1,21 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+
+from argparse import ArgumentTypeError
+from unittest import TestCase
+
+from ychaos.utils.argparse import positive_float, positive_int
+
+
+class TestArgumentTypes(TestCase):
+    def test_positive_int(self):
+        self.assertEqual(4, positive_int("4"))
+        for value in ("0", "-1", "1.5", "four"):
+            with self.assertRaises(ArgumentTypeError):
+                positive_int(value)
+
+    def test_positive_float(self):
+        self.assertEqual(0.5, positive_float("0.5"))
+        for value in ("0", "-0.1", "nan", "ten"):
+            with self.assertRaises(ArgumentTypeError):
+                positive_float(value)
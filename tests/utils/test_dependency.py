@@ -1,9 +1,14 @@
 #  Copyright 2021, Yahoo
 #  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
 
+from types import SimpleNamespace
 from unittest import TestCase
 
-from ychaos.utils.dependency import DependencyUtils
+from ychaos.utils.dependency import (
+    DependencyUtils,
+    LazyImportDict,
+    LazyNamespace,
+)
 
 
 class TestDependencyUtils(TestCase):
@@ -67,3 +72,51 @@ class TestDependencyUtils(TestCase):
             warn=False,
         )
         self.assertTupleEqual((None,), handler_class)
+
+    def test_import_path(self):
+        self.assertIs(
+            DependencyUtils.import_path("ychaos.utils.dependency:DependencyUtils"),
+            DependencyUtils,
+        )
+
+    def test_import_path_without_attribute_raises_error(self):
+        with self.assertRaises(ImportError):
+            DependencyUtils.import_path("ychaos.utils.dependency")
+
+    def test_import_path_with_invalid_attribute_raises_error(self):
+        with self.assertRaises(ImportError):
+            DependencyUtils.import_path("ychaos.utils.dependency:SomeUnknownAttribute")
+
+
+class TestLazyNamespace(TestCase):
+    def test_lazy_namespace_imports_attribute_on_access(self):
+        namespace = LazyNamespace(
+            "ychaos.utils.histogram", histogram="LatencyHistogram"
+        )
+        self.assertIsInstance(namespace, SimpleNamespace)
+        self.assertNotIn("histogram", vars(namespace))
+
+        from ychaos.utils.histogram import LatencyHistogram
+
+        self.assertIs(namespace.histogram, LatencyHistogram)
+        self.assertIn("histogram", vars(namespace))
+
+    def test_lazy_namespace_unknown_attribute(self):
+        namespace = LazyNamespace(
+            "ychaos.utils.histogram", histogram="LatencyHistogram"
+        )
+        self.assertIsNone(getattr(namespace, "__aliases__", None))
+        with self.assertRaises(AttributeError):
+            namespace.unknown
+
+
+class TestLazyImportDict(TestCase):
+    def test_lazy_import_dict_imports_value_on_lookup(self):
+        mapping = LazyImportDict(
+            utils="ychaos.utils.dependency:DependencyUtils", value=1
+        )
+        self.assertEqual(mapping["utils"], DependencyUtils)
+        self.assertEqual(mapping.get("utils"), DependencyUtils)
+        self.assertEqual(dict.__getitem__(mapping, "utils"), DependencyUtils)
+        self.assertEqual(mapping.get("value"), 1)
+        self.assertIsNone(mapping.get("unknown"))
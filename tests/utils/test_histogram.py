@@ -0,0 +1,60 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import math
+import random
+from unittest import TestCase
+
+from ychaos.utils.histogram import LatencyHistogram
+
+
+class TestLatencyHistogram(TestCase):
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertTrue(math.isnan(histogram.percentile(99)))
+        self.assertListEqual(histogram.buckets(), list())
+
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 0)
+        self.assertIsNone(summary["min"])
+        self.assertIsNone(summary["mean"])
+        self.assertIsNone(summary["p50"])
+
+    def test_percentiles_are_within_relative_error(self):
+        histogram = LatencyHistogram()
+        latencies = [random.uniform(0.01, 30000) for _ in range(10000)]  # nosec
+        for latency in latencies:
+            histogram.record(latency)
+
+        latencies.sort()
+        for percentile in (1, 50, 90, 99, 99.9, 100):
+            expected = latencies[math.ceil(percentile / 100 * len(latencies)) - 1]
+            self.assertAlmostEqual(
+                histogram.percentile(percentile),
+                expected,
+                delta=expected * 2 / 2**LatencyHistogram.SUB_BUCKET_BITS + 0.001,
+            )
+
+    def test_percentile_does_not_exceed_max(self):
+        histogram = LatencyHistogram()
+        histogram.record(1234.5)
+        self.assertEqual(histogram.percentile(100), 1234.5)
+
+    def test_memory_is_bounded(self):
+        histogram = LatencyHistogram()
+        for latency in range(1, 100000):
+            histogram.record(latency / 3)
+        self.assertLess(len(histogram.buckets()), 2000)
+        self.assertEqual(sum(count for _, count in histogram.buckets()), 99999)
+
+    def test_summary(self):
+        histogram = LatencyHistogram()
+        for latency in (10, 20, 30, 40):
+            histogram.record(latency)
+
+        summary = histogram.summary(percentiles=(50, 99.9))
+        self.assertEqual(summary["count"], 4)
+        self.assertEqual(summary["min"], 10)
+        self.assertEqual(summary["max"], 40)
+        self.assertEqual(summary["mean"], 25)
+        self.assertAlmostEqual(summary["p50"], 20, delta=0.4)
+        self.assertEqual(summary["p99.9"], 40)
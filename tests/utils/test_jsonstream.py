@@ -0,0 +1,65 @@
+#  Copyright 2021, Yahoo
+#  Licensed under the terms of the Apache 2.0 license. See the LICENSE file in the project root for terms
+import json
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from ychaos.utils.jsonstream import JSONArrayStream
+
+
+class TestJSONArrayStream(TestCase):
+    def setUp(self) -> None:
+        self.document = [
+            dict(metric="cpu", tags={"host": 'a]b\\"c'}, dps={"1": 1.5, "2": 2}),
+            12345,
+            "string, with [brackets]",
+            [1, [2, {}]],
+            True,
+            None,
+            -1.5e3,
+        ]
+
+    @parameterized.expand([(1,), (2,), (7,), (64,), (1 << 16,)])
+    def test_stream_in_chunks(self, chunk_size):
+        content = json.dumps(self.document, indent=2).encode()
+        chunks = [
+            content[i : i + chunk_size] for i in range(0, len(content), chunk_size)
+        ]
+        self.assertListEqual(list(JSONArrayStream(chunks)), self.document)
+
+    def test_stream_of_str_chunks(self):
+        self.assertListEqual(
+            list(JSONArrayStream(["[1", "2, 3", "4]"])),
+            [12, 34],
+        )
+
+    def test_multibyte_character_split_across_chunks(self):
+        content = json.dumps(["é"], ensure_ascii=False).encode()
+        self.assertListEqual(
+            list(JSONArrayStream([content[:3], content[3:]])),
+            ["é"],
+        )
+
+    def test_empty_array(self):
+        self.assertListEqual(list(JSONArrayStream([b" [ ] "])), list())
+
+    def test_elements_are_yielded_before_the_stream_ends(self):
+        def _chunks():
+            yield b'[{"a": 1}, '
+            raise AssertionError("Element must be yielded before reading further")
+
+        self.assertDictEqual(next(iter(JSONArrayStream(_chunks()))), dict(a=1))
+
+    @parameterized.expand(
+        [
+            ("not_array", b"{}"),
+            ("incomplete", b"[1, 2"),
+            ("missing_separator", b"[1 2]"),
+            ("extra_data", b"[1] 2"),
+            ("invalid_element", b"[{]"),
+        ]
+    )
+    def test_invalid_document(self, _, content):
+        with self.assertRaises(ValueError):
+            list(JSONArrayStream([content]))